@@ -0,0 +1,196 @@
+"""Memory-mapped on-disk archive of candles, one series per symbol and interval.
+
+CoinGecko only returns a limited lookback per request, so the app can append
+every history it fetches here and research or backtest code can read years
+of bars back later. Each series is a directory holding two raw files:
+
+    <root>/<SYMBOL>/<interval>/timestamp.i8   int64 ms close times, increasing
+    <root>/<SYMBOL>/<interval>/ohlcv.f4       float32 rows of Open/High/Low/Close/Volume
+
+Both files only ever grow. Appending writes new rows to the end, and a bar
+equal to the last stored one overwrites it in place (the live candle keeps
+changing until it closes). Reads map the files with `np.memmap` and return
+`CandleStore` views over the requested date range. Only the pages that are
+actually touched get loaded, so hundreds of multi-year series fit in modest
+RAM. Rows are stored whole, which keeps appends to one contiguous write and
+makes a date-range read a single contiguous span of pages.
+
+    $ python archive.py --root archive          # list series, bar counts and ranges
+"""
+import argparse
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from candles import FIELDS, CandleStore
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive")
+TIMESTAMP_FILE = "timestamp.i8"
+VALUES_FILE = "ohlcv.f4"
+ROW_BYTES = len(FIELDS) * 4
+_INTERVAL_UNITS = (("d", 86_400_000), ("h", 3_600_000), ("m", 60_000))
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9._-]+$")
+# Process-wide so every CandleArchive instance (one per app rerun) serialises appends
+_write_lock = threading.Lock()
+
+
+def infer_interval(timestamps):
+    """Interval label ('30m', '4h', '4d', ...) from the median spacing of ms timestamps"""
+    if len(timestamps) < 2:
+        return None
+    step = int(np.median(np.diff(timestamps)))
+    for unit, ms in _INTERVAL_UNITS:
+        if step >= ms and step % ms == 0:
+            return f"{step // ms}{unit}"
+    return f"{step}ms"
+
+
+def _to_ms(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value // 1_000_000
+
+
+class CandleArchive:
+    """Append-only candle series on disk, read back as zero-copy memory maps"""
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR):
+        self.root = root
+
+    def series_dir(self, symbol, interval):
+        for name in (symbol, interval):
+            if not _SAFE_NAME.match(name):
+                raise ValueError(f"Invalid archive name: {name!r}")
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _length(self, path):
+        """Complete bars on disk; a torn append (one file longer) is ignored"""
+        try:
+            ts_rows = os.path.getsize(os.path.join(path, TIMESTAMP_FILE)) // 8
+            value_rows = os.path.getsize(os.path.join(path, VALUES_FILE)) // ROW_BYTES
+        except FileNotFoundError:
+            return 0
+        return min(ts_rows, value_rows)
+
+    # --- writes ---
+    def append(self, symbol, store, interval=None):
+        """Add bars newer than the last stored one; returns how many rows were written"""
+        interval = interval or infer_interval(store.timestamps)
+        if interval is None or len(store) == 0:
+            return 0
+        path = self.series_dir(symbol, interval)
+        with _write_lock:
+            os.makedirs(path, exist_ok=True)
+            n = self._length(path)
+            ts_path, values_path = os.path.join(path, TIMESTAMP_FILE), os.path.join(path, VALUES_FILE)
+            # Drop the tail of a torn append before writing after it
+            for file_path, row_bytes in ((ts_path, 8), (values_path, ROW_BYTES)):
+                if os.path.exists(file_path) and os.path.getsize(file_path) != n * row_bytes:
+                    os.truncate(file_path, n * row_bytes)
+
+            rows = np.ascontiguousarray(store.values.T, dtype=np.float32)
+            start = 0
+            written = 0
+            if n:
+                last = np.memmap(ts_path, dtype=np.int64, mode="r", offset=(n - 1) * 8, shape=(1,))[0]
+                start = int(np.searchsorted(store.timestamps, last, side="left"))
+                if start < len(store) and store.timestamps[start] == last:
+                    tail = np.memmap(values_path, dtype=np.float32, mode="r+",
+                                     offset=(n - 1) * ROW_BYTES, shape=(1, len(FIELDS)))
+                    tail[0] = rows[start]
+                    tail.flush()
+                    start += 1
+                    written += 1
+
+            new = slice(start, len(store))
+            if new.start < new.stop:
+                with open(values_path, "ab") as f:
+                    f.write(rows[new].tobytes())
+                with open(ts_path, "ab") as f:
+                    f.write(np.ascontiguousarray(store.timestamps[new], dtype=np.int64).tobytes())
+                written += new.stop - new.start
+        return written
+
+    # --- reads ---
+    def open(self, symbol, interval):
+        """Whole series as a CandleStore over read-only memory maps (None if absent)"""
+        path = self.series_dir(symbol, interval)
+        n = self._length(path)
+        if n == 0:
+            return None
+        timestamps = np.memmap(os.path.join(path, TIMESTAMP_FILE), dtype=np.int64, mode="r", shape=(n,))
+        rows = np.memmap(os.path.join(path, VALUES_FILE), dtype=np.float32, mode="r", shape=(n, len(FIELDS)))
+        return CandleStore(timestamps, rows.T)
+
+    def read(self, symbol, interval, start=None, end=None):
+        """Bars with start <= timestamp <= end (datetimes or ms) as a zero-copy view"""
+        store = self.open(symbol, interval)
+        if store is None:
+            return None
+        start_ms, end_ms = _to_ms(start), _to_ms(end)
+        lo = 0 if start_ms is None else int(np.searchsorted(store.timestamps, start_ms, side="left"))
+        hi = len(store) if end_ms is None else int(np.searchsorted(store.timestamps, end_ms, side="right"))
+        return store.window(lo, hi)
+
+    def read_many(self, symbols, interval, start=None, end=None):
+        """{symbol: CandleStore} for every archived symbol in range, ready for align_ohlcv"""
+        stores = {}
+        for symbol in symbols:
+            store = self.read(symbol, interval, start, end)
+            if store is not None and len(store):
+                stores[symbol] = store
+        return stores
+
+    def last_timestamp(self, symbol, interval):
+        store = self.open(symbol, interval)
+        return int(store.timestamps[-1]) if store is not None else None
+
+    # --- catalogue ---
+    def series(self):
+        """[(symbol, interval)] for every series in the archive"""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for symbol in sorted(os.listdir(self.root)):
+            symbol_dir = os.path.join(self.root, symbol)
+            if os.path.isdir(symbol_dir):
+                found.extend((symbol, interval) for interval in sorted(os.listdir(symbol_dir))
+                             if self._length(os.path.join(symbol_dir, interval)))
+        return found
+
+    def info(self):
+        rows = []
+        for symbol, interval in self.series():
+            store = self.open(symbol, interval)
+            rows.append({
+                "symbol": symbol,
+                "interval": interval,
+                "bars": len(store),
+                "first": pd.Timestamp(int(store.timestamps[0]), unit="ms"),
+                "last": pd.Timestamp(int(store.timestamps[-1]), unit="ms"),
+                "bytes": store.nbytes,
+            })
+        return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the series in a candle archive")
+    parser.add_argument("--root", default=DEFAULT_ARCHIVE_DIR)
+    args = parser.parse_args(argv)
+
+    rows = CandleArchive(args.root).info()
+    if not rows:
+        print(f"no series under {args.root}")
+        return
+    for row in rows:
+        print(f"{row['symbol']:>8} {row['interval']:>5} {row['bars']:>8} bars  "
+              f"{row['first']:%Y-%m-%d %H:%M} -> {row['last']:%Y-%m-%d %H:%M}  {row['bytes'] / 2**20:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
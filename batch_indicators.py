@@ -0,0 +1,349 @@
+"""Batched indicator engine over a time × symbols matrix.
+
+`align_ohlcv` stacks many single-symbol OHLCV frames into 2D float arrays
+(rows = shared timestamps, columns = symbols). The kernels below then compute
+RSI, ATR, Bollinger Bands, SuperTrend and Parabolic SAR for every column at
+once: recursive indicators loop over time only, with each step vectorised
+across all symbols, so the cost per symbol is a few NumPy element operations
+instead of a pandas/`ta` pipeline.
+
+Kernels reproduce the `ta` / calculate_* semantics (Wilder smoothing seeds,
+ddof=0 band width, the app's SuperTrend recursion and the positional PSAR
+algorithm), and `summarize` turns the arrays into per-symbol dicts with the
+same keys and wording as calculate_* so they feed straight into
+`determine_overall_bias`. Each symbol's regime (`regime.latest_regimes`)
+sets its RSI bands and squeeze percentile, as the registry's regime node
+does for one symbol. The divergence label comes from
+`divergence.divergence_label`, the same rules the single-symbol path uses.
+
+Columns may start at different times (shorter histories); every kernel
+tracks each column's first valid row. Interior gaps are forward-filled from
+the previous close.
+"""
+import numpy as np
+import pandas as pd
+
+import divergence as divergence_kernel
+import psar as psar_kernel
+import regime as regime_kernel
+from formatting import format_price
+
+OHLC_COLUMNS = ("Open", "High", "Low", "Close")
+
+
+# --- ALIGNMENT ---
+def align_ohlcv(frames):
+    """Stack {symbol: OHLCV DataFrame or CandleStore} into {'index', 'symbols', 'Open'...'Volume': (T, N) arrays}"""
+    symbols = list(frames)
+    index = None
+    for df in frames.values():
+        index = df.index if index is None else index.union(df.index)
+    index = index.sort_values()
+
+    n_rows, n_cols = len(index), len(symbols)
+    aligned = {"index": index, "symbols": symbols}
+    for col in OHLC_COLUMNS + ("Volume",):
+        aligned[col] = np.full((n_rows, n_cols), np.nan)
+
+    for j, symbol in enumerate(symbols):
+        df = frames[symbol]
+        rows = index.get_indexer(df.index)
+        for col in OHLC_COLUMNS + ("Volume",):
+            if col in df.columns:
+                aligned[col][rows, j] = np.asarray(pd.to_numeric(df[col], errors="coerce"), dtype=float)
+
+    _fill_interior_gaps(aligned)
+    return aligned
+
+
+def _fill_interior_gaps(aligned):
+    close = aligned["Close"]
+    missing = np.isnan(close)
+    if not missing.any():
+        return
+    rows = np.where(~missing, np.arange(close.shape[0])[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = np.take_along_axis(close, rows, axis=0)
+    started = np.cumsum(~missing, axis=0) > 0
+    gap = missing & started
+    for col in OHLC_COLUMNS:
+        aligned[col][gap] = filled[gap]
+    aligned["Volume"][gap] = 0.0
+
+
+def first_valid_rows(values):
+    """Row of the first non-NaN value in each column (len(values) if none)"""
+    valid = ~np.isnan(values)
+    first = np.argmax(valid, axis=0)
+    first[~valid.any(axis=0)] = values.shape[0]
+    return first
+
+
+# --- KERNELS ---
+def batch_rsi(close, window=14):
+    """Wilder RSI per column, matching ta.momentum.RSIIndicator (fillna=False)"""
+    n_rows = close.shape[0]
+    first = first_valid_rows(close)
+    diff = np.vstack([np.full((1, close.shape[1]), np.nan), np.diff(close, axis=0)])
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+
+    alpha = 1.0 / window
+    ema_up = np.full_like(close, np.nan)
+    ema_dn = np.full_like(close, np.nan)
+    prev_up = np.zeros(close.shape[1])
+    prev_dn = np.zeros(close.shape[1])
+    for t in range(n_rows):
+        started = t > first
+        prev_up = np.where(started, (1 - alpha) * prev_up + alpha * up[t], up[t])
+        prev_dn = np.where(started, (1 - alpha) * prev_dn + alpha * down[t], down[t])
+        ema_up[t] = prev_up
+        ema_dn[t] = prev_dn
+
+    warm = np.arange(n_rows)[:, None] - first[None, :] >= window - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(ema_dn == 0, 100.0, 100.0 - 100.0 / (1.0 + ema_up / ema_dn))
+    rsi[~warm] = np.nan
+    return rsi
+
+
+def batch_true_range(high, low, close):
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+    ranges = np.stack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    with np.errstate(invalid="ignore"):
+        return np.fmax(np.fmax(ranges[0], ranges[1]), ranges[2])
+
+
+def batch_atr(high, low, close, window=14, tr=None):
+    """Wilder ATR per column, matching ta.volatility.AverageTrueRange (zeros during warm-up); `tr` reuses a true range"""
+    n_rows = close.shape[0]
+    first = first_valid_rows(close)
+    if tr is None:
+        tr = batch_true_range(high, low, close)
+    csum = np.nancumsum(tr, axis=0)
+    window_sum = csum.copy()
+    window_sum[window:] -= csum[:-window]
+
+    atr = np.full_like(close, np.nan)
+    if close.shape[1] == 1:
+        # One series: a float loop beats per-bar array calls
+        start, prev, column, tr_col, sums = int(first[0]), 0.0, atr[:, 0], tr[:, 0].tolist(), window_sum[:, 0]
+        for t in range(start, n_rows):
+            k = t - start
+            prev = (prev * (window - 1) + tr_col[t]) / window if k >= window else \
+                float(sums[t]) / window if k == window - 1 else 0.0
+            column[t] = prev
+        return atr
+    prev = np.zeros(close.shape[1])
+    for t in range(n_rows):
+        k = t - first
+        seeded = np.where(k == window - 1, window_sum[t] / window, 0.0)
+        smoothed = (prev * (window - 1) + tr[t]) / window
+        prev = np.where(k >= window, smoothed, seeded)
+        atr[t] = np.where(k >= 0, prev, np.nan)
+    return atr
+
+
+def batch_rolling_mean_std(values, window):
+    """Rolling mean and population std (ddof=0); NaN until a full window is available"""
+    ref = np.nan_to_num(values[first_valid_rows(values).clip(max=values.shape[0] - 1), np.arange(values.shape[1])])
+    centred = np.nan_to_num(values - ref)
+    valid = (~np.isnan(values)).astype(np.int64)
+
+    def window_sums(x):
+        c = np.cumsum(x, axis=0)
+        out = c.copy()
+        out[window:] -= c[:-window]
+        return out
+
+    count = window_sums(valid)
+    s1 = window_sums(centred)
+    s2 = window_sums(centred * centred)
+    full = count == window
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1 / window
+        var = np.maximum(s2 / window - mean * mean, 0.0)
+    return np.where(full, mean + ref, np.nan), np.where(full, np.sqrt(var), np.nan)
+
+
+def batch_bollinger(close, window=20, window_dev=2):
+    middle, std = batch_rolling_mean_std(close, window)
+    return middle + window_dev * std, middle, middle - window_dev * std
+
+
+def batch_supertrend(high, low, close, period=10, multiplier=3, tr=None):
+    """SuperTrend line and direction (+1/-1, 0 before start) per column, as in calculate_supertrend"""
+    n_rows, n_cols = close.shape
+    first = first_valid_rows(close)
+    atr = batch_atr(high, low, close, window=period, tr=tr)
+    hl2 = (high + low) / 2
+    upper = hl2 + multiplier * atr
+    lower = hl2 - multiplier * atr
+
+    line = np.full_like(close, np.nan)
+    trend = np.zeros((n_rows, n_cols), dtype=np.int8)
+    prev_line = np.full(n_cols, np.nan)
+    prev_trend = np.zeros(n_cols, dtype=np.int8)
+    for t in range(n_rows):
+        k = t - first
+        c, up_b, lo_b = close[t], upper[t], lower[t]
+        init_trend = np.where(c > up_b, 1, -1)
+        init_line = np.where(c > up_b, lo_b, up_b)
+        was_up = prev_trend == 1
+        cont_trend = np.where(was_up, np.where(c < lo_b, -1, 1), np.where(c > up_b, 1, -1))
+        cont_line = np.where(
+            was_up,
+            np.where(c < lo_b, up_b, np.fmax(lo_b, prev_line)),
+            np.where(c > up_b, lo_b, np.fmin(up_b, prev_line)),
+        )
+        prev_trend = np.where(k > period, cont_trend, np.where(k == period, init_trend, 0)).astype(np.int8)
+        prev_line = np.where(k > period, cont_line, np.where(k == period, init_line, np.nan))
+        trend[t] = prev_trend
+        line[t] = prev_line
+    return line, trend
+
+
+def batch_psar(high, low, close, step=0.02, max_step=0.2):
+    """Parabolic SAR per column using the positional ta.trend.PSARIndicator algorithm"""
+    return psar_kernel.psar(high, low, close, step, max_step)["sar"]
+
+
+def compute_batch_arrays(aligned, st_period=10, st_multiplier=3, rsi_period=14, rsi_ma_period=9,
+                         bb_period=20, bb_dev=2, psar_step=0.02, psar_max_step=0.2, atr_window=14):
+    """Every indicator series as (T, N) arrays for an aligned OHLCV matrix"""
+    high, low, close = aligned["High"], aligned["Low"], aligned["Close"]
+    rsi = batch_rsi(close, rsi_period)
+    rsi_ma, _ = batch_rolling_mean_std(rsi, rsi_ma_period)
+    bb_upper, bb_middle, bb_lower = batch_bollinger(close, bb_period, bb_dev)
+    tr = batch_true_range(high, low, close)
+    supertrend, supertrend_dir = batch_supertrend(high, low, close, st_period, st_multiplier, tr)
+    sar = psar_kernel.psar(high, low, close, psar_step, psar_max_step)
+    return {
+        "rsi": rsi,
+        "rsi_ma": rsi_ma,
+        "atr": batch_atr(high, low, close, atr_window, tr),
+        "bb_upper": bb_upper,
+        "bb_middle": bb_middle,
+        "bb_lower": bb_lower,
+        "supertrend": supertrend,
+        "supertrend_dir": supertrend_dir,
+        "psar": sar["sar"],
+        "psar_since_flip": sar["bars_since_flip"],
+    }
+
+
+# --- PER-SYMBOL RESULTS ---
+def _error(detail="Insufficient data"):
+    return {"status": "Error", "value": None, "detail": detail}
+
+
+def summarize(aligned, arrays, demo_mode=False, st_period=10, rsi_period=14, rsi_ma_period=9, bb_period=20,
+              adaptive=True):
+    """Per-symbol indicator dicts shaped like calculate_all_indicators output; `adaptive` False keeps 70/30 and pct 20"""
+    close = aligned["Close"]
+    n_rows = close.shape[0]
+    bars = n_rows - first_valid_rows(close)
+    last_close = close[-1]
+
+    regimes = regime_kernel.latest_regimes(close, arrays["atr"], aligned["symbols"])
+    levels = [regime_kernel.thresholds(v, t) if adaptive else regime_kernel.thresholds()
+              for v, t in zip(regimes["volatility"], regimes["trend"])]
+    squeeze_pct = np.array([level["squeeze_pct"] for level in levels], dtype=float)
+
+    # Bollinger squeeze: the regime's percentile of historical widths once 100+ widths exist
+    with np.errstate(invalid="ignore", divide="ignore"):
+        widths = (arrays["bb_upper"] - arrays["bb_lower"]) / arrays["bb_middle"]
+    width_rows = np.arange(n_rows)[:, None] >= (n_rows - bars + bb_period)[None, :]
+    hist_widths = np.where(width_rows, widths, np.nan)
+    width_counts = np.sum(~np.isnan(hist_widths), axis=0)
+    enough = width_counts >= 100
+    squeeze_width = np.full(close.shape[1], np.nan)
+    for pct in np.unique(squeeze_pct[enough]):
+        cols = enough & (squeeze_pct == pct)
+        squeeze_width[cols] = np.nanpercentile(hist_widths[:, cols], pct, axis=0)
+
+    psar = arrays["psar"]
+    reversal = psar_kernel.close_crossings(close, psar) if n_rows > 2 else np.zeros(close.shape[1], dtype=bool)
+
+    results = {}
+    for j, symbol in enumerate(aligned["symbols"]):
+        n_bars = int(bars[j])
+        row = regimes.iloc[j]
+        data = {"regime": {**row.to_dict(), "label": regime_kernel.label(row["volatility"], row["trend"]),
+                           "thresholds": levels[j]}}
+
+        if n_bars < st_period:
+            data["trend"] = _error()
+        else:
+            trend = "Bullish" if arrays["supertrend_dir"][-1, j] == 1 else "Bearish"
+            value = arrays["supertrend"][-1, j]
+            data["trend"] = {
+                "status": trend,
+                "value": value,
+                "detail": f"SuperTrend line at ${format_price(value)}" if not demo_mode else "SuperTrend: " + trend,
+            }
+
+        if n_bars < rsi_period + rsi_ma_period:
+            data["momentum"] = _error()
+        else:
+            rsi = arrays["rsi"][-1, j]
+            rsi_ma = arrays["rsi_ma"][-1, j]
+            divergence = "No Divergence"
+            if n_bars > 30:
+                divergence = divergence_kernel.divergence_label(close[:, j], arrays["rsi"][:, j])
+            overbought, oversold = levels[j]["overbought"], levels[j]["oversold"]
+            status = "Overbought" if rsi > overbought else "Oversold" if rsi < oversold else "Neutral"
+            bands = "" if (overbought, oversold) == (70, 30) else f" ({oversold}/{overbought})"
+            data["momentum"] = {
+                "status": status,
+                "value": rsi,
+                "detail": f"RSI: {status}" if demo_mode else f"RSI: {rsi:.2f}{bands} | MA: {rsi_ma:.2f} | {divergence}",
+            }
+
+        if n_bars < bb_period:
+            data["volatility"] = _error()
+        else:
+            upper, middle, lower = arrays["bb_upper"][-1, j], arrays["bb_middle"][-1, j], arrays["bb_lower"][-1, j]
+            band_width = widths[-1, j]
+            is_squeeze = bool(enough[j] and band_width <= squeeze_width[j])
+            c = last_close[j]
+            position = "Above Upper Band" if c > upper else "Below Lower Band" if c < lower else "Within Bands"
+            if is_squeeze:
+                status = "Squeeze"
+                detail = "🔥 SQUEEZE DETECTED" if demo_mode else f"🔥 SQUEEZE! {position} | Width: {band_width:.3f}"
+            else:
+                status = "Normal"
+                detail = f"Bollinger: {position}" if demo_mode else f"{position} | Upper: ${format_price(upper)} | Mid: ${format_price(middle)} | Lower: ${format_price(lower)}"
+            data["volatility"] = {
+                "status": status, "value": band_width, "detail": detail, "is_squeeze": is_squeeze,
+                "upper": upper, "middle": middle, "lower": lower, "position": position,
+                "regime": data["regime"]["label"],
+            }
+
+        if n_bars < 10:
+            data["reversal"] = _error()
+        else:
+            sar = psar[-1, j]
+            if last_close[j] > sar:
+                status = "Bullish"
+                detail = "SAR: Bullish" if demo_mode else f"SAR at ${format_price(sar)} — Below price"
+            else:
+                status = "Bearish"
+                detail = "SAR: Bearish" if demo_mode else f"SAR at ${format_price(sar)} — Above price"
+            is_reversal = bool(reversal[j])
+            if is_reversal:
+                detail += " | ⚠️ REVERSAL" if demo_mode else " | ⚠️ REVERSAL!"
+            data["reversal"] = {"status": status, "value": sar, "detail": detail, "is_reversal": is_reversal,
+                                "bars_since_flip": int(arrays["psar_since_flip"][-1, j])}
+
+        data["atr"] = arrays["atr"][-1, j] if n_bars >= 14 else None
+        results[symbol] = data
+    return results
+
+
+def calculate_batch_indicators(frames, demo_mode=False):
+    """{symbol: OHLCV frame} -> {symbol: indicator dict usable by determine_overall_bias}"""
+    if not frames:
+        return {}
+    aligned = align_ohlcv(frames)
+    return summarize(aligned, compute_batch_arrays(aligned), demo_mode=demo_mode)
@@ -0,0 +1,52 @@
+"""Load selected functions from streamlit_app.py without running the page.
+
+Benchmarks compare new code paths against the app's own implementations.
+Importing streamlit_app executes the whole dashboard, so instead the module
+source is parsed and only the requested top-level functions are compiled,
+together with its imports and literal constants (DEMO_MODE, ...).
+Streamlit decorators are dropped, so cached fetchers run uncached.
+"""
+import ast
+import os
+import sys
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "streamlit_app.py")
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def _is_literal(node):
+    try:
+        ast.literal_eval(node)
+        return True
+    except ValueError:
+        return False
+
+
+def load_app_functions(*names, **overrides):
+    """Return a namespace holding the named functions from streamlit_app.py"""
+    with open(APP_PATH) as f:
+        tree = ast.parse(f.read(), APP_PATH)
+
+    body = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if not any(alias.name == "streamlit" for alias in node.names):
+                body.append(node)
+        elif isinstance(node, ast.Assign) and _is_literal(node.value):
+            body.append(node)
+        elif isinstance(node, ast.FunctionDef) and node.name in names:
+            node.decorator_list = []
+            body.append(node)
+
+    missing = set(names) - {n.name for n in body if isinstance(n, ast.FunctionDef)}
+    if missing:
+        raise NameError(f"streamlit_app.py defines no function(s): {', '.join(sorted(missing))}")
+
+    namespace = {"__name__": "streamlit_app_functions", "st": types.SimpleNamespace(error=lambda *a, **k: None)}
+    exec(compile(ast.Module(body=body, type_ignores=[]), APP_PATH, "exec"), namespace)
+    namespace.update(overrides)
+    return types.SimpleNamespace(**{k: v for k, v in namespace.items() if not k.startswith("__")})
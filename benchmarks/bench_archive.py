@@ -0,0 +1,88 @@
+"""Multi-year candle archive: build, append, and range reads over many symbols.
+
+Writes N symbols of hourly bars to a temporary archive, then reads a 30-day
+window and a one-year window for every symbol and runs the batched
+indicators over them. Resident memory growth (Linux /proc) is reported next
+to the archive size to show that reads only touch the pages they slice. The
+kernel maps page-cache pages around every fault, so each touched spot costs
+up to a couple of MB of reclaimable file-backed RSS whatever the file size.
+
+    $ python benchmarks/bench_archive.py --symbols 100 --years 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive
+import batch_indicators
+import candles
+
+HOUR_MS = 3_600_000
+END_MS = 1_717_200_000_000
+
+
+def synthetic_store(seed, n_bars):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.005, n_bars)) * close
+    timestamps = END_MS - HOUR_MS * np.arange(n_bars)[::-1]
+    return candles.CandleStore.from_arrays(
+        timestamps, open_, np.maximum(open_, close) + spread, np.minimum(open_, close) - spread,
+        close, rng.uniform(1e6, 1e7, n_bars),
+    )
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--years", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    n_bars = args.years * 365 * 24
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+
+    with tempfile.TemporaryDirectory() as root:
+        store = archive.CandleArchive(root)
+        started = time.perf_counter()
+        for i, symbol in enumerate(symbols):
+            full = synthetic_store(i, n_bars)
+            store.append(symbol, full.window(0, n_bars - 24))
+            store.append(symbol, full.tail(25))  # overlaps the last stored bar
+        write_s = time.perf_counter() - started
+
+        check = store.open(symbols[-1], "1h")
+        expected = synthetic_store(args.symbols - 1, n_bars)
+        assert len(check) == n_bars and np.array_equal(check.timestamps, expected.timestamps)
+        assert np.array_equal(check.values, expected.values)
+
+        size_mb = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files) / 2**20
+        print(f"archive: {args.symbols} symbols x {n_bars} bars, {size_mb:.0f}MB on disk, written in {write_s:.2f}s")
+
+        del full, check, expected
+        for label, days in (("30 days", 30), ("1 year", 365)):
+            rss_before = rss_mb()
+            started = time.perf_counter()
+            stores = store.read_many(symbols, "1h", start=END_MS - days * 24 * HOUR_MS)
+            read_s = time.perf_counter() - started
+            results = batch_indicators.calculate_batch_indicators(stores)
+            total_s = time.perf_counter() - started
+            sliced_mb = sum(s.nbytes for s in stores.values()) / 2**20
+            print(f"{label:>8}: read {len(stores)} series ({sliced_mb:.0f}MB sliced) in {read_s * 1000:.1f}ms, "
+                  f"indicators in {total_s:.2f}s, RSS +{rss_mb() - rss_before:.0f}MB")
+            del stores, results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Candle integrity pass and targeted backfill vs refetching whole histories.
+
+Part 1 times `integrity.inspect` + `clean` on a long hourly series with
+candles dropped, duplicated and swapped. Part 2 points the app's sources
+at a stub that leaves `--drop-rate` of the OHLC candles out and sends
+`--duplicate-rate` of them twice. The candles for each symbol are fetched
+`--refreshes` times, as the prefetcher would. With backfill, only the
+missing bars are requested from the exchange range endpoint, once per hole.
+The stub's holes are the same on every response, as a provider's are, so
+refetching the whole history never repairs them. The stub's CoinGecko
+volume is a rolling 24h sum, and its exchange volume is per bar, as the real
+providers' are. The range source is run with `volume=False`, as the app
+does. The repaired series must equal an undamaged fetch in OHLC, and every
+filled bar's volume must be marked missing. The bench also prints how far
+off the exchange volume would have been.
+
+    $ python benchmarks/bench_backfill.py --drop-rate 0.05 --duplicate-rate 0.03 --refreshes 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import candles
+import datasources
+import integrity
+import stub_server
+from bench_archive import HOUR_MS, synthetic_store
+
+
+def damaged_timestamps(n, rng):
+    ts = np.arange(1, n + 1, dtype=np.int64) * HOUR_MS
+    keep = rng.random(n) > 0.02
+    keep[[0, -1]] = True
+    ts = ts[keep]
+    dup = rng.choice(len(ts), len(ts) // 100, replace=False)
+    ts = np.insert(ts, dup, ts[dup])
+    swap = rng.choice(len(ts) - 1, len(ts) // 200, replace=False)
+    ts[swap], ts[swap + 1] = ts[swap + 1], ts[swap].copy()
+    return ts
+
+
+def wait_for_fills(backfiller, timeout=5.0):
+    """Block until every queued range request has landed or failed"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = backfiller.stats()
+        if stats["completed"] + stats["failures"] >= stats["requests"]:
+            return
+        time.sleep(0.005)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--drop-rate", type=float, default=0.05)
+    parser.add_argument("--duplicate-rate", type=float, default=0.03)
+    parser.add_argument("--refreshes", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    n = args.years * 365 * 24
+    ts = damaged_timestamps(n, rng)
+    store = candles.CandleStore.from_arrays(ts, *synthetic_store(1, len(ts)).values)
+    started = time.perf_counter()
+    report = integrity.inspect(store.timestamps, HOUR_MS)
+    cleaned = integrity.clean(store)
+    elapsed = time.perf_counter() - started
+    print(f"{len(ts):,} hourly bars: {report['out_of_order']} out of order, {report['duplicates']} duplicates, "
+          f"{len(report['gaps'])} gaps / {report['missing']} missing bars found and cleaned in {elapsed * 1000:.1f}ms")
+    assert integrity.inspect(cleaned.timestamps, HOUR_MS)["duplicates"] == 0
+
+    server = stub_server.StubServer(drop_rate=args.drop_rate, duplicate_rate=args.duplicate_rate, seed=3).start()
+    try:
+        coingecko = datasources.CoinGeckoSource(server.api_base, coin_id=stub_server.EXCHANGE_SYMBOLS.get)
+        exchange = datasources.ExchangeSource(server.api_base)
+        backfiller = integrity.Backfiller(exchange.fetch_range, volume=False)
+        interval = datasources.coingecko_candle_ms(30)
+        symbols = list(stub_server.EXCHANGE_SYMBOLS)
+        missing_after, per_refresh = {}, []
+        for refresh in range(args.refreshes):
+            before = backfiller.stats()["requests"]
+            for symbol in symbols:
+                fetched = coingecko.fetch_candles(symbol, 30)
+                backfiller.submit(symbol, fetched, interval)
+                wait_for_fills(backfiller)
+                merged = backfiller.apply(symbol, fetched, interval)
+                missing_after[symbol] = integrity.inspect(merged.timestamps, interval)["missing"]
+            per_refresh.append(backfiller.stats()["requests"] - before)
+        counts = server.request_counts()
+
+        server.drop_rate = server.duplicate_rate = 0.0
+        exact, volume_ok, scale = True, True, []
+        for symbol in symbols:
+            clean = coingecko.fetch_candles(symbol, 30)
+            server.drop_rate, server.duplicate_rate = args.drop_rate, args.duplicate_rate
+            fetched = coingecko.fetch_candles(symbol, 30)
+            repaired = backfiller.apply(symbol, fetched, interval)
+            server.drop_rate = server.duplicate_rate = 0.0
+            exact &= np.array_equal(clean.timestamps, repaired.timestamps) and np.array_equal(clean.values[:4], repaired.values[:4])
+            filled = ~np.isin(repaired.timestamps, fetched.timestamps)
+            volume_ok &= bool(np.isnan(repaired.volume[filled]).all())
+            volume_ok &= np.array_equal(clean.volume[~filled], repaired.volume[~filled], equal_nan=True)
+            klines = exchange.fetch_range(symbol, interval, int(clean.timestamps[1]), int(clean.timestamps[-1]))
+            same = np.isin(clean.timestamps, klines.timestamps)
+            scale.append(np.nanmedian(clean.volume[same] / klines.volume))
+        fills = backfiller.stats()
+        print(f"{len(symbols)} symbols x {args.refreshes} refreshes, {args.drop_rate:.0%} candles dropped, "
+              f"{args.duplicate_rate:.0%} duplicated")
+        print(f"backfill: {fills['requests']} range requests ({counts.get('klines', 0)} served, per refresh "
+              f"{per_refresh}) filled {fills['filled']} bars; still missing after the last refresh: {missing_after}")
+        print(f"refetching whole histories: {counts.get('coins/{id}/ohlc', 0)} ohlc requests already made, "
+              f"and every one came back with the same holes")
+        print(f"repaired OHLC matches an undamaged fetch: {exact}; filled bars' volume marked missing: {volume_ok}")
+        print(f"CoinGecko bar volume / exchange bar volume, median: {np.median(scale):.0f}x "
+              f"(what mixing the two would have put in the filled bars)")
+    finally:
+        server.stop()
+        backfiller.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Per-symbol calculate_* loop vs the batched NumPy engine.
+
+    $ python benchmarks/bench_batch_indicators.py --symbols 500 --days 30
+"""
+import argparse
+import time
+
+import pandas as pd
+from ta.volatility import AverageTrueRange
+
+from _app_functions import load_app_functions
+
+import batch_indicators
+import stub_server
+
+
+def synthetic_frames(n_symbols, days):
+    frames = {}
+    for i in range(n_symbols):
+        coin_id = f"coin-{i}"
+        df = pd.DataFrame(stub_server.synthetic_ohlc(coin_id, days), columns=['timestamp', 'Open', 'High', 'Low', 'Close'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        frames[coin_id] = df.set_index('timestamp')
+    return frames
+
+
+def per_symbol(app, frames):
+    results = {}
+    for symbol, df in frames.items():
+        market_regime = app.calculate_regime(df)
+        results[symbol] = {
+            "regime": market_regime,
+            "trend": app.calculate_supertrend(df),
+            "momentum": app.calculate_rsi_with_divergence(df, market_regime=market_regime),
+            "volatility": app.calculate_bollinger_bands(df, market_regime=market_regime),
+            "reversal": app.calculate_parabolic_sar(df),
+            "atr": AverageTrueRange(high=df['High'], low=df['Low'], close=df['Close'], window=14).average_true_range().iloc[-1],
+        }
+    return results
+
+
+def compare(app, reference, batched, frames):
+    mismatches = {"regime": 0, "trend": 0, "momentum": 0, "divergence": 0, "volatility": 0, "reversal": 0, "bias": 0}
+    max_rel = {"supertrend": 0.0, "rsi": 0.0, "bb_width": 0.0, "atr": 0.0, "psar": 0.0}
+    for symbol, df in frames.items():
+        ref = reference[symbol]
+        new = batched[symbol]
+        mismatches["regime"] += ref["regime"]["label"] != new["regime"]["label"]
+        for key in ("trend", "momentum", "volatility", "reversal"):
+            mismatches[key] += ref[key]["status"] != new[key]["status"]
+        mismatches["divergence"] += ref["momentum"]["detail"].split(" | ")[-1] != new["momentum"]["detail"].split(" | ")[-1]
+        mismatches["bias"] += app.determine_overall_bias(ref) != app.determine_overall_bias(new)
+        for name, key in (("supertrend", "trend"), ("rsi", "momentum"), ("bb_width", "volatility"), ("psar", "reversal")):
+            a, b = ref[key]["value"], new[key]["value"]
+            max_rel[name] = max(max_rel[name], abs(a - b) / max(abs(a), 1e-12))
+        max_rel["atr"] = max(max_rel["atr"], abs(ref["atr"] - new["atr"]) / max(abs(ref["atr"]), 1e-12))
+    return mismatches, max_rel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    app = load_app_functions(
+        "calculate_supertrend", "calculate_rsi_with_divergence", "calculate_bollinger_bands",
+        "calculate_parabolic_sar", "calculate_volume_profile", "calculate_true_range", "calculate_atr_series",
+        "calculate_rsi_series", "calculate_regime", "find_swing_points", "vote_trend", "vote_momentum", "vote_reversal", "vote_squeeze",
+        "get_indicator_registry", "determine_overall_bias", DEMO_MODE=False,
+    )
+    frames = synthetic_frames(args.symbols, args.days)
+    bars = len(next(iter(frames.values())))
+    print(f"{args.symbols} symbols x {bars} bars")
+
+    started = time.perf_counter()
+    reference = per_symbol(app, frames)
+    loop_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = batch_indicators.calculate_batch_indicators(frames)
+    batch_s = time.perf_counter() - started
+
+    print(f"per-symbol loop : {loop_s:8.3f}s  ({args.symbols / loop_s:8.1f} symbols/s)")
+    print(f"batched engine  : {batch_s:8.3f}s  ({args.symbols / batch_s:8.1f} symbols/s)")
+    print(f"speedup         : {loop_s / batch_s:8.1f}x")
+
+    mismatches, max_rel = compare(app, reference, batched, frames)
+    print("status mismatches:", mismatches)
+    print("max relative diff:", {k: f"{v:.2e}" for k, v in max_rel.items()})
+
+
+if __name__ == "__main__":
+    main()
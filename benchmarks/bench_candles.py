@@ -0,0 +1,84 @@
+"""Memory per symbol: cached float64 DataFrames vs CandleStore.
+
+The old path cached the OHLC frame and the volume frame per symbol and built
+a merged OHLCV copy on every call. The new path caches one CandleStore.
+Bytes are measured with tracemalloc while N symbols are held, so pandas
+object overhead counts too. The batched indicators are also checked to give
+the same statuses from float32 stores as from float64 frames.
+
+    $ python benchmarks/bench_candles.py --symbols 1000 --days 30 365
+"""
+import argparse
+import gc
+import tracemalloc
+
+import os
+import sys
+
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_indicators
+import candles
+import datasources
+import decode
+import stub_server
+
+
+def fetch_frames(coin_id, days):
+    ohlc = decode.ohlc_frame(orjson.dumps(stub_server.synthetic_ohlc(coin_id, days)))
+    volume = decode.volume_frame(orjson.dumps(stub_server.synthetic_market_chart(coin_id, days)))
+    return ohlc, volume
+
+
+def held_bytes(build, n_symbols):
+    """Bytes still allocated after building and holding n_symbols results"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [build(i) for i in range(n_symbols)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return after - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365])
+    args = parser.parse_args(argv)
+
+    print(f"{'days':>5} {'bars':>6} {'frames B/sym':>13} {'store B/sym':>12} {'ratio':>6} {'status mismatches':>18}")
+    for days in args.days:
+        raw = {i: fetch_frames(f"coin-{i}", days) for i in range(args.symbols)}
+
+        def legacy(i):
+            ohlc, volume = raw[i]
+            ohlc, volume = ohlc.copy(), volume.copy()
+            return ohlc, volume, datasources.merge_ohlc_with_volume(ohlc, volume).copy()
+
+        def compact(i):
+            ohlc, volume = raw[i]
+            return candles.CandleStore.from_frame(datasources.merge_ohlc_with_volume(ohlc, volume))
+
+        legacy_bytes = held_bytes(legacy, args.symbols) / args.symbols
+        store_bytes = held_bytes(compact, args.symbols) / args.symbols
+
+        merged = {f"coin-{i}": datasources.merge_ohlc_with_volume(*raw[i]) for i in range(min(args.symbols, 200))}
+        stores = {symbol: candles.CandleStore.from_frame(df) for symbol, df in merged.items()}
+        reference = batch_indicators.calculate_batch_indicators(merged)
+        compact_results = batch_indicators.calculate_batch_indicators(stores)
+        mismatches = sum(
+            reference[s][k]["status"] != compact_results[s][k]["status"]
+            for s in reference for k in ("trend", "momentum", "volatility", "reversal")
+        )
+
+        bars = len(raw[0][0])
+        print(f"{days:>5} {bars:>6} {legacy_bytes:>13,.0f} {store_bytes:>12,.0f} "
+              f"{legacy_bytes / store_bytes:>5.1f}x {mismatches:>18}")
+
+
+if __name__ == "__main__":
+    main()
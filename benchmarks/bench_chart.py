@@ -0,0 +1,79 @@
+"""Price chart payload and build time: full history vs server-side downsampling.
+
+Builds the chart for a long synthetic hourly history at every zoom level,
+once from the raw series and once reduced to `--points`. It reports the
+Vega-Lite spec size that would go to the browser, the time to build it, and
+the cached rebuild. The reduced candles must keep the exact highest high
+and lowest low of each view.
+
+    $ python benchmarks/bench_chart.py --years 5 --points 600
+"""
+import argparse
+import os
+import sys
+import time
+
+import altair as alt
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_indicators
+import chart
+from bench_archive import HOUR_MS, synthetic_store
+
+ZOOMS = {"1M": 30, "1Y": 365, "All": None}
+
+
+def overlays_for(store):
+    arrays = batch_indicators.compute_batch_arrays(batch_indicators.align_ohlcv({"x": store}))
+    overlays = {k: arrays[k][:, 0] for k in ("supertrend", "supertrend_dir", "bb_upper", "bb_middle", "bb_lower", "psar")}
+    overlays["psar_up"] = overlays["psar"] < store.close
+    return overlays
+
+
+def build(store, overlays, lo, max_points):
+    data = chart.downsample(
+        store.timestamps[lo:], [store[f][lo:] for f in ("Open", "High", "Low", "Close")],
+        {k: v[lo:] for k, v in overlays.items()}, max_points,
+    )
+    return data, chart.price_chart(data).to_json(indent=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--points", type=int, default=600)
+    args = parser.parse_args(argv)
+
+    store = synthetic_store(3, args.years * 365 * 24)
+    started = time.perf_counter()
+    overlays = overlays_for(store)
+    print(f"{len(store)} hourly bars, overlays computed once in {time.perf_counter() - started:.2f}s")
+
+    cache = chart.ChartCache()
+    last = int(store.timestamps[-1])
+    for zoom, days in ZOOMS.items():
+        lo = 0 if days is None else int(np.searchsorted(store.timestamps, last - days * 24 * HOUR_MS))
+        started = time.perf_counter()
+        with alt.data_transformers.disable_max_rows():  # Altair refuses > 5000 rows by default
+            _, full_spec = build(store, overlays, lo, len(store))
+        full_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        data = cache.get(zoom, lambda: build(store, overlays, lo, args.points)[0])
+        reduced_spec = chart.price_chart(data).to_json(indent=None)
+        reduced_s = time.perf_counter() - started
+        started = time.perf_counter()
+        chart.price_chart(cache.get(zoom, lambda: None)).to_json(indent=None)
+        cached_s = time.perf_counter() - started
+
+        candles = data["candles"]
+        assert candles["High"].max() == store.high[lo:].max() and candles["Low"].min() == store.low[lo:].min()
+        print(f"{zoom:>4}: {len(store) - lo:6d} bars -> {len(candles):4d} candles | spec "
+              f"{len(full_spec) / 2**20:6.2f}MB -> {len(reduced_spec) / 2**10:6.0f}KB | build "
+              f"{full_s * 1000:7.0f}ms -> {reduced_s * 1000:5.0f}ms (cached {cached_s * 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Legacy json -> DataFrame decoding vs decode.py on large OHLC / market_chart payloads.
+
+    $ python benchmarks/bench_decode.py --rows 8760 43800 105120
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import decode
+
+
+def make_payloads(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = 1_500_000_000_000 + 3_600_000 * np.arange(n_rows)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+    ohlc = [[int(t), float(c * 0.999), float(c * 1.01), float(c * 0.99), float(c)] for t, c in zip(ts, close)]
+    volumes = rng.lognormal(20, 0.5, n_rows)
+    chart = {
+        "prices": [[int(t), float(c)] for t, c in zip(ts, close)],
+        "market_caps": [[int(t), float(c * 2e7)] for t, c in zip(ts, close)],
+        "total_volumes": [[int(t), float(v)] for t, v in zip(ts, volumes)],
+    }
+    return json.dumps(ohlc, separators=(",", ":")).encode(), json.dumps(chart, separators=(",", ":")).encode()
+
+
+# The pre-decode.py pipeline of the app's original CoinGecko OHLC / volume fetchers
+def legacy_ohlc(content):
+    data = json.loads(content)
+    df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df = df.set_index('timestamp')
+    df = df.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'})
+    return df.sort_index()
+
+
+def legacy_volume(content):
+    data = json.loads(content)
+    df_volume = pd.DataFrame(data['total_volumes'], columns=['timestamp', 'Volume'])
+    df_volume['timestamp'] = pd.to_datetime(df_volume['timestamp'], unit='ms')
+    return df_volume.set_index('timestamp')
+
+
+def best_of(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[8760, 43800, 105120])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"orjson fallback available: {decode.orjson is not None}")
+    print(f"{'payload':<14} {'rows':>7} {'size':>8} {'legacy':>9} {'decode':>9} {'speedup':>8}")
+    for n_rows in args.rows:
+        ohlc_bytes, chart_bytes = make_payloads(n_rows)
+        for name, payload, old, new in (
+            ("ohlc", ohlc_bytes, legacy_ohlc, decode.ohlc_frame),
+            ("market_chart", chart_bytes, legacy_volume, decode.volume_frame),
+        ):
+            old_s, old_df = best_of(old, payload, args.repeat)
+            new_s, new_df = best_of(new, payload, args.repeat)
+            pd.testing.assert_frame_equal(old_df, new_df, check_freq=False)
+            print(f"{name:<14} {n_rows:>7} {len(payload) / 2**20:>6.1f}MB {old_s * 1000:>7.1f}ms {new_s * 1000:>7.1f}ms {old_s / new_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
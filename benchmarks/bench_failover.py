@@ -0,0 +1,80 @@
+"""Hedged, failover market data vs a single CoinGecko source.
+
+Two local stubs stand in for CoinGecko (primary) and an exchange (backup).
+The primary answers most requests quickly but a `--tail-rate` share takes
+`--tail-ms` longer. Phase 1 compares candle fetch latency from the primary
+alone with `MarketData` hedging after the primary's p95. Phase 2 takes the
+primary down and shows the circuit breaker routing straight to the backup.
+
+    $ python benchmarks/bench_failover.py --requests 300 --tail-ms 1500 --tail-rate 0.03
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datasources
+import stub_server
+
+
+def percentiles(samples):
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return f"p50 {p50:7.1f}ms  p95 {p95:7.1f}ms  p99 {p99:7.1f}ms  max {max(samples) * 1000:7.1f}ms"
+
+
+def timed_fetches(fetch, n):
+    samples = []
+    for i in range(n):
+        started = time.perf_counter()
+        fetch(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--tail-ms", type=float, default=1500)
+    parser.add_argument("--tail-rate", type=float, default=0.03)
+    args = parser.parse_args(argv)
+
+    primary = stub_server.StubServer(latency_ms=args.latency_ms, tail_latency_ms=args.tail_ms,
+                                     tail_rate=args.tail_rate, seed=1).start()
+    backup = stub_server.StubServer(latency_ms=args.latency_ms * 1.5).start()
+    symbols = list(stub_server.EXCHANGE_SYMBOLS)
+    coin_id = stub_server.EXCHANGE_SYMBOLS.get
+    try:
+        coingecko = datasources.CoinGeckoSource(primary.api_base, coin_id=coin_id)
+        exchange = datasources.ExchangeSource(backup.api_base)
+        for symbol in symbols:  # warm the stubs' synthetic series
+            coingecko.fetch_candles(symbol), exchange.fetch_candles(symbol)
+
+        single = timed_fetches(lambda i: coingecko.fetch_candles(symbols[i % 3]), args.requests)
+        market = datasources.MarketData([coingecko, exchange])
+        served = []
+        hedged = timed_fetches(lambda i: served.append(market.fetch("fetch_candles", symbols[i % 3])[1]), args.requests)
+
+        print(f"{args.requests} candle fetches, primary {args.latency_ms:.0f}ms + {args.tail_ms:.0f}ms on "
+              f"{args.tail_rate:.0%} of requests")
+        print(f"primary only : {percentiles(single)}")
+        print(f"hedged       : {percentiles(hedged)}")
+        print(f"hedged requests: {market.hedges} ({market.hedges / args.requests:.1%}), "
+              f"answered by backup: {served.count('exchange')}")
+
+        primary.stop()
+        outage = timed_fetches(lambda i: market.fetch("fetch_candles", symbols[i % 3]), 20)
+        health = market.health()
+        print(f"primary down : first fetch {outage[0] * 1000:.1f}ms, then {percentiles(outage[5:])}")
+        print(f"breakers     : { {name: h['state'] for name, h in health.items()} }")
+    finally:
+        backup.stop()
+        market.shutdown()
+
+
+if __name__ == "__main__":
+    main()
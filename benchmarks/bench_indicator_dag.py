@@ -0,0 +1,100 @@
+"""Indicator graph vs independent calculate_* calls, sequential and threaded.
+
+The baseline is what a rerun did before the registry: every indicator
+computed its own ATR/RSI, and the trade plan recomputed the 14-bar ATR and
+the swing levels. The graph computes each intermediate once. Both paths must
+produce the same statuses, values and bias.
+
+    $ python benchmarks/bench_indicator_dag.py --symbols 50 --days 30
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from ta.volatility import AverageTrueRange
+
+from _app_functions import load_app_functions
+
+import stub_server
+
+APP_FUNCTIONS = (
+    "calculate_supertrend", "calculate_rsi_with_divergence", "calculate_bollinger_bands", "calculate_parabolic_sar",
+    "calculate_volume_profile", "calculate_true_range", "calculate_atr_series", "calculate_rsi_series",
+    "calculate_regime", "find_swing_points", "vote_trend", "vote_momentum", "vote_reversal", "vote_squeeze", "get_indicator_registry",
+    "determine_overall_bias",
+)
+
+
+def synthetic_frames(n_symbols, days):
+    frames = {}
+    for i in range(n_symbols):
+        coin_id = f"coin-{i}"
+        df = pd.DataFrame(stub_server.synthetic_ohlc(coin_id, days), columns=['timestamp', 'Open', 'High', 'Low', 'Close'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        frames[coin_id] = df.set_index('timestamp').assign(Volume=1e6)
+    return frames
+
+
+def independent(app, df):
+    market_regime = app.calculate_regime(df)
+    return {
+        "trend": app.calculate_supertrend(df, atr=AverageTrueRange(df['High'], df['Low'], df['Close'], 10).average_true_range()),
+        "momentum": app.calculate_rsi_with_divergence(df, market_regime=market_regime),
+        "volatility": app.calculate_bollinger_bands(df, market_regime=market_regime),
+        "reversal": app.calculate_parabolic_sar(df),
+        "liquidity": app.calculate_volume_profile(df),
+        "atr": AverageTrueRange(df['High'], df['Low'], df['Close'], 14).average_true_range().iloc[-1],
+        "swing_points": app.find_swing_points(df, lookback=30),
+    }
+
+
+def timed(fn, frames, repeat=3):
+    """Results and best-of-`repeat` wall time, after one warm-up call"""
+    fn(next(iter(frames.values())))
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = {symbol: fn(df) for symbol, df in frames.items()}
+        best = min(best, time.perf_counter() - started)
+    return results, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    app = load_app_functions(*APP_FUNCTIONS, DEMO_MODE=False)
+    registry = app.get_indicator_registry()
+    names = registry.outputs + ["atr_14", "swing_points"]
+    frames = synthetic_frames(args.symbols, args.days)
+    print(f"{args.symbols} symbols x {len(next(iter(frames.values())))} bars, levels: {registry.levels()}")
+
+    reference, base_s = timed(lambda df: independent(app, df), frames)
+    graph, graph_s = timed(lambda df: registry.compute(df, names=names), frames)
+    print(f"independent calls : {base_s * 1000 / args.symbols:7.2f}ms/symbol")
+    print(f"graph, sequential : {graph_s * 1000 / args.symbols:7.2f}ms/symbol  ({base_s / graph_s:.2f}x)")
+    for workers in (2, 4):
+        with ThreadPoolExecutor(workers) as pool:
+            threaded, threaded_s = timed(lambda df: registry.compute(df, names=names, executor=pool), frames)
+        assert all(threaded[s]["trend"] == graph[s]["trend"] for s in frames)
+        print(f"graph, {workers} threads : {threaded_s * 1000 / args.symbols:7.2f}ms/symbol  ({base_s / threaded_s:.2f}x)")
+
+    for symbol in frames:
+        ref, new = reference[symbol], graph[symbol]
+        for key in ("trend", "momentum", "volatility", "reversal", "liquidity"):
+            assert ref[key]["status"] == new[key]["status"] and ref[key]["detail"] == new[key]["detail"], (symbol, key)
+        assert ref["atr"] == new["atr_14"].iloc[-1] and ref["swing_points"] == new["swing_points"], symbol
+        assert app.determine_overall_bias(ref) == app.determine_overall_bias(new), symbol
+    print("statuses, details, ATR, swing levels and bias identical")
+
+    # One failing intermediate only takes down the nodes that depend on it
+    registry.register("rsi_14", lambda df, window: 1 / 0, output=False)
+    broken = registry.compute(next(iter(frames.values())))
+    print("with rsi_14 failing:", {name: result["status"] for name, result in broken.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Monte Carlo trade odds: vectorized simulation vs a per-path loop.
+
+Simulates a breakout plan on `--paths` block-bootstrapped futures of a
+synthetic 4h history, scoring the five fixed risk:reward targets at once,
+and times it against the same simulation stepped path by path in Python.
+Both must produce identical odds. A driftless random walk then checks the
+odds against gambler's ruin: a triggered plan with reward R per unit of
+risk should reach its target first with probability 1 / (1 + R).
+
+    $ python benchmarks/bench_montecarlo.py --paths 20000 --horizon 42
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import montecarlo
+
+REWARDS = (1.0, 1.5, 2.0, 3.0, 4.0)
+
+
+def synthetic_close(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.standard_t(4, n) * 0.01))
+
+
+def plan(close, atr):
+    entry = close[-1] * 1.01
+    stop = entry - 1.5 * atr
+    return entry, stop, [entry + 1.5 * atr * reward for reward in REWARDS]
+
+
+def loop_simulation(close, entry, stop, targets, horizon, n_paths, block, seed):
+    """Reference: the same bootstrap draws, each path and target walked bar by bar"""
+    returns = montecarlo.block_bootstrap(montecarlo.log_returns(close), n_paths, horizon, block, seed)
+    wins = np.zeros(len(targets))
+    losses = np.zeros(len(targets))
+    for path in returns:
+        log_price = np.log(close[-1])
+        prices = []
+        for r in path:
+            log_price += r
+            prices.append(log_price)
+        for k, target in enumerate(targets):
+            entered = False
+            for p in prices:
+                if not entered:
+                    entered = p >= np.log(entry)
+                elif p <= np.log(stop):
+                    losses[k] += 1
+                    break
+                elif p >= np.log(target):
+                    wins[k] += 1
+                    break
+    return wins / n_paths, losses / n_paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paths", type=int, default=20_000)
+    parser.add_argument("--horizon", type=int, default=42)
+    parser.add_argument("--block", type=int, default=6)
+    parser.add_argument("--history", type=int, default=180)
+    args = parser.parse_args(argv)
+
+    close = synthetic_close(args.history)
+    atr = float(np.mean(np.abs(np.diff(close[-15:]))))
+    entry, stop, targets = plan(close, atr)
+    kwargs = dict(horizon=args.horizon, n_paths=args.paths, block=args.block, seed=7)
+
+    montecarlo.simulate_plan(close, entry, stop, targets, **kwargs)  # warm-up
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        odds = montecarlo.simulate_plan(close, entry, stop, targets, **kwargs)
+        timings.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    wins, losses = loop_simulation(close, entry, stop, targets, **kwargs)
+    loop_s = time.perf_counter() - started
+
+    print(f"{args.paths:,} paths x {args.horizon} bars, {len(targets)} targets")
+    print(f"per-path loop : {loop_s * 1000:8.1f}ms")
+    print(f"vectorized    : {min(timings) * 1000:8.1f}ms  ({loop_s / min(timings):.0f}x)")
+    mismatches = int(np.sum(odds["p_target"] != wins) + np.sum(odds["p_stop"] != losses))
+    print(f"mismatches vs loop: {mismatches}")
+    for reward, p_target, p_stop, bars in zip(REWARDS, odds["p_target"], odds["p_stop"], odds["bars_to_target"]):
+        print(f"  1:{reward:<3g} target {p_target:6.1%}  stop {p_stop:6.1%}  mean bars to target {bars:5.1f}")
+
+    # Driftless +/-0.1% walk: stop 10 steps below, target 10R steps above (barriers set half a step inside
+    # the lattice so float rounding cannot skip them); the exact ruin odds are 10 / (10 + 10R)
+    steps = np.random.default_rng(1).permutation(np.repeat([-1e-3, 1e-3], 2000))
+    walk = 100 * np.exp(np.concatenate(([0.0], np.cumsum(steps))))
+    level = walk[-1]
+    ruin = montecarlo.simulate_plan(
+        walk, level, level * np.exp(-0.0095), level * np.exp(0.01 * np.array(REWARDS) - 0.0005), triggered=True,
+        horizon=4_000, n_paths=2_000, block=1, seed=3,
+    )
+    print("gambler's ruin check (triggered, driftless):")
+    for reward, p_target in zip(REWARDS, ruin["p_target"]):
+        print(f"  1:{reward:<3g} simulated {p_target:6.1%}  expected {1 / (1 + reward):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
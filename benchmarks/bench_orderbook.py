@@ -0,0 +1,139 @@
+"""Order-book upkeep cost and memory under a fast depth stream.
+
+Part 1 replays `--diffs` updates of the stub's synthetic book straight into
+`orderbook.OrderBook`. It times parsing the diffs, applying them one at a
+time and in merged batches of `--batch` (as the feed does with a backlog),
+and binning the book for the heatmap. Both books must end up equal to the
+synthetic book level for level. Part 2 starts the stub in its own process,
+streaming `--rate` diffs per second, and runs a `DepthFeed` against it for
+`--seconds`. It reports the applied rate, resyncs, levels held, and traced
+memory during the run. Memory should stay flat once the history ring is full.
+
+    $ python benchmarks/bench_orderbook.py --diffs 20000 --rate 1000 --seconds 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import decode
+import orderbook
+import stub_server
+
+
+def recorded_diffs(book, n):
+    """The next `n` diffs of a synthetic book, as the JSON messages the stream would send"""
+    subscriber = book.subscribe()
+    messages = []
+    for _ in range(n):
+        book.step()
+        messages.append(subscriber.get_nowait())
+    book.unsubscribe(subscriber)
+    return messages
+
+
+def start_stub_process(rate):
+    """stub_server.py in a child process, so generating the diffs does not compete with the feed for the GIL"""
+    proc = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(ROOT, "stub_server.py"), "--port", "0", "--depth-rate", str(rate)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    api_base = proc.stdout.readline().rsplit(" ", 1)[-1].strip()
+    stream_base = proc.stdout.readline().split(" on ", 1)[-1].split("/<pair>", 1)[0]
+    return proc, api_base, stream_base
+
+
+def same_book(book, snapshot):
+    bids = np.array(snapshot["bids"], dtype=float)[::-1]
+    asks = np.array(snapshot["asks"], dtype=float)
+    return (np.array_equal(np.column_stack((book.bid_px, book.bid_qty)), bids)
+            and np.array_equal(np.column_stack((book.ask_px, book.ask_qty)), asks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--diffs", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=1000)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--interval", type=float, default=0.25, help="history sampling interval of the live feed")
+    parser.add_argument("--capacity", type=int, default=40, help="history ring size of the live feed")
+    args = parser.parse_args(argv)
+
+    synthetic = stub_server.SyntheticDepth("bitcoin", seed=1)
+    snapshot = synthetic.snapshot(5000)
+    messages = recorded_diffs(synthetic, args.diffs)
+
+    started = time.perf_counter()
+    events = [decode.loads(message) for message in messages]
+    parse_s = time.perf_counter() - started
+
+    book = orderbook.OrderBook(max_levels=5000)
+    book.load(snapshot["bids"], snapshot["asks"], snapshot["lastUpdateId"])
+    started = time.perf_counter()
+    for event in events:
+        book.apply(event["b"], event["a"], event["u"])
+    apply_s = time.perf_counter() - started
+
+    batched = orderbook.OrderBook(max_levels=5000)
+    batched.load(snapshot["bids"], snapshot["asks"], snapshot["lastUpdateId"])
+    started = time.perf_counter()
+    for i in range(0, len(events), args.batch):
+        batch = events[i:i + args.batch]
+        batched.apply([row for event in batch for row in event["b"]], [row for event in batch for row in event["a"]],
+                      batch[-1]["u"])
+    batch_s = time.perf_counter() - started
+
+    history = orderbook.DepthHistory()
+    started = time.perf_counter()
+    for i in range(1000):
+        history.append(i, book)
+    bin_s = (time.perf_counter() - started) / 1000
+
+    final = synthetic.snapshot(5000)
+    print(f"{args.diffs:,} diffs into a {len(book):,}-level book")
+    print(f"parse            {parse_s / args.diffs * 1e6:6.1f}us/diff")
+    print(f"apply one by one {apply_s / args.diffs * 1e6:6.1f}us/diff  ({args.diffs / apply_s:,.0f} diffs/s)")
+    print(f"apply {args.batch:>3} at once {batch_s / args.diffs * 1e6:6.1f}us/diff  ({args.diffs / batch_s:,.0f} diffs/s)")
+    print(f"bin              {bin_s * 1e6:6.1f}us/snapshot ({len(history.offsets) - 1} buckets)")
+    print(f"books match the synthetic book: {same_book(book, final) and same_book(batched, final)}")
+
+    proc, api_base, stream_base = start_stub_process(args.rate)
+    feed = orderbook.DepthFeed("BTCUSDT", api_base, stream_base, interval=args.interval, capacity=args.capacity).start()
+    try:
+        deadline = time.monotonic() + 10
+        while feed.snapshot()["status"] != "live" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(args.capacity * args.interval)  # let the ring fill before measuring memory
+        tracemalloc.start()
+        start_mem = tracemalloc.get_traced_memory()[0]
+        start_updates = feed.snapshot()["updates"]
+        started = time.monotonic()
+        samples = []
+        while time.monotonic() - started < args.seconds:
+            time.sleep(args.seconds / 5)
+            samples.append(tracemalloc.get_traced_memory()[0] - start_mem)
+        state = feed.snapshot()
+        elapsed = time.monotonic() - started
+        tracemalloc.stop()
+    finally:
+        feed.stop()
+        proc.terminate()
+        proc.wait()
+
+    print(f"\nlive feed at {args.rate:,.0f} diffs/s for {args.seconds:.0f}s: {state['status']}, "
+          f"{(state['updates'] - start_updates) / elapsed:,.0f} diffs/s applied, {state['resyncs']} resyncs, "
+          f"{state['levels']:,} levels")
+    print(f"history ring: {len(state['times'])}/{args.capacity} snapshots, {feed.history.nbytes / 1024:.1f} KiB")
+    print("traced memory vs start (KiB): " + " ".join(f"{delta / 1024:+.0f}" for delta in samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Portfolio risk upkeep: one plan changing at a time, incremental vs full recompute.
+
+Builds `--plans` random LONG/SHORT plans over correlated synthetic returns,
+then replays `--updates` random single-plan changes. The incremental path is
+`Portfolio.update`, which touches one row and one covariance column. The
+baseline rebuilds every size, matrix-vector product and quadratic form
+(`Portfolio._resync`) after each change, as a stateless calculation would.
+Both must end on the same aggregates. Resizing every plan for new account
+settings and the covariance of the returns are timed as well.
+
+    $ python benchmarks/bench_portfolio.py --plans 12 50 200 1000 --updates 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import portfolio
+
+AGGREGATES = ("gross_exposure", "net_exposure", "total_risk", "correlated_risk", "bar_volatility")
+
+
+def random_plan(rng, price=100.0):
+    direction = rng.choice(["LONG", "SHORT", "NEUTRAL"], p=[0.45, 0.45, 0.1])
+    entry = price * (1 + rng.normal(0, 0.02))
+    distance = entry * rng.uniform(0.005, 0.08)
+    stop = entry - distance if direction == "LONG" else entry + distance
+    return {"direction": str(direction), "entry_trigger": entry, "stop_loss": stop, "trigger_hit": bool(rng.random() < 0.3)}
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plans", type=int, nargs="+", default=[12, 50, 200, 1000])
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'plans':>6} {'incremental':>12} {'full':>10} {'speedup':>8} {'resize all':>11} {'covariance':>11}  max rel diff")
+    for n in args.plans:
+        rng = np.random.default_rng(n)
+        symbols = [f"C{i}" for i in range(n)]
+        market = rng.normal(0, 0.02, (args.window + 1, 1))
+        close = 100 * np.exp(np.cumsum(market + rng.normal(0, 0.015, (args.window + 1, n)), axis=0))
+        cov_s = timed(lambda: portfolio.returns_covariance({"Close": close}, args.window), 20)
+        cov = portfolio.returns_covariance({"Close": close}, args.window)
+
+        books = []
+        for _ in range(2):
+            book = portfolio.Portfolio(100_000, 0.01, max_position=0.5)
+            for symbol in symbols:
+                book.update(symbol, random_plan(np.random.default_rng(hash(symbol) % 2**32)))
+            book.set_covariance(symbols, cov)
+            books.append(book)
+        incremental, full = books
+        changes = [(symbols[rng.integers(n)], random_plan(rng)) for _ in range(args.updates)]
+
+        started = time.perf_counter()
+        for symbol, plan in changes:
+            incremental.update(symbol, plan)
+        inc_s = (time.perf_counter() - started) / len(changes)
+
+        started = time.perf_counter()
+        for symbol, plan in changes:
+            full.update(symbol, plan)
+            full._resync()
+        full_s = (time.perf_counter() - started) / len(changes)
+
+        equities = iter(np.linspace(50_000, 150_000, 50))
+        resize_s = timed(lambda: full.set_account(next(equities), 0.01), 50)
+        full.set_account(100_000, 0.01)
+
+        got, want = incremental.summary(), full.summary()
+        worst = max(abs(got[key] - want[key]) / max(abs(want[key]), 1e-9) for key in AGGREGATES)
+        print(f"{n:>6} {inc_s * 1e6:>10.1f}us {full_s * 1e6:>8.1f}us {full_s / inc_s:>7.1f}x "
+              f"{resize_s * 1e6:>9.1f}us {cov_s * 1e6:>9.1f}us  {worst:.1e}")
+
+
+if __name__ == "__main__":
+    main()
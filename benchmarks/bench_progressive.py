@@ -0,0 +1,135 @@
+"""Time to first content vs time to a complete page, blocking vs budgeted rendering.
+
+Starts a stub whose volume endpoint (`market_chart`) answers after
+`--slow-ms`, then a Streamlit server per mode, and drives one session over
+the websocket protocol with indicator details on. Each trial clears the
+caches first, so every fetch goes upstream. The timings are measured from
+sending the rerun until:
+
+    first content  the price card arrives
+    cards          all five indicator cards have their real values
+    complete       the trade plan arrives (for budgeted mode this includes
+                   the automatic rerun once the pending work has finished)
+
+    $ python benchmarks/bench_progressive.py --slow-ms 3000 --budget 1.5 --trials 3
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+import loadtest
+import stub_server
+
+CARD_STATE = re.compile(r'class="indicator-card(?:-full)?( pending)?"')
+
+
+def rerun_message(session, fragment_id=""):
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = ""
+    if fragment_id:
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.is_auto_rerun = True
+    for label, value in session.values.items():
+        kind, widget_id, _ = session.widgets[label]
+        state = msg.rerun_script.widget_states.widgets.add(id=widget_id)
+        if kind == "checkbox":
+            state.bool_value = value
+        else:
+            state.string_value = value
+    return msg.SerializeToString()
+
+
+async def timed_page(session, timeout=60):
+    """Seconds until first price card, all real indicator cards and the trade plan, following auto-reruns"""
+    started = time.perf_counter()
+    marks, auto_rerun = {}, None
+    await session.ws.send(rerun_message(session))
+    while time.perf_counter() - started < timeout:
+        fwd = ForwardMsg()
+        fwd.ParseFromString(await session.ws.recv())
+        kind = fwd.WhichOneof("type")
+        now = time.perf_counter() - started
+        if kind == "auto_rerun":
+            auto_rerun = (fwd.auto_rerun.interval, fwd.auto_rerun.fragment_id)
+        elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+            element = fwd.delta.new_element
+            body = element.markdown.body if element.WhichOneof("type") == "markdown" else ""
+            if 'class="price-card' in body:
+                marks.setdefault("first content", now)
+            elif 'class="indicator-grid"' in body:
+                if sum(not pending for pending in CARD_STATE.findall(body)) == 5:
+                    marks.setdefault("cards", now)
+            elif 'class="recommendation-box"' in body:
+                marks.setdefault("complete", now)
+        elif kind == "script_finished":
+            if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                continue  # the fragment asked for a full rerun; it is already running
+            if "complete" in marks:
+                return marks
+            if auto_rerun is None:
+                raise RuntimeError("page finished incomplete without scheduling a rerun")
+            await asyncio.sleep(auto_rerun[0])
+            await session.ws.send(rerun_message(session, auto_rerun[1]))
+    raise TimeoutError("page did not complete")
+
+
+async def run_mode(ws_url, trials):
+    session = loadtest.SimulatedSession(ws_url)
+    await session.connect()
+    try:
+        await session.rerun()
+        session.set(loadtest.DETAILS_LABEL, True)
+        results = []
+        for _ in range(trials):
+            clear = BackMsg()
+            clear.clear_cache = True
+            await session.ws.send(clear.SerializeToString())
+            await asyncio.sleep(0.2)
+            results.append(await timed_page(session))
+        return results
+    finally:
+        await session.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slow-ms", type=float, default=3000)
+    parser.add_argument("--budget", type=float, default=1.5)
+    parser.add_argument("--trials", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    stub = stub_server.StubServer(endpoint_latency_ms={"market_chart": args.slow_ms}).start()
+    try:
+        print(f"volume endpoint latency {args.slow_ms:.0f}ms, {args.trials} cold trials per mode (medians)")
+        for label, budget in (("blocking (RENDER_BUDGET_S=0)", 0), (f"budgeted (RENDER_BUDGET_S={args.budget:g})", args.budget)):
+            port = loadtest._free_port()
+            proc, secrets_path = loadtest.start_streamlit(stub.api_base, port, {
+                "RENDER_BUDGET_S": budget, "MARKET_DATA_SOURCES": "coingecko", "SIGNAL_DB": "",
+                "SNAPSHOT_DB": "",
+            })
+            try:
+                results = asyncio.run(run_mode(f"ws://127.0.0.1:{port}/_stcore/stream", args.trials))
+            finally:
+                proc.terminate()
+                proc.wait()
+                os.unlink(secrets_path)
+            row = {key: np.median([r[key] for r in results]) for key in ("first content", "cards", "complete")}
+            print(f"{label:<30} first content {row['first content']:5.2f}s   cards {row['cards']:5.2f}s   "
+                  f"complete {row['complete']:5.2f}s")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
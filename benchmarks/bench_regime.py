@@ -0,0 +1,141 @@
+"""Regime classification cost: rolling structures vs recomputing every window.
+
+Part 1 classifies every bar of one `--bars` long synthetic series three ways:
+the rolling `regime.classify`, a naive version that recomputes the
+percentile ranks, realized volatility and efficiency ratio from each bar's
+full window, and `RegimeTracker.update` fed one new bar at a time, as the
+app does on each rerun. All three must agree bar for bar. Part 2 times
+`regime.latest_regimes` for the last bar of `--symbols` stub symbols against
+classifying each symbol's series, and counts how many momentum and
+volatility statuses the regime-adapted thresholds change.
+
+    $ python benchmarks/bench_regime.py --bars 5000 --symbols 500
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from _app_functions import load_app_functions
+
+import batch_indicators
+import regime
+import stub_server
+
+
+def synthetic_series(bars, seed=7):
+    """Random walk whose volatility switches between calm and busy stretches, with trending runs"""
+    rng = np.random.default_rng(seed)
+    vol = np.repeat(rng.choice([0.004, 0.01, 0.025], size=bars // 200 + 1), 200)[:bars]
+    drift = np.repeat(rng.choice([-0.004, 0.0, 0.0, 0.004], size=bars // 150 + 1), 150)[:bars]
+    close = 100 * np.exp(np.cumsum(drift + vol * rng.standard_normal(bars)))
+    spread = close * vol * np.abs(rng.standard_normal(bars))
+    high, low = close + spread, close - spread
+    atr = batch_indicators.batch_atr(high[:, None], low[:, None], close[:, None])[:, 0]
+    return close, atr
+
+
+def naive_classify(close, atr, lookback=regime.LOOKBACK, rv_window=regime.RV_WINDOW, er_window=regime.ER_WINDOW,
+                   min_periods=regime.MIN_PERIODS):
+    """Every measure recomputed from its full window at every bar"""
+    n = len(close)
+    returns = np.concatenate([[np.nan], np.diff(np.log(close))])
+    rv = np.full(n, np.nan)
+    for t in range(rv_window, n):
+        rv[t] = np.std(returns[t - rv_window + 1:t + 1], ddof=1)
+    atr_pct = np.where(atr > 0, atr / close, np.nan)
+
+    def rank(values, t):
+        window = values[max(0, t - lookback + 1):t + 1]
+        window = window[~np.isnan(window)]
+        if np.isnan(values[t]) or len(window) < min_periods:
+            return np.nan
+        return (np.sum(window < values[t]) + np.sum(window <= values[t])) / (2 * len(window))
+
+    rows = []
+    for t in range(n):
+        atr_rank, rv_rank = rank(atr_pct, t), rank(rv, t)
+        efficiency = np.nan
+        if t >= er_window:
+            path = np.abs(np.diff(close[t - er_window:t + 1])).sum()
+            efficiency = abs(close[t] - close[t - er_window]) / path if path > 0 else 0.0
+        rows.append((regime.volatility_level(atr_rank, rv_rank), regime.trend_state(efficiency)))
+    return rows
+
+
+def stub_frames(n_symbols, days):
+    frames = {}
+    for i in range(n_symbols):
+        df = pd.DataFrame(stub_server.synthetic_ohlc(f"coin-{i}", days), columns=['timestamp', 'Open', 'High', 'Low', 'Close'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        frames[f"coin-{i}"] = df.set_index('timestamp')
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    close, atr = synthetic_series(args.bars)
+    started = time.perf_counter()
+    rolling = regime.classify(close, atr)
+    rolling_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    naive = naive_classify(close, atr)
+    naive_s = time.perf_counter() - started
+
+    index = pd.date_range("2024-01-01", periods=args.bars, freq="4h")
+    tracker = regime.RegimeTracker(live_last_bar=False)  # every bar here is closed
+    started = time.perf_counter()
+    incremental = []
+    for t in range(1, args.bars + 1):
+        current = tracker.update(index[max(0, t - 180):t], close[max(0, t - 180):t], atr[max(0, t - 180):t])
+        incremental.append((current["volatility"], current["trend"]))
+    update_s = time.perf_counter() - started
+
+    labels = list(zip(rolling["volatility"], rolling["trend"]))
+    print(f"{args.bars:,} bars, lookback {regime.LOOKBACK}")
+    print(f"rolling classify     {rolling_s * 1e3:8.1f}ms  ({rolling_s / args.bars * 1e6:5.1f}us/bar)")
+    print(f"naive per window     {naive_s * 1e3:8.1f}ms  ({naive_s / args.bars * 1e6:5.1f}us/bar)  "
+          f"{naive_s / rolling_s:.1f}x slower")
+    print(f"tracker, 1 new bar   {update_s / args.bars * 1e6:8.1f}us/update over a sliding 180-bar frame")
+    print(f"labels agree: naive {labels == naive}, incremental {labels == incremental}")
+    print("share of bars:", rolling.groupby(["volatility", "trend"]).size().div(args.bars).round(2).to_dict())
+
+    frames = stub_frames(args.symbols, args.days)
+    aligned = batch_indicators.align_ohlcv(frames)
+    arrays = batch_indicators.compute_batch_arrays(aligned)
+    started = time.perf_counter()
+    latest = regime.latest_regimes(aligned["Close"], arrays["atr"], aligned["symbols"])
+    batch_s = time.perf_counter() - started
+    started = time.perf_counter()
+    per_symbol = [regime.classify(aligned["Close"][:, j], arrays["atr"][:, j]).iloc[-1]
+                  for j in range(len(aligned["symbols"]))]
+    loop_s = time.perf_counter() - started
+    agree = all(latest.iat[j, 0] == row["volatility"] and latest.iat[j, 1] == row["trend"]
+                for j, row in enumerate(per_symbol))
+    print(f"\n{args.symbols} symbols x {len(aligned['index'])} bars, last-bar regime")
+    print(f"latest_regimes       {batch_s * 1e3:8.2f}ms  ({batch_s / args.symbols * 1e6:5.1f}us/symbol)")
+    print(f"classify per symbol  {loop_s * 1e3:8.2f}ms  ({loop_s / args.symbols * 1e6:5.1f}us/symbol)  agree {agree}")
+    print("regimes:", latest.groupby(["volatility", "trend"]).size().to_dict())
+
+    adaptive = batch_indicators.summarize(aligned, arrays)
+    fixed = batch_indicators.summarize(aligned, arrays, adaptive=False)
+    app = load_app_functions("vote_trend", "vote_momentum", "vote_reversal", "vote_squeeze", "get_indicator_registry",
+                             "determine_overall_bias", "calculate_true_range", "calculate_atr_series",
+                             "calculate_rsi_series", "calculate_regime", "find_swing_points", "calculate_supertrend",
+                             "calculate_rsi_with_divergence", "calculate_bollinger_bands", "calculate_parabolic_sar",
+                             "calculate_volume_profile")
+    changed = {key: sum(adaptive[s][key]["status"] != fixed[s][key]["status"] for s in adaptive)
+               for key in ("momentum", "volatility")}
+    changed["bias"] = sum(app.determine_overall_bias(adaptive[s]) != app.determine_overall_bias(fixed[s]) for s in adaptive)
+    print("statuses changed by adaptive thresholds:", changed)
+
+
+if __name__ == "__main__":
+    main()
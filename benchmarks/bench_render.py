@@ -0,0 +1,130 @@
+"""Bytes and websocket messages the server sends per rerun.
+
+Drives one session over the websocket protocol the way a browser does: it
+keeps every message the server marks cacheable and reports their hashes on
+each rerun, so unchanged large elements can come back as references. The
+caches are warmed first, so the numbers reflect rendering, not upstream
+fetches. Scenarios, in order:
+
+    first load       a new session opens the page (BTC)
+    rerun            nothing changed
+    risk:reward      a different Risk:Reward choice
+    details on       indicator cards shown
+    details rerun    nothing changed, cards still shown
+    symbol           another coin, cards shown
+
+    $ python benchmarks/bench_render.py
+    $ python benchmarks/bench_render.py --app before_app.py   # another revision of the app, from the repo root
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+import loadtest
+import stub_server
+
+
+class BrowserSession(loadtest.SimulatedSession):
+    """SimulatedSession that keeps a message cache and counts what each rerun costs"""
+
+    def __init__(self, url):
+        super().__init__(url)
+        self.cached = set()
+
+    async def measured_rerun(self):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        msg.rerun_script.cached_message_hashes.extend(sorted(self.cached))
+        for label, value in self.values.items():
+            kind, widget_id, _ = self.widgets[label]
+            state = msg.rerun_script.widget_states.widgets.add(id=widget_id)
+            if kind == "checkbox":
+                state.bool_value = value
+            else:
+                state.string_value = value
+        await self.ws.send(msg.SerializeToString())
+
+        stats = {"messages": 0, "bytes": 0, "elements": 0, "refs": 0}
+        while True:
+            frame = await self.ws.recv()
+            fwd = ForwardMsg()
+            fwd.ParseFromString(frame)
+            stats["messages"] += 1
+            stats["bytes"] += len(frame)
+            kind = fwd.WhichOneof("type")
+            if kind == "ref_hash":
+                stats["refs"] += 1
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                stats["elements"] += 1
+                self._track_widget(fwd.delta.new_element)
+            if fwd.metadata.cacheable:
+                self.cached.add(fwd.hash)
+            if kind == "script_finished":
+                return stats
+
+
+async def scenarios(ws_url, symbols):
+    warm = loadtest.SimulatedSession(ws_url)
+    await warm.connect()
+    await warm.rerun()
+    label = next(label for label in loadtest.SYMBOL_LABELS if label in warm.widgets)
+    for symbol in symbols:
+        warm.set(label, symbol)
+        await warm.rerun()
+    await warm.close()
+
+    session = BrowserSession(ws_url)
+    await session.connect()
+    try:
+        results = [("first load", await session.measured_rerun())]
+        results.append(("rerun", await session.measured_rerun()))
+        rr_options = [o for o in session.widgets[loadtest.RR_LABEL][2] if o != "Custom"]
+        session.set(loadtest.RR_LABEL, rr_options[0])
+        results.append(("risk:reward", await session.measured_rerun()))
+        session.set(loadtest.DETAILS_LABEL, True)
+        results.append(("details on", await session.measured_rerun()))
+        results.append(("details rerun", await session.measured_rerun()))
+        session.set(label, symbols[1])
+        results.append(("symbol", await session.measured_rerun()))
+        return results
+    finally:
+        await session.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=loadtest.APP_PATH)
+    parser.add_argument("--min-cached-size", type=int, default=None,
+                        help="override global.minCachedMessageSize (Streamlit's default is 10000 bytes)")
+    args = parser.parse_args(argv)
+
+    extra_args = () if args.min_cached_size is None else ("--global.minCachedMessageSize", str(args.min_cached_size))
+    stub = stub_server.StubServer().start()
+    port = loadtest._free_port()
+    proc, secrets_path = loadtest.start_streamlit(stub.api_base, port, {"SIGNAL_DB": "", "SNAPSHOT_DB": ""},
+                                                  app_path=os.path.abspath(args.app), extra_args=extra_args)
+    try:
+        results = asyncio.run(scenarios(f"ws://127.0.0.1:{port}/_stcore/stream", ["BTC", "ETH"]))
+    finally:
+        proc.terminate()
+        proc.wait()
+        os.unlink(secrets_path)
+        stub.stop()
+
+    print(f"{os.path.basename(args.app)}")
+    print(f"{'scenario':<14} {'bytes':>8} {'messages':>9} {'elements':>9} {'refs':>5}")
+    for name, stats in results:
+        print(f"{name:<14} {stats['bytes']:>8,} {stats['messages']:>9} {stats['elements']:>9} {stats['refs']:>5}")
+    total = sum(stats["bytes"] for _, stats in results[1:])
+    print(f"{'reruns total':<14} {total:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Session seasonality: vectorized tagging vs a get_session_info call per bar.
+
+Profiles `--years` of synthetic hourly candles by trading session. The
+baseline tags each bar by calling the app's `get_session_info` on its open
+time and groups with pandas. The vectorized path evaluates the rule once
+per hour of the day and aggregates with bincount. Session means must
+agree. The run also times the 4h series the app usually has.
+
+    $ python benchmarks/bench_sessions.py --years 3
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import candles
+import sessions
+from _app_functions import load_app_functions
+from bench_archive import synthetic_store
+
+HOUR_MS = sessions.HOUR_MS
+
+
+def per_row_profile(store, get_session_info):
+    metrics = sessions.bar_metrics(store)
+    opens = store.timestamps - HOUR_MS
+    labels = [get_session_info(datetime.datetime.fromtimestamp(t / 1000, tz=datetime.timezone.utc)) for t in opens]
+    return pd.DataFrame(metrics).groupby(pd.Series(labels, name="session")).mean()
+
+
+def timed(fn, repeat=3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    app = load_app_functions("get_session_info")
+    store = synthetic_store(2, args.years * 365 * 24)
+    table = sessions.session_table(app.get_session_info)
+
+    row_s, expected = timed(lambda: per_row_profile(store, app.get_session_info), repeat=1)
+    vec_s, profile = timed(lambda: sessions.session_profile(store, table))
+    got = profile["sessions"].loc[expected.index, list(sessions.METRICS)]
+    worst = float(np.nanmax(np.abs(got.to_numpy() / expected[list(sessions.METRICS)].to_numpy() - 1)))
+    print(f"{len(store):,} hourly bars")
+    print(f"per-bar get_session_info + groupby: {row_s * 1000:8.1f}ms")
+    print(f"vectorized profile                : {vec_s * 1000:8.1f}ms ({row_s / vec_s:.0f}x), "
+          f"max relative difference {worst:.1e}")
+
+    idx = np.arange(3, len(store), 4)
+    four_hour = candles.CandleStore.from_arrays(store.timestamps[idx], store.open[idx], store.high[idx],
+                                                store.low[idx], store.close[idx], store.volume[idx])
+    four_s, _ = timed(lambda: sessions.session_profile(four_hour, table))
+    label = f"4h series ({len(four_hour):,} bars)"
+    print(f"{label:<34}: {four_s * 1000:8.1f}ms")
+    print(profile["sessions"][["volatility_rel", "range_rel", "volume_rel", "hours"]].round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
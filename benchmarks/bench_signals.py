@@ -0,0 +1,116 @@
+"""Signal history: append cost on the request path, storage size and query time.
+
+Appends `--rows` synthetic snapshots (one a minute per symbol) through
+`SignalStore`, timing `append` itself (what a rerun pays) and the writer's
+end-to-end throughput. It then times "bias timeline for one symbol over
+the last week" against the same rows in a plain table (text columns,
+rowid order, no index), which is what a naive log would look like.
+
+    $ python benchmarks/bench_signals.py --rows 2000000 --symbols 50
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import signals
+
+BIASES = ["Strong Bullish", "Bullish", "Neutral", "Bearish", "Strong Bearish"]
+STATUSES = {
+    "trend": ["Bullish", "Bearish"], "momentum": ["Overbought", "Oversold", "Neutral"],
+    "volatility": ["Squeeze", "Normal"], "reversal": ["Bullish", "Bearish"], "liquidity": ["Volume Profile"],
+}
+MINUTE_MS = 60_000
+
+
+def synthetic_rows(n_rows, n_symbols, end_ms, seed=0):
+    rng = np.random.default_rng(seed)
+    per_symbol = n_rows // n_symbols
+    for s in range(n_symbols):
+        symbol = f"C{s:03d}"
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, per_symbol)))
+        bias = np.cumsum(rng.integers(-1, 2, per_symbol) * (rng.random(per_symbol) < 0.01)) % len(BIASES)
+        for i in range(per_symbol):
+            ts = end_ms - (per_symbol - i) * MINUTE_MS
+            yield {
+                "symbol": symbol, "ts": ts, "bar_ts": ts - ts % (4 * 60 * MINUTE_MS), "bias": BIASES[bias[i]],
+                "price": float(prices[i]), "direction": "LONG" if bias[i] < 2 else "SHORT" if bias[i] > 2 else "NEUTRAL",
+                "entry": float(prices[i] * 1.01), "stop": float(prices[i] * 0.98), "target": float(prices[i] * 1.05),
+                "trigger_hit": 0,
+                **{name: options[i % len(options)] for name, options in STATUSES.items()},
+                **{f"{name}_value": float(prices[i]) for name in STATUSES},
+            }
+
+
+def naive_table(path, rows):
+    conn = sqlite3.connect(path)
+    columns = ["symbol", *signals.COLUMNS]
+    conn.execute(f"CREATE TABLE signals ({', '.join(columns)})")
+    conn.executemany(f"INSERT INTO signals VALUES ({', '.join('?' * len(columns))})",
+                     ([row[c] for c in columns] for row in rows))
+    conn.commit()
+    return conn
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--symbols", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    end_ms = 1_717_200_000_000
+    rows = list(synthetic_rows(args.rows, args.symbols, end_ms))
+    now = pd.Timestamp(end_ms, unit="ms", tz="UTC")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = signals.SignalStore(os.path.join(tmp, "signals.db"))
+        started = time.perf_counter()
+        append_s = 0.0
+        for row in rows:
+            t = time.perf_counter()
+            store.append(row)
+            append_s += time.perf_counter() - t
+        store.flush()
+        total_s = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        print(f"{store.written:,} rows ({store.skipped:,} unchanged skipped) in {total_s:.1f}s "
+              f"= {store.written / total_s:,.0f} rows/s; append() {append_s / len(rows) * 1e6:.2f}us per call")
+        print(f"signal store : {size / 2**20:7.1f}MB ({size / store.written:.0f} B/row)")
+
+        naive = naive_table(os.path.join(tmp, "naive.db"), rows)
+        naive_size = os.path.getsize(os.path.join(tmp, "naive.db"))
+        print(f"naive table  : {naive_size / 2**20:7.1f}MB ({naive_size / len(rows):.0f} B/row)")
+
+        symbol = "C007"
+        week_ago = (now - pd.Timedelta(days=7)).value // 1_000_000
+        naive_s, naive_rows = best_of(lambda: naive.execute(
+            "SELECT ts, bias, price FROM signals WHERE symbol = ? AND ts >= ? ORDER BY ts", (symbol, week_ago),
+        ).fetchall())
+        store_s, timeline = best_of(lambda: store.timeline(symbol, start=now - pd.Timedelta(days=7),
+                                                           columns=["bias", "price"]))
+        changes_s, changes = best_of(lambda: store.bias_timeline(symbol, days=7, now=now))
+        assert len(timeline) == len(naive_rows)
+        print(f"'{symbol} bias over the last week' ({len(timeline):,} rows, {len(changes)} changes)")
+        print(f"  naive scan   {naive_s * 1000:7.1f}ms (raw tuples)")
+        print(f"  signal store {store_s * 1000:7.1f}ms (decoded DataFrame), bias_timeline {changes_s * 1000:.1f}ms")
+        naive.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
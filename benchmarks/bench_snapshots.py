@@ -0,0 +1,183 @@
+"""Page load from a materialized snapshot vs computing the analysis on demand.
+
+Part 1 runs in-process. It builds one symbol's snapshot payload with the
+app's own pipeline (indicator graph, bias, trade plan) and times that
+compute. It then times `SnapshotStore.write` and `latest`, both from memory
+and from a fresh store that has to read SQLite, and checks that the payload
+read back from SQLite equals the one written.
+
+Part 2 starts a stub whose every request takes `--latency-ms` and two
+Streamlit servers, one with `SNAPSHOT_DB` off and one with the snapshot
+worker on. One session opens each symbol with indicator details shown.
+Every rerun is timed until `script_finished`. RENDER_BUDGET_S is 0, so a
+rerun ends with the whole page. The cold rounds clear the server caches
+before each symbol, as after a restart or once the history TTL has lapsed.
+The warm rounds do not clear them.
+
+    $ python benchmarks/bench_snapshots.py --latency-ms 300 --rounds 3
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+
+from _app_functions import load_app_functions
+
+import loadtest
+import snapshots
+from candles import CandleStore
+import stub_server
+
+SYMBOLS = ["BTC", "ETH", "SOL"]
+SYMBOL_LABEL = "Select Cryptocurrency"
+
+
+def best_of(fn, repeat=200):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def same(a, b):
+    """Deep equality for snapshot payloads (NaN equals NaN, arrays and Series by value)"""
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return type(a) is type(b) and len(a) == len(b) and all(map(same, a, b))
+    if isinstance(a, CandleStore):
+        return np.array_equal(a.timestamps, b.timestamps) and np.array_equal(a.values, b.values, equal_nan=True)
+    if isinstance(a, pd.Series):
+        return (a.name == b.name and np.array_equal(a.index.as_unit("ms").asi8, b.index.as_unit("ms").asi8)
+                and np.array_equal(a.to_numpy(dtype=float), b.to_numpy(dtype=float), equal_nan=True))
+    if isinstance(a, float):
+        return a == b or (a != a and b != b)
+    return a == b
+
+
+def in_process(path):
+    app = load_app_functions(
+        "calculate_supertrend", "calculate_rsi_with_divergence", "calculate_bollinger_bands",
+        "calculate_parabolic_sar", "calculate_volume_profile", "calculate_true_range", "calculate_atr_series",
+        "calculate_rsi_series", "calculate_regime", "find_swing_points", "vote_trend", "vote_momentum",
+        "vote_reversal", "vote_squeeze", "get_indicator_registry", "determine_overall_bias", "get_trade_atr",
+        "get_trade_parameters", DEMO_MODE=False,
+    )
+    registry = app.get_indicator_registry()
+    df = pd.DataFrame(stub_server.synthetic_ohlc("bitcoin", 30), columns=['timestamp', 'Open', 'High', 'Low', 'Close'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df = df.set_index('timestamp').assign(Volume=1e6)
+    price = float(df['Close'].iloc[-1])
+    candle_store = CandleStore.from_frame(df)
+
+    def compute():
+        indicator_data = registry.compute(df, names=registry.outputs + ["atr_14", "swing_points", "regime"])
+        bias = app.determine_overall_bias(indicator_data)
+        trade_params = app.get_trade_parameters(price, app.get_trade_atr(indicator_data, df), bias, indicator_data,
+                                                1.0, 2.0, df)
+        return {"price": price, "price_change": 1.0, "candles": candle_store,
+                "indicator_data": indicator_data, "bias": bias, "trade_params": trade_params, "bar_ts": df.index[-1]}
+
+    payload = compute()
+    compute_s = best_of(compute, repeat=20)
+    store = snapshots.SnapshotStore(path)
+    write_s = best_of(lambda: store.write("BTC", payload, bar_ts=payload["bar_ts"]), repeat=50)
+    memory_s = best_of(lambda: store.latest("BTC", max_age=60))
+    disk_s = best_of(lambda: snapshots.SnapshotStore(path).latest("BTC"), repeat=50)
+    read_back = snapshots.SnapshotStore(path).latest("BTC")
+    round_trip = same(payload, {key: read_back[key] for key in payload})
+    with sqlite3.connect(path) as conn:
+        size, kept = conn.execute("SELECT LENGTH(payload), (SELECT COUNT(*) FROM snapshots) FROM snapshots "
+                                  "ORDER BY version DESC LIMIT 1").fetchone()
+
+    print(f"one symbol, {len(df)} bars; payload {size / 1024:.1f} KiB encoded, {kept} versions kept")
+    print(f"compute on demand (indicators, bias, plan) {compute_s * 1e3:8.2f}ms   (excludes the upstream fetch)")
+    print(f"write a snapshot                           {write_s * 1e3:8.2f}ms")
+    print(f"latest, in memory                          {memory_s * 1e6:8.2f}us")
+    print(f"latest, fresh store reading SQLite         {disk_s * 1e3:8.2f}ms   (read back equals written: {round_trip})")
+
+
+def wait_for_snapshots(path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if {row["symbol"] for row in snapshots.SnapshotStore(path).stats()} >= set(SYMBOLS):
+                return
+        except sqlite3.Error:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("the snapshot worker wrote nothing")
+
+
+async def page_loads(ws_url, rounds, cold):
+    session = loadtest.SimulatedSession(ws_url)
+    await session.connect()
+    try:
+        await session.rerun()
+        session.set(loadtest.DETAILS_LABEL, True)
+        session.latencies.clear()
+        for _ in range(rounds):
+            for symbol in SYMBOLS:
+                if cold:
+                    clear = BackMsg()
+                    clear.clear_cache = True
+                    await session.ws.send(clear.SerializeToString())
+                    await asyncio.sleep(0.2)
+                session.set(SYMBOL_LABEL, symbol)
+                await session.rerun()
+        return session.latencies, session.errors
+    finally:
+        await session.close()
+
+
+def end_to_end(latency_ms, rounds, path):
+    stub = stub_server.StubServer(latency_ms=latency_ms).start()
+    try:
+        print(f"\nupstream latency {latency_ms:.0f}ms, {rounds} rounds of {', '.join(SYMBOLS)}, page latency (median / p90)")
+        for label, snapshot_db in (("on demand", ""), ("snapshots", path)):
+            port = loadtest._free_port()
+            proc, secrets_path = loadtest.start_streamlit(stub.api_base, port, {
+                "RENDER_BUDGET_S": 0, "SIGNAL_DB": "", "SNAPSHOT_DB": snapshot_db,
+                "SNAPSHOT_SYMBOLS": ",".join(SYMBOLS), "MARKET_DATA_SOURCES": "coingecko",
+            })
+            try:
+                ws_url = f"ws://127.0.0.1:{port}/_stcore/stream"
+                asyncio.run(page_loads(ws_url, 1, cold=False))  # starts the worker and loads the app once
+                if snapshot_db:
+                    wait_for_snapshots(snapshot_db)
+                for mode, cold in (("cold", True), ("warm", False)):
+                    stub.reset_request_counts()
+                    latencies, errors = asyncio.run(page_loads(ws_url, rounds, cold))
+                    ms = np.asarray(latencies) * 1e3
+                    upstream = sum(stub.request_counts().values())
+                    print(f"{label:<10} {mode}  {np.median(ms):7.1f}ms / {np.percentile(ms, 90):7.1f}ms   "
+                          f"{upstream} upstream requests over {len(ms)} loads, {errors} errors")
+            finally:
+                proc.terminate()
+                proc.wait()
+                os.unlink(secrets_path)
+    finally:
+        stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        in_process(os.path.join(tmp, "bench.db"))
+        end_to_end(args.latency_ms, args.rounds, os.path.join(tmp, "snapshots.db"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Symbol index: lookup and autocomplete latency over a full-size coin list.
+
+Builds `SymbolIndex` from the stub's synthetic `/coins/list` padded to
+`--coins` entries and times exact resolution and prefix completion
+against a linear scan of the list, the obvious way to do both without an
+index. It also reports build, save and load times for the on-disk copy,
+and how many of the pinned tickers the old lower-casing lookup got wrong.
+
+    $ python benchmarks/bench_symbols.py --coins 15000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stub_server
+import symbols
+
+PREFERRED = {"BTC": "bitcoin", "ETH": "ethereum", "SOL": "solana", "AVAX": "avalanche-2", "ADA": "cardano"}
+
+
+def linear_resolve(coins, ticker):
+    matches = [c for c in coins if c["symbol"].upper() == ticker.upper()]
+    return matches[0]["id"] if matches else None
+
+
+def linear_complete(coins, prefix, limit=8):
+    prefix = prefix.lower()
+    matches = [c for c in coins if c["symbol"].lower().startswith(prefix) or c["name"].lower().startswith(prefix)]
+    return sorted(matches, key=lambda c: (len(c["symbol"]), c["id"]))[:limit]
+
+
+def per_call_us(fn, queries, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for q in queries:
+            fn(q)
+        best = min(best, time.perf_counter() - started)
+    return best / len(queries) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--coins", type=int, default=15_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args(argv)
+
+    coins = stub_server.synthetic_coin_list(args.coins - len(stub_server.STUB_COINS), seed=1)
+    started = time.perf_counter()
+    index = symbols.SymbolIndex(coins, preferred=PREFERRED)
+    build_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "symbol_index.json")
+        started = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = symbols.SymbolIndex.load(path, preferred=PREFERRED)
+        load_s = time.perf_counter() - started
+        size_kb = os.path.getsize(path) / 1024
+    assert loaded.coins == index.coins
+
+    rng = random.Random(0)
+    tickers = [rng.choice(coins)["symbol"] for _ in range(args.queries)]
+    prefixes = [t[:rng.randint(1, len(t))] for t in tickers]
+
+    print(f"{len(index)} coins, {len(index.by_ticker)} distinct tickers")
+    print(f"build {build_s * 1000:.0f}ms | save {save_s * 1000:.0f}ms, load {load_s * 1000:.0f}ms ({size_kb:.0f}KB on disk)")
+    scan = per_call_us(lambda t: linear_resolve(coins, t), tickers[:200])
+    indexed = per_call_us(index.resolve, tickers)
+    print(f"resolve : linear scan {scan:8.1f}us -> index {indexed:6.2f}us")
+    scan = per_call_us(lambda p: linear_complete(coins, p), prefixes[:200])
+    indexed = per_call_us(index.complete, prefixes)
+    print(f"complete: linear scan {scan:8.1f}us -> index {indexed:6.2f}us")
+
+    lowercased = sum(ticker.lower() != coin_id for ticker, coin_id in PREFERRED.items())
+    resolved = sum(index.resolve(ticker) != coin_id for ticker, coin_id in PREFERRED.items())
+    collisions = {t: [c["id"] for c in index.candidates(t)] for t in ("ETH", "SOL", "AVAX")}
+    print(f"pinned tickers mis-resolved: lower-casing {lowercased}/{len(PREFERRED)}, index {resolved}/{len(PREFERRED)}")
+    print(f"collisions ranked: {collisions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Server-side downsampling and Altair layers for the price chart.
+
+A chart never needs more points than it has pixels. The candles, SuperTrend
+line, Bollinger bands and PSAR dots are reduced to `max_points` before they
+are sent to the browser:
+
+    candles  bucketed: first open, highest high, lowest low, last close per
+             bucket of equal size, so wicks and gaps survive any zoom level
+    lines    Largest-Triangle-Three-Buckets, which keeps the visually
+             significant turns (the three bands share the middle's points)
+    PSAR     one dot per bucket (the last), taking its trend side with it
+
+Times are sent as epoch milliseconds, which Vega-Lite reads as temporal
+values at a fraction of the bytes of ISO strings. Series shorter than
+`max_points` pass through untouched. `ChartCache` holds the reduced frames
+per (symbol, last bar, zoom level, point budget), so reruns and other
+sessions on the same view only rebuild the Altair spec.
+
+`liquidity_heatmap` draws the order-book history kept by orderbook.py.
+"""
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+BULL_COLOR = "#34D399"
+BEAR_COLOR = "#F87171"
+BAND_COLOR = "#60A5FA"
+POC_COLOR = "#FBBF24"
+
+
+def lttb(x, y, n_out):
+    """Indices of the Largest-Triangle-Three-Buckets subset of (x, y); NaN points are skipped"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    xs, ys = x[valid], y[valid]
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets between the two ends
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Third vertex: the average of the next bucket (or the last point)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx = xs[nlo:max(nhi, nlo + 1)].mean()
+        cy = ys[nlo:max(nhi, nlo + 1)].mean()
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return valid[keep]
+
+
+def bucket_size(n, max_points):
+    """Bars per bucket so that n bars fit in max_points equal buckets"""
+    return max(1, -(-n // max_points))
+
+
+def bucket_candles(timestamps, open_, high, low, close, size):
+    """Merge every `size` consecutive bars into one candle stamped at the bucket's last bar"""
+    if size == 1:
+        return timestamps, open_, high, low, close
+    starts = np.arange(0, len(timestamps), size)
+    ends = np.append(starts[1:], len(timestamps)) - 1
+    return (
+        timestamps[ends], open_[starts], np.fmax.reduceat(high, starts), np.fmin.reduceat(low, starts), close[ends],
+    )
+
+
+def downsample(timestamps, ohlc, overlays, max_points):
+    """Reduced frames for one zoom level: 'candles', 'bands', 'supertrend' and 'psar' (times in epoch ms)"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    size = bucket_size(len(timestamps), max_points)
+    t, o, h, l, c = bucket_candles(timestamps, *ohlc, size)
+    candles_df = pd.DataFrame({"time": t, "Open": o, "High": h, "Low": l, "Close": c})
+
+    # The bands move together, so the middle line's LTTB points serve all three
+    keep = lttb(timestamps, overlays["bb_middle"], len(t))
+    bands = pd.DataFrame({"time": timestamps[keep], "upper": overlays["bb_upper"][keep],
+                          "middle": overlays["bb_middle"][keep], "lower": overlays["bb_lower"][keep]})
+
+    keep = lttb(timestamps, overlays["supertrend"], len(t))
+    direction = overlays["supertrend_dir"][keep]
+    supertrend = pd.DataFrame({
+        "time": timestamps[keep], "value": overlays["supertrend"][keep],
+        "side": np.where(direction > 0, "bull", "bear"),
+        # One line per trend run so bullish and bearish stretches are drawn apart
+        "segment": np.concatenate(([0], np.cumsum(direction[1:] != direction[:-1]))) if len(keep) else [],
+    })
+
+    sar, up = overlays["psar"], overlays["psar_up"]
+    valid = np.flatnonzero(np.isfinite(sar))
+    if size > 1:
+        valid = valid[np.append(np.arange(size, len(valid), size), len(valid)) - 1]
+    psar_df = pd.DataFrame({"time": timestamps[valid], "value": sar[valid], "side": np.where(up[valid], "bull", "bear")})
+    return {"candles": candles_df, "bands": bands, "supertrend": supertrend, "psar": psar_df}
+
+
+def price_chart(data, poc=None, height=420):
+    """Layered Altair chart: candles, Bollinger bands, SuperTrend, PSAR dots and an optional POC rule"""
+    x = alt.X("time:T", title=None)
+    candles_df = data["candles"]
+    rising = alt.condition("datum.Close >= datum.Open", alt.value(BULL_COLOR), alt.value(BEAR_COLOR))
+    base = alt.Chart(candles_df).encode(x=x, color=rising)
+    wicks = base.mark_rule().encode(y=alt.Y("Low:Q", title="Price", scale=alt.Scale(zero=False)), y2="High:Q")
+    bar_size = max(1.0, min(8.0, 900 / max(len(candles_df), 1)))
+    bodies = base.mark_bar(size=bar_size).encode(
+        y="Open:Q", y2="Close:Q",
+        tooltip=[alt.Tooltip("time:T"), "Open:Q", "High:Q", "Low:Q", "Close:Q"],
+    )
+
+    sides = alt.Scale(domain=["bull", "bear"], range=[BULL_COLOR, BEAR_COLOR])
+    bands = alt.Chart(data["bands"]).encode(x=x)
+    band_lines = [
+        bands.mark_line(color=BAND_COLOR, strokeWidth=1, strokeDash=[4, 3] if column == "middle" else [1, 0])
+        .encode(y=f"{column}:Q")
+        for column in ("upper", "middle", "lower")
+    ]
+    supertrend = alt.Chart(data["supertrend"]).mark_line(strokeWidth=1.5).encode(
+        x=x, y="value:Q", color=alt.Color("side:N", scale=sides, legend=None), detail="segment:N",
+    )
+    dots = alt.Chart(data["psar"]).mark_circle(size=12).encode(
+        x=x, y="value:Q", color=alt.Color("side:N", scale=sides, legend=None),
+    )
+
+    layers = [wicks, bodies, *band_lines, supertrend, dots]
+    if poc is not None:
+        layers.append(
+            alt.Chart(pd.DataFrame({"poc": [poc]})).mark_rule(color=POC_COLOR, strokeDash=[6, 4]).encode(y="poc:Q")
+        )
+    return alt.layer(*layers).properties(height=height).interactive(bind_y=False)
+
+
+def liquidity_heatmap(cells, mids, height=360):
+    """Price x time rectangles shaded by resting notional (log scale), with the mid price as a line"""
+    x = alt.X("t0:T", title=None)
+    heat = alt.Chart(cells).mark_rect().encode(
+        x=x, x2="t1:T",
+        y=alt.Y("lo:Q", title="Price", scale=alt.Scale(zero=False)), y2="hi:Q",
+        color=alt.Color("notional:Q", title="Resting $", scale=alt.Scale(type="log", scheme="inferno")),
+        tooltip=[alt.Tooltip("lo:Q", title="from", format=",.2f"), alt.Tooltip("hi:Q", title="to", format=",.2f"),
+                 alt.Tooltip("notional:Q", title="resting $", format=",.0f")],
+    )
+    mid = alt.Chart(mids).mark_line(color=BAND_COLOR, strokeWidth=1.5).encode(x="time:T", y="mid:Q")
+    return alt.layer(heat, mid).properties(height=height)
+
+
+class ChartCache:
+    """Small LRU of downsampled chart data keyed by view"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
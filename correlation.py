@@ -0,0 +1,204 @@
+"""Rolling correlation, beta and relative strength across the coin universe.
+
+`RollingCorrelation` keeps the last `window` log returns of every symbol in a
+ring buffer together with running sums of returns and of their outer
+products. Each new bar adds one outer product and removes the one leaving
+the window, so the covariance matrix is maintained in O(n²) per bar instead
+of being recomputed from the full window (O(n²·window)). The sums are
+periodically rebuilt from the buffer to stop floating-point drift.
+
+The tracker remembers the last timestamp it has seen; `sync` only pushes
+newer bars, so a tracker held in `st.cache_resource` is brought up to date
+on each rerun with the few bars that arrived since the previous one. The
+last bar of a series is usually the live candle, whose close still changes.
+`sync` pushes it as a provisional row and takes it out again at the next
+sync, so only closed bars stay in the window and the running sums.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+def log_returns(close):
+    """Log returns of a (T, N) close matrix; missing bars count as no move"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.diff(np.log(close), axis=0)
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+class RollingCorrelation:
+    """Incrementally updated rolling covariance of log returns for a fixed universe"""
+
+    def __init__(self, symbols, window=42, benchmark="BTC", resync_every=None, history=500, live_last_bar=True):
+        if window < 2:
+            raise ValueError("window must be at least 2 bars")
+        self.symbols = list(symbols)
+        self.window = window
+        self.benchmark = benchmark if benchmark in self.symbols else self.symbols[0]
+        self.resync_every = resync_every or window * 10
+        self.live_last_bar = live_last_bar
+        self.last_timestamp = None  # timestamp of the last closed bar pushed
+        self.mean_correlation_history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        n = len(self.symbols)
+        self._buffer = np.zeros((self.window, n))
+        self._pos = 0
+        self._count = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._since_resync = 0
+        self._live = None  # (pos, count, evicted row, since_resync, in history) from before the provisional row
+
+    def _resync(self):
+        rows = self._buffer if self._count == self.window else self._buffer[:self._count]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+        self._since_resync = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    def update(self, returns_row):
+        """Push one bar of returns (length N) into the window"""
+        row = np.nan_to_num(np.asarray(returns_row, dtype=float))
+        if self._count == self.window:
+            old = self._buffer[self._pos]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        self._buffer[self._pos] = row
+        self._sum += row
+        self._cross += np.outer(row, row)
+        self._pos = (self._pos + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every:
+            self._resync()
+
+    def _push_live(self, returns_row, timestamp):
+        """Push a row that the next `_retract_live` takes out again"""
+        evicted = self._buffer[self._pos].copy() if self._count == self.window else None
+        state = (self._pos, self._count, evicted, self._since_resync)
+        self.update(returns_row)
+        recorded = self._count >= 2
+        if recorded:
+            self.mean_correlation_history.append((timestamp, self.mean_correlation()))
+        self._live = state + (recorded,)
+
+    def _retract_live(self):
+        pos, count, evicted, since_resync, recorded = self._live
+        row = self._buffer[pos].copy()
+        self._sum -= row
+        self._cross -= np.outer(row, row)
+        if evicted is not None:
+            self._buffer[pos] = evicted
+            self._sum += evicted
+            self._cross += np.outer(evicted, evicted)
+        self._pos, self._count, self._since_resync = pos, count, since_resync
+        if recorded and self.mean_correlation_history:
+            self.mean_correlation_history.pop()
+        self._live = None
+
+    def extend(self, returns, timestamps=None):
+        """Push many bars; records the mean pairwise correlation after each one"""
+        for i, row in enumerate(returns):
+            self.update(row)
+            if self._count >= 2:
+                ts = timestamps[i] if timestamps is not None else None
+                self.mean_correlation_history.append((ts, self.mean_correlation()))
+
+    def sync(self, aligned):
+        """Bring the window up to date with an aligned OHLCV matrix; returns closed bars added"""
+        symbols, index, close = aligned["symbols"], aligned["index"], aligned["Close"]
+        with self._lock:
+            if list(symbols) != self.symbols:
+                self.symbols = list(symbols)
+                self.benchmark = self.benchmark if self.benchmark in self.symbols else self.symbols[0]
+                self.last_timestamp = None
+
+            if self.last_timestamp is None:
+                self._reset()
+                self.mean_correlation_history.clear()
+                new_rows = np.arange(1, len(index))
+            else:
+                if self._live is not None:
+                    self._retract_live()
+                new_rows = np.nonzero(index > self.last_timestamp)[0]
+                new_rows = new_rows[new_rows > 0]
+
+            if len(new_rows) == 0:
+                return 0
+            returns = log_returns(np.vstack([close[new_rows[0] - 1], close[new_rows]]))
+            closed = len(new_rows) - (1 if self.live_last_bar else 0)
+            if closed > 0:
+                self.extend(returns[:closed], index[new_rows[:closed]])
+                self.last_timestamp = index[new_rows[closed - 1]]
+            if closed < len(new_rows):
+                self._push_live(returns[-1], index[-1])
+            return max(closed, 0)
+
+    def covariance(self):
+        n = self._count
+        if n < 2:
+            return np.full((len(self.symbols),) * 2, np.nan)
+        mean = self._sum / n
+        return (self._cross - n * np.outer(mean, mean)) / (n - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(std, std)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return corr
+
+    def mean_correlation(self):
+        corr = self.correlation()
+        n = len(self.symbols)
+        if n < 2:
+            return np.nan
+        off_diagonal = corr[~np.eye(n, dtype=bool)]
+        return float(np.nanmean(off_diagonal)) if np.isfinite(off_diagonal).any() else np.nan
+
+    def beta(self):
+        """Beta of every symbol to the benchmark over the window"""
+        cov = self.covariance()
+        b = self.symbols.index(self.benchmark)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return cov[:, b] / cov[b, b]
+
+    def window_returns(self):
+        """Compounded return of each symbol over the window"""
+        return np.expm1(self._sum)
+
+    def relative_strength(self):
+        """Window performance relative to the benchmark (1.0 = in line)"""
+        b = self.symbols.index(self.benchmark)
+        return np.exp(self._sum - self._sum[b])
+
+    def snapshot(self):
+        """Correlation matrix and ranking table as DataFrames, ready for display"""
+        with self._lock:
+            corr = pd.DataFrame(self.correlation(), index=self.symbols, columns=self.symbols)
+            b = self.symbols.index(self.benchmark)
+            table = pd.DataFrame({
+                "Return %": self.window_returns() * 100,
+                f"Beta to {self.benchmark}": self.beta(),
+                f"Corr to {self.benchmark}": corr.iloc[:, b].to_numpy(),
+                "Relative Strength": self.relative_strength(),
+            }, index=self.symbols)
+            table["RS Rank"] = table["Relative Strength"].rank(ascending=False, method="min").astype(int)
+            return {
+                "correlation": corr,
+                "ranking": table.sort_values("RS Rank"),
+                "mean_correlation": self.mean_correlation(),
+                "history": list(self.mean_correlation_history),
+                "bars": self._count,
+            }
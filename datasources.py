@@ -0,0 +1,476 @@
+"""Market data sources with latency hedging and per-source circuit breakers.
+
+A source answers two questions, each normalised to the app's formats:
+
+    fetch_price(symbol)         -> (price, 24h change %)
+    fetch_candles(symbol, days) -> CandleStore stamped at candle close, with volume
+
+`CoinGeckoSource` wraps the OHLC + market_chart endpoints. `ExchangeSource`
+speaks the common exchange REST shape (`/klines`, `/ticker/24hr`) and
+requests the candle width CoinGecko would use for the same `days`. OHLC is
+comparable across the two; volume is not. CoinGecko's candle volume is the
+sum of its rolling-24h `total_volumes` samples, the exchange's is one
+venue's quote volume per bar, and neither converts into the other. Each
+source names its `volume_unit`, and `MarketData.fetch_candles` drops the
+volume (NaN, VolumeMissing) of candles from a source whose unit differs
+from the primary's, so a symbol's volume never changes scale because a
+backup answered first. Both go through
+`replay.http_get`, so record/replay and the local stub server work for
+either. Candles from both are sorted and de-duplicated (`integrity.clean`),
+and `ExchangeSource.fetch_range` serves the backfill of gaps by time range.
+
+Every HTTP request a source makes is charged to its `bucket` (the
+prefetcher's `prefetch.TokenBucket`, shared with background refreshes), so
+CoinGecko's two requests per candle load and every hedge and failover count
+against the rate budget.
+
+`MarketData.fetch` tries the sources in priority order. When the running
+request is slower than that source's recent p95 for the same call, a backup
+request goes to the next source and the first good answer wins. Backups are
+optional, so none is sent while the bucket is out of budget. A failure
+moves straight on to the next source. Each source has a `CircuitBreaker`.
+After `failure_threshold` consecutive failures the source is skipped for
+`reset_timeout` seconds, then a single trial request decides whether it
+comes back. Only source-health errors count as failures: transport errors
+and timeouts, HTTP 5xx and 429, and malformed payloads (`SourceUnavailable`).
+A source that answers "no such symbol" or "not enough data" is healthy, so
+one user's typos cannot open the breaker for every session.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import requests
+
+import candles
+import decode
+import integrity
+import replay
+
+EXCHANGE_API_BASE = "https://api.binance.com/api/v3"
+MIN_CANDLES = 10
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+
+
+class SourceError(Exception):
+    """A source (or every source) failed to produce usable data"""
+
+
+class SourceUnavailable(SourceError):
+    """The source itself is unhealthy (HTTP 5xx or 429, malformed payload); counts against its breaker"""
+
+
+# Failures that say something about the source rather than the request
+HEALTH_ERRORS = (requests.exceptions.RequestException, SourceUnavailable)
+
+
+def coingecko_candle_ms(days):
+    """Candle width CoinGecko's OHLC endpoint returns for `days` of history"""
+    if days <= 2:
+        return 30 * MINUTE_MS
+    if days <= 30:
+        return 4 * HOUR_MS
+    return 4 * DAY_MS
+
+
+# --- NORMALISATION ---
+def aggregate_volume_to_bars(bar_index, volume_index, volume):
+    """Sum volume samples into each bar's (previous close, close] window; also returns sample counts"""
+    bar_ts = bar_index.asi8
+    sample_ts = volume_index.as_unit(bar_index.unit).asi8
+    if len(bar_ts) == 0:
+        return np.zeros(0), np.zeros(0, dtype=np.int64)
+
+    # CoinGecko stamps candles at their close; each bar spans one bar width back, and never
+    # further than the previous bar, so the bar after a missing candle does not absorb its volume
+    step = np.median(np.diff(bar_ts)).astype(bar_ts.dtype) if len(bar_ts) > 1 else 0
+    opens = bar_ts - step
+    opens[1:] = np.maximum(opens[1:], bar_ts[:-1])
+
+    valid = np.isfinite(volume)
+    cum_volume = np.concatenate(([0.0], np.cumsum(np.where(valid, volume, 0.0))))
+    cum_count = np.concatenate(([0], np.cumsum(valid)))
+    lo = np.searchsorted(sample_ts, opens, side='right')
+    hi = np.searchsorted(sample_ts, bar_ts, side='right')
+    return cum_volume[hi] - cum_volume[lo], cum_count[hi] - cum_count[lo]
+
+
+def merge_ohlc_with_volume(df_ohlc, df_volume):
+    """Merge OHLC data with volume summed over each candle; uncovered candles get NaN and VolumeMissing"""
+    if df_ohlc is None or df_volume is None:
+        return df_ohlc
+
+    volume_series = df_volume['Volume']
+    if not volume_series.index.is_monotonic_increasing:
+        volume_series = volume_series.sort_index()
+
+    volume, samples = aggregate_volume_to_bars(
+        df_ohlc.index, volume_series.index, volume_series.to_numpy(dtype=float)
+    )
+    missing = samples == 0
+    volume[missing] = np.nan
+
+    # assign() only adds columns to a shallow copy, leaving the cached OHLC frame untouched
+    return df_ohlc.assign(Volume=volume, VolumeMissing=missing)
+
+
+def group_bars(timestamps, open_, high, low, close, volume, factor):
+    """Merge every `factor` consecutive bars into one, aligned to the last bar; a partial first group is dropped"""
+    n = len(timestamps) // factor * factor
+    if n == 0:
+        empty = np.zeros(0)
+        return np.zeros(0, dtype=np.int64), empty, empty, empty, empty, empty
+    start = len(timestamps) - n
+    shape = (n // factor, factor)
+    return (
+        timestamps[start + factor - 1::factor],
+        open_[start:].reshape(shape)[:, 0],
+        high[start:].reshape(shape).max(axis=1),
+        low[start:].reshape(shape).min(axis=1),
+        close[start:].reshape(shape)[:, -1],
+        volume[start:].reshape(shape).sum(axis=1),
+    )
+
+
+def without_volume(store):
+    """The same bars with volume marked missing"""
+    return candles.CandleStore.from_arrays(store.timestamps, store.open, store.high, store.low, store.close)
+
+
+# --- SOURCES ---
+class DataSource:
+    """Base class: a named provider of prices and candles"""
+
+    name = "source"
+    volume_unit = None  # what a candle's Volume measures; candles are only mixed with others of the same unit
+    bucket = None  # token bucket charged one token per HTTP request; None leaves requests unmetered
+
+    def fetch_price(self, symbol):
+        raise NotImplementedError
+
+    def fetch_candles(self, symbol, days=30):
+        raise NotImplementedError
+
+    def _get(self, url, params, timeout, headers=None):
+        if self.bucket is not None:
+            self.bucket.consume()
+        response = replay.http_get(url, params=params, headers=headers or {}, timeout=timeout)
+        if response.status_code != 200:
+            error = SourceUnavailable if response.status_code >= 500 or response.status_code == 429 else SourceError
+            raise error(f"{self.name}: HTTP {response.status_code}")
+        return response
+
+    def _check(self, store, symbol):
+        if store is None or len(store) < MIN_CANDLES:
+            raise SourceError(f"{self.name}: insufficient historical data for {symbol}")
+        return store
+
+
+class CoinGeckoSource(DataSource):
+    """CoinGecko simple/price, coins/{id}/ohlc, coins/{id}/market_chart and coins/list"""
+
+    name = "coingecko"
+    volume_unit = "usd_24h_rolling_sum"
+
+    def __init__(self, api_base=replay.API_BASE, api_key="", coin_id=str.lower, timeout=15, bucket=None):
+        self.api_base = api_base
+        self.coin_id = coin_id
+        self.timeout = timeout
+        self.bucket = bucket
+        self.headers = {'x-cg-demo-api-key': api_key} if api_key else {}
+
+    def fetch_price(self, symbol):
+        coin_id = self.coin_id(symbol)
+        params = {'ids': coin_id, 'vs_currencies': 'usd', 'include_24hr_change': 'true'}
+        data = self._get(f"{self.api_base}/simple/price", params, min(self.timeout, 10), self.headers).json()
+        if coin_id not in data or 'usd' not in data[coin_id]:
+            raise SourceError(f"{self.name}: no price for {symbol}")
+        return float(data[coin_id]['usd']), float(data[coin_id].get('usd_24h_change', 0))
+
+    def fetch_candles(self, symbol, days=30):
+        coin_id = self.coin_id(symbol)
+        params = {'vs_currency': 'usd', 'days': days}
+        response = self._get(f"{self.api_base}/coins/{coin_id}/ohlc", params, self.timeout, self.headers)
+        df = decode.ohlc_frame(response.content)
+        if df is not None:
+            df = integrity.clean_frame(df)  # duplicated or out-of-order candles would skew the volume merge
+        if df is None or len(df) < MIN_CANDLES:
+            raise SourceError(f"{self.name}: insufficient historical data for {symbol}")
+
+        # Volume is best effort: candles without it are still usable
+        try:
+            response = self._get(f"{self.api_base}/coins/{coin_id}/market_chart", params, self.timeout, self.headers)
+            df = merge_ohlc_with_volume(df, decode.volume_frame(response.content))
+        except (requests.exceptions.RequestException, SourceError):
+            pass
+        return candles.CandleStore.from_frame(df)
+
+    def fetch_coin_list(self):
+        """Every listed coin as {"id", "symbol", "name"}"""
+        coins = self._get(f"{self.api_base}/coins/list", None, self.timeout, self.headers).json()
+        if not isinstance(coins, list) or not coins:
+            raise SourceError(f"{self.name}: empty coin list")
+        return coins
+
+
+class ExchangeSource(DataSource):
+    """Exchange-style REST: /klines candles and /ticker/24hr prices for <SYMBOL><QUOTE> pairs"""
+
+    name = "exchange"
+    volume_unit = "quote_per_bar"
+    # Candle widths the kline endpoint offers, widest first
+    INTERVALS = {"1d": DAY_MS, "4h": 4 * HOUR_MS, "1h": HOUR_MS, "30m": 30 * MINUTE_MS}
+    MAX_LIMIT = 1000
+
+    def __init__(self, api_base=EXCHANGE_API_BASE, quote="USDT", timeout=15, bucket=None):
+        self.api_base = api_base
+        self.quote = quote
+        self.timeout = timeout
+        self.bucket = bucket
+
+    def pair(self, symbol):
+        base = symbol.upper()
+        for suffix in (self.quote, "USDT", "USD"):
+            if base.endswith(suffix) and len(base) > len(suffix):
+                base = base[:-len(suffix)]
+                break
+        return base + self.quote
+
+    def fetch_price(self, symbol):
+        data = self._get(f"{self.api_base}/ticker/24hr", {'symbol': self.pair(symbol)}, min(self.timeout, 10)).json()
+        try:
+            return float(data['lastPrice']), float(data['priceChangePercent'])
+        except (KeyError, TypeError, ValueError):
+            raise SourceError(f"{self.name}: no price for {symbol}")
+
+    def fetch_candles(self, symbol, days=30):
+        target_ms = coingecko_candle_ms(days)
+        interval, step_ms = next((k, v) for k, v in self.INTERVALS.items() if target_ms % v == 0)
+        factor = target_ms // step_ms
+        # One extra candle, as CoinGecko includes the bar open at the start of the range
+        limit = min(self.MAX_LIMIT, math.ceil(days * DAY_MS / step_ms) + factor)
+        params = {'symbol': self.pair(symbol), 'interval': interval, 'limit': limit}
+        table = self._klines(params, symbol)
+        if len(table) < MIN_CANDLES * factor:
+            raise SourceError(f"{self.name}: insufficient historical data for {symbol}")
+
+        bars = self._bars(table)
+        if factor > 1:
+            bars = group_bars(*bars, factor)
+        return self._check(integrity.clean(candles.CandleStore.from_arrays(*bars)), symbol)
+
+    def _klines(self, params, symbol):
+        rows = decode.loads(self._get(f"{self.api_base}/klines", params, self.timeout).content)
+        try:
+            # open time, open, high, low, close, base volume, close time, quote volume, ...
+            return np.array([row[:8] for row in rows], dtype=float).reshape(-1, 8)
+        except (TypeError, ValueError):
+            raise SourceUnavailable(f"{self.name}: malformed klines for {symbol}")
+
+    @staticmethod
+    def _bars(table):
+        timestamps = table[:, 6].astype(np.int64) + 1  # stamp at candle close, like CoinGecko
+        return timestamps, table[:, 1], table[:, 2], table[:, 3], table[:, 4], table[:, 7]
+
+    def fetch_range(self, symbol, interval_ms, first_close_ms, last_close_ms):
+        """Bars of width `interval_ms` closing in [first_close_ms, last_close_ms], for backfilling gaps"""
+        interval = next((k for k, v in self.INTERVALS.items() if v == interval_ms), None)
+        if interval is None:
+            raise SourceError(f"{self.name}: no {interval_ms // MINUTE_MS}m klines to backfill from")
+        limit = min(self.MAX_LIMIT, (last_close_ms - first_close_ms) // interval_ms + 1)
+        params = {'symbol': self.pair(symbol), 'interval': interval, 'limit': limit,
+                  'startTime': first_close_ms - interval_ms, 'endTime': last_close_ms - interval_ms}
+        return candles.CandleStore.from_arrays(*self._bars(self._klines(params, symbol)))
+
+
+# --- HEALTH ---
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures -> half-open after `reset_timeout`"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """Whether a request may go to this source now; half-open lets one trial through"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def record_answered(self):
+        """The source answered, without data for this request: ends a trial, leaves the failure count alone"""
+        with self._lock:
+            if self._trial:
+                self.failures, self.opened_at, self._trial = 0, None, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class LatencyTracker:
+    """Recent successful latencies per call; p95 once enough samples exist"""
+
+    def __init__(self, window=100, min_samples=10):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            return float(np.percentile(self._samples, 95))
+
+
+class MarketData:
+    """Hedged, failover fetches over an ordered list of sources"""
+
+    def __init__(self, sources, hedge=True, initial_hedge_delay=2.0, min_hedge_delay=0.05, timeout=15.0,
+                 failure_threshold=3, reset_timeout=30.0, workers=8, bucket=None, clock=time.monotonic):
+        self.sources = list(sources)
+        self.bucket = bucket  # shared by every source; hedges wait while it is empty
+        if bucket is not None:
+            for source in self.sources:
+                source.bucket = bucket
+        self._by_name = {s.name: s for s in self.sources}
+        self.hedge = hedge
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.timeout = timeout
+        self.breakers = {s.name: CircuitBreaker(failure_threshold, reset_timeout, clock) for s in self.sources}
+        self.latency = {}
+        self.served = {s.name: 0 for s in self.sources}
+        self.hedges = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="market-data")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _tracker(self, source, method):
+        with self._lock:
+            return self.latency.setdefault((source.name, method), LatencyTracker())
+
+    def hedge_delay(self, source, method):
+        """Seconds to wait on `source` before asking the next one"""
+        p95 = self._tracker(source, method).p95()
+        return self.initial_hedge_delay if p95 is None else max(p95, self.min_hedge_delay)
+
+    def _call(self, source, method, args):
+        breaker = self.breakers[source.name]
+        started = time.perf_counter()
+        try:
+            result = getattr(source, method)(*args)
+        except HEALTH_ERRORS:
+            breaker.record_failure()
+            raise
+        except Exception:
+            breaker.record_answered()  # unknown symbol, empty history: the request's fault, not the source's
+            raise
+        self._tracker(source, method).record(time.perf_counter() - started)
+        breaker.record_success()
+        return result
+
+    def fetch(self, method, *args):
+        """(result, source name) of the first source to answer `method(*args)`; SourceError if none can"""
+        remaining_sources = iter(self.sources)
+        pending, errors = {}, []
+        deadline = time.monotonic() + self.timeout
+
+        def launch():
+            for source in remaining_sources:
+                if self.breakers[source.name].allow():
+                    pending[self._executor.submit(self._call, source, method, args)] = source
+                    return source
+                errors.append(f"{source.name}: circuit open")
+            return None
+
+        latest = launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = min(remaining, self.hedge_delay(latest, method)) if self.hedge else remaining
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                if self.bucket is not None and not self.bucket.has():
+                    continue  # a backup request is optional: keep waiting on the running one
+                hedged = launch()
+                if hedged is not None:
+                    latest = hedged
+                    with self._lock:
+                        self.hedges += 1
+                continue
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    result = future.result()
+                except SourceError as e:
+                    errors.append(str(e))  # already prefixed with the source name
+                    continue
+                except Exception as e:
+                    errors.append(f"{source.name}: {e}")
+                    continue
+                with self._lock:
+                    self.served[source.name] += 1
+                return result, source.name
+            if not pending:
+                latest = launch() or latest
+
+        errors += [f"{source.name}: timed out after {self.timeout:.0f}s" for source in pending.values()]
+        raise SourceError("; ".join(errors) or "no data sources configured")
+
+    def fetch_candles(self, symbol, days=30):
+        """(CandleStore, source name) like `fetch`; volume in a unit other than the primary source's is dropped"""
+        store, name = self.fetch("fetch_candles", symbol, days)
+        if self._by_name[name].volume_unit != self.sources[0].volume_unit:
+            store = without_volume(store)
+        return store, name
+
+    def health(self):
+        """Per-source breaker state, p95 latencies and requests served"""
+        with self._lock:
+            latency = dict(self.latency)
+        return {
+            source.name: {
+                "state": self.breakers[source.name].state,
+                "failures": self.breakers[source.name].failures,
+                "served": self.served[source.name],
+                "p95_ms": {method: round(t.p95() * 1000, 1) for (name, method), t in latency.items()
+                           if name == source.name and t.p95() is not None},
+            }
+            for source in self.sources
+        }
@@ -0,0 +1,154 @@
+"""Fast decoding of CoinGecko OHLC and market_chart payloads into NumPy columns.
+
+The generic path (`response.json()` -> list of lists -> DataFrame ->
+to_datetime -> set_index -> rename -> sort_index) materialises every number
+as a Python object and copies the frame several times. Both payloads are
+flat arrays of numeric rows, so instead the raw bytes are rewritten into CSV
+(one row per line) and parsed by pyarrow's multi-threaded CSV reader into
+typed columns: int64 timestamps and float64 values. pyarrow is listed in
+requirements.txt. Without it the brackets are stripped and NumPy's
+(deprecated) `fromstring` text parser fills one float64 buffer, which is
+several times slower.
+For market_chart only the `total_volumes` array is sliced out; `prices` and
+`market_caps` are never decoded.
+
+The sort is skipped when timestamps are already increasing (the normal
+case). Anything unexpected (nulls, error payloads, odd shapes) falls back to
+a full JSON decode via orjson when installed, else the standard library.
+"""
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # in requirements.txt; the NumPy fallback keeps a bare install working
+    pa = None
+
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+_BRACKETS = b"[]"
+# '[[1,2],[3,4]]' -> '\n\n1,2,\n3,4': every '[' starts a line, every ']' is dropped
+_ROWS_TO_CSV = bytes.maketrans(b"[", b"\n")
+
+
+def loads(content):
+    """Full JSON decode, orjson when available"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _arrow_columns(content, width):
+    """pyarrow CSV parse of the row bytes into `width` columns, or None"""
+    # Appending ',' gives the last row the same trailing empty field as the others
+    body = bytes(content).translate(_ROWS_TO_CSV, b"]") + b","
+    names = [f"c{i}" for i in range(width + 1)]
+    types = {name: pa.float64() for name in names[1:width]}
+    types[names[0]] = pa.int64()
+    try:
+        table = pa_csv.read_csv(
+            pa.py_buffer(body),
+            read_options=pa_csv.ReadOptions(column_names=names),
+            convert_options=pa_csv.ConvertOptions(column_types=types, include_columns=names[:width]),
+        )
+    except (pa.ArrowInvalid, ValueError):
+        return None
+    if table.num_rows == 0 or any(column.null_count for column in table.columns):
+        return None
+    return [column.to_numpy() for column in table.columns]
+
+
+def _numpy_columns(content, width):
+    """np.fromstring parse of the row bytes into `width` columns, or None"""
+    body = bytes(content).translate(None, _BRACKETS).strip()
+    if not body:
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        try:
+            values = np.fromstring(body.decode("ascii"), sep=",")
+        except (ValueError, UnicodeDecodeError, DeprecationWarning):
+            return None
+    if len(values) != body.count(b",") + 1 or len(values) % width:
+        return None
+    rows = values.reshape(-1, width)
+    return [rows[:, 0].astype(np.int64)] + [rows[:, i] for i in range(1, width)]
+
+
+def parse_numeric_rows(content, width):
+    """Parse '[[ts,a,...],[...]]' bytes into [int64 timestamps, float64 columns...], or None"""
+    if pa is not None:
+        return _arrow_columns(content, width)
+    return _numpy_columns(content, width)
+
+
+def _json_columns(rows, width):
+    """Columns from already-decoded JSON rows, or None if they aren't numeric rows of `width`"""
+    try:
+        rows = np.asarray(rows, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    if rows.ndim != 2 or rows.shape[1] != width or not len(rows):
+        return None
+    return [rows[:, 0].astype(np.int64)] + [rows[:, i] for i in range(1, width)]
+
+
+def _array_slice(content, key):
+    """Raw bytes of the JSON array stored under `key` in a flat object of row arrays"""
+    content = bytes(content)
+    start = content.find(b'"' + key.encode() + b'"')
+    if start < 0:
+        return None
+    start = content.find(b"[", start)
+    if start < 0:
+        return None
+    first = content[start + 1:start + 64].lstrip()[:1]
+    if first == b"]":
+        return b"[]"
+    end = content.find(b"]]", start)
+    if end < 0:
+        return None
+    chunk = content[start:end + 2]
+    # A quote means the match ran into another key, i.e. the layout isn't compact rows
+    return None if b'"' in chunk else chunk
+
+
+def _frame(columns, names):
+    """DataFrame of columns[1:] under `names`, indexed by the ms timestamps in columns[0]"""
+    timestamps, values = columns[0], columns[1:]
+    if len(timestamps) > 1 and not np.all(timestamps[1:] >= timestamps[:-1]):
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], [v[order] for v in values]
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name="timestamp")
+    return pd.DataFrame(dict(zip(names, values)), index=index, copy=False)
+
+
+def ohlc_frame(content):
+    """OHLC payload -> DataFrame[Open, High, Low, Close]; None if not a list of candles"""
+    columns = parse_numeric_rows(content, 5)
+    if columns is None:
+        data = loads(content)
+        columns = _json_columns(data, 5) if isinstance(data, list) else None
+        if columns is None:
+            return None
+    return _frame(columns, OHLC_COLUMNS)
+
+
+def volume_frame(content):
+    """market_chart payload -> DataFrame[Volume] from total_volumes only; None if absent"""
+    chunk = _array_slice(content, "total_volumes")
+    columns = parse_numeric_rows(chunk, 2) if chunk is not None else None
+    if columns is None:
+        data = loads(content)
+        columns = _json_columns(data.get('total_volumes'), 2) if isinstance(data, dict) else None
+        if columns is None:
+            return None
+    return _frame(columns, ['Volume'])
@@ -0,0 +1,279 @@
+"""Price/oscillator divergence engine over the full series.
+
+Pivots use the app's swing rule: a close strictly above (swing high) or
+below (swing low) the `left` bars before it and the `right` bars after it.
+Every pair of consecutive pivots on the same side is classified at once
+with array arithmetic:
+
+    regular bearish   price higher high, oscillator lower high
+    hidden bearish    price lower high,  oscillator higher high
+    regular bullish   price lower low,   oscillator higher low
+    hidden bullish    price higher low,  oscillator lower low
+
+`scan_divergences` does this statelessly for any number of oscillators and
+returns one row per event with bar indices. `DivergenceScanner` remembers
+the pivots and events it has already confirmed, keyed by timestamp so a
+sliding window works too. Each update only examines the bars after the last
+confirmed position. A pivot that depends on the still-forming last candle is
+reported as provisional and examined again on the next update.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+EVENT_COLUMNS = ["oscillator", "direction", "kind", "start", "end", "start_time", "end_time",
+                 "price_start", "price_end", "osc_start", "osc_end", "provisional"]
+
+
+def find_pivots(values, left=2, right=1):
+    """(swing high indices, swing low indices) of a 1-D array"""
+    v = np.asarray(values, dtype=float)
+    n = len(v)
+    if n < left + right + 1:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    core = v[left:n - right]
+    highs = np.ones(len(core), dtype=bool)
+    lows = np.ones(len(core), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for k in range(1, left + 1):
+            before = v[left - k:n - right - k]
+            highs &= core > before
+            lows &= core < before
+        for k in range(1, right + 1):
+            after = v[left + k:n - right + k]
+            highs &= core > after
+            lows &= core < after
+    return np.flatnonzero(highs) + left, np.flatnonzero(lows) + left
+
+
+def classify_pairs(side, price_start, price_end, osc_start, osc_end):
+    """{(direction, kind): mask} for consecutive pivot pairs on one side ('high' or 'low')"""
+    with np.errstate(invalid="ignore"):
+        valid = np.isfinite(osc_start) & np.isfinite(osc_end)
+        price_up, price_down = price_end > price_start, price_end < price_start
+        osc_up, osc_down = osc_end > osc_start, osc_end < osc_start
+    if side == "high":
+        return {("bearish", "regular"): valid & price_up & osc_down,
+                ("bearish", "hidden"): valid & price_down & osc_up}
+    return {("bullish", "regular"): valid & price_down & osc_up,
+            ("bullish", "hidden"): valid & price_up & osc_down}
+
+
+def _pair_events(name, side, pairs, provisional=False):
+    """Event columns for the diverging rows of `pairs` (dict of equal-length arrays)"""
+    events = []
+    for (direction, kind), mask in classify_pairs(
+        side, pairs["price_start"], pairs["price_end"], pairs["osc_start"], pairs["osc_end"]
+    ).items():
+        if mask.any():
+            events.append({"oscillator": name, "direction": direction, "kind": kind, "provisional": provisional,
+                           **{key: values[mask] for key, values in pairs.items()}})
+    return events
+
+
+def _events_frame(events, sort_by="end"):
+    if not events:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    frame = pd.concat([pd.DataFrame(e) for e in events], ignore_index=True)
+    frame = frame.sort_values([sort_by, "oscillator"], kind="stable", ignore_index=True)
+    return frame.reindex(columns=EVENT_COLUMNS)
+
+
+def _scan(close, oscillators, index=None, left=2, right=1, max_gap=None, pivots=None):
+    """Event dicts of every divergence between consecutive pivots; `pivots` skips the pivot search"""
+    price = np.asarray(close, dtype=float)
+    highs, lows = find_pivots(price, left, right) if pivots is None else pivots
+    events = []
+    for side, found in (("high", highs), ("low", lows)):
+        start, end = found[:-1], found[1:]
+        if max_gap is not None:
+            keep = end - start <= max_gap
+            start, end = start[keep], end[keep]
+        if not len(start):
+            continue
+        times = {"start_time": index[start], "end_time": index[end]} if index is not None else \
+            {"start_time": np.full(len(start), None), "end_time": np.full(len(end), None)}
+        for name, values in oscillators.items():
+            osc = np.asarray(values, dtype=float)
+            events += _pair_events(name, side, {
+                "start": start, "end": end, **times,
+                "price_start": price[start], "price_end": price[end],
+                "osc_start": osc[start], "osc_end": osc[end],
+            })
+    return events
+
+
+def scan_divergences(close, oscillators, index=None, left=2, right=1, max_gap=None):
+    """Every regular and hidden divergence between `close` and each oscillator, one row per event"""
+    return _events_frame(_scan(close, oscillators, index, left, right, max_gap))
+
+
+def divergence_label(close, oscillator, highs=None, lows=None, lookback=30):
+    """The app's divergence label from the last two pivots of each side in the trailing window.
+
+    Classified by the same pair rules as `scan_divergences`, so the single-symbol
+    and batch paths agree. `highs`/`lows` are pivot indices already known (from
+    a `DivergenceScanner`); without them the window is searched.
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    first, last = n - lookback + 2, n - 2
+    if highs is None or lows is None:
+        highs, lows = (found + n - lookback for found in find_pivots(close[-lookback:]))
+
+    def last_two(found):
+        found = np.asarray(found, dtype=np.int64)
+        return found[(found >= first) & (found <= last)][-2:]
+
+    pivots = (last_two(highs), last_two(lows))
+    found = {(e["direction"], e["kind"]) for e in _scan(close, {"osc": oscillator}, pivots=pivots)}
+    label = "No Divergence"
+    if ("bearish", "regular") in found:
+        label = "Bearish Divergence"
+    elif ("bearish", "hidden") in found:
+        label = "Bearish Hidden Divergence"
+    if ("bullish", "regular") in found:
+        label = "Bullish Divergence"
+    elif label == "No Divergence" and ("bullish", "hidden") in found:
+        label = "Bullish Hidden Divergence"
+    return label
+
+
+class DivergenceScanner:
+    """Incremental divergence scan for one symbol over a growing or sliding series"""
+
+    def __init__(self, left=2, right=1, max_gap=None, live_last_bar=True):
+        self.left = left
+        self.right = right
+        self.max_gap = max_gap
+        self.live_last_bar = live_last_bar
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checked_until = None  # timestamp of the last bar already examined for a pivot
+        self.bars_examined = 0
+        # Confirmed pivots per side: parallel timestamp / price / {oscillator: value} lists
+        self._pivots = {side: {"ts": [], "price": [], "osc": []} for side in ("high", "low")}
+        # Confirmed events, start_time / end_time as int64 ms
+        self._committed = _events_frame([], sort_by="end_time")
+        self._version = 0
+        self._window_cache = (None, None)  # ((version, first ts), events table)
+
+    def update(self, timestamps, close, oscillators):
+        """Examine newly arrived bars of a DatetimeIndex-aligned series.
+
+        Returns (events table, high pivot indices, low pivot indices) for the current window.
+        The events table may be shared between calls; treat it as read-only.
+        """
+        ts = pd.DatetimeIndex(timestamps).as_unit("ms").asi8
+        price = np.asarray(close, dtype=float)
+        oscs = {name: np.asarray(values, dtype=float) for name, values in oscillators.items()}
+        n = len(price)
+        # Last position whose pivot test uses closed bars only
+        final = n - 1 - self.right - (1 if self.live_last_bar else 0)
+
+        with self._lock:
+            if self.checked_until is not None and (n == 0 or ts[0] > self.checked_until):
+                self.reset()  # the window moved past everything remembered
+            start = self.left
+            if self.checked_until is not None:
+                start = max(start, int(np.searchsorted(ts, self.checked_until, side="right")))
+            if final >= start:
+                new_events = []
+                self._examine(ts, price, oscs, start, final, self._pivots, new_events)
+                if new_events:
+                    self._committed = pd.concat([self._committed, _events_frame(new_events, sort_by="end_time")],
+                                                ignore_index=True)
+                    self._version += 1
+                self.checked_until = int(ts[final])
+                self.bars_examined += final - start + 1
+            if n and len(self._committed) and self._committed["end_time"].iat[0] < ts[0]:
+                self._committed = self._committed[self._committed["end_time"] >= ts[0]].reset_index(drop=True)
+                self._version += 1
+
+            # The pivot confirmed only by the live candle is evaluated but not remembered
+            pivots = {side: {k: list(v) for k, v in p.items()} for side, p in self._pivots.items()}
+            provisional = []
+            tail = max(start, final + 1)
+            if tail <= n - 1 - self.right:
+                self._examine(ts, price, oscs, tail, n - 1 - self.right, pivots, provisional, provisional=True)
+            # Bar indices of committed events only move when the window start or the events change
+            key = (self._version, int(ts[0]) if n else None)
+            if self._window_cache[0] != key:
+                self._window_cache = (key, self._window(ts, self._committed))
+            frame = self._window_cache[1]
+            if provisional:
+                extra = self._window(ts, _events_frame(provisional, sort_by="end_time"))
+                frame = pd.concat([frame, extra], ignore_index=True)
+
+        highs, lows = self._pivot_positions(ts, pivots)
+        return frame, highs, lows
+
+    def _examine(self, ts, price, oscs, start, stop, pivots, events, provisional=False):
+        """Find pivots at positions start..stop and pair each with the previous one on its side"""
+        segment = price[start - self.left:stop + self.right + 1]
+        for side, found in zip(("high", "low"), find_pivots(segment, self.left, self.right)):
+            found = found + start - self.left
+            if not len(found):
+                continue
+            known = pivots[side]
+            end_ts = ts[found]
+            if known["ts"]:
+                # Take the previous pivot's values from the current window when it is still inside it
+                prev_ts = known["ts"][-1]
+                prev_idx = int(np.searchsorted(ts, prev_ts))
+                in_window = prev_idx < len(ts) and ts[prev_idx] == prev_ts
+                start_ts = np.concatenate(([prev_ts], end_ts[:-1]))
+                price_start = np.concatenate(([price[prev_idx] if in_window else known["price"][-1]], price[found[:-1]]))
+                osc_start = {name: np.concatenate(([osc[prev_idx] if in_window else known["osc"][-1].get(name, np.nan)],
+                                                   osc[found[:-1]]))
+                             for name, osc in oscs.items()}
+                end = found
+            else:
+                start_ts, end = end_ts[:-1], found[1:]
+                price_start = price[found[:-1]]
+                osc_start = {name: osc[found[:-1]] for name, osc in oscs.items()}
+                end_ts = end_ts[1:]
+
+            keep = np.ones(len(end), dtype=bool)
+            if self.max_gap is not None:
+                step = np.median(np.diff(ts[max(start - self.left, 0):stop + self.right + 1]))
+                keep = np.rint((end_ts - start_ts) / step) <= self.max_gap
+            for name, osc in oscs.items():
+                events += _pair_events(name, side, {
+                    "start_time": start_ts[keep], "end_time": end_ts[keep],
+                    "price_start": price_start[keep], "price_end": price[end][keep],
+                    "osc_start": osc_start[name][keep], "osc_end": osc[end][keep],
+                }, provisional=provisional)
+
+            known["ts"].extend(int(t) for t in ts[found])
+            known["price"].extend(float(p) for p in price[found])
+            known["osc"].extend({name: float(osc[i]) for name, osc in oscs.items()} for i in found)
+            for values in known.values():
+                del values[:-2]
+
+    def _window(self, ts, frame):
+        """Events with bar indices in the current window; start is -1 if it fell off"""
+        frame = frame.copy()
+        if len(frame):
+            start_ts = frame["start_time"].to_numpy(dtype=np.int64)
+            end_ts = frame["end_time"].to_numpy(dtype=np.int64)
+            start = np.searchsorted(ts, start_ts)
+            frame["start"] = np.where((start < len(ts)) & (ts[np.minimum(start, len(ts) - 1)] == start_ts), start, -1)
+            frame["end"] = np.searchsorted(ts, end_ts)
+            frame["start_time"] = pd.to_datetime(start_ts, unit="ms")
+            frame["end_time"] = pd.to_datetime(end_ts, unit="ms")
+        return frame
+
+    @staticmethod
+    def _pivot_positions(ts, pivots):
+        positions = []
+        for side in ("high", "low"):
+            known = np.asarray(pivots[side]["ts"], dtype=np.int64)
+            idx = np.searchsorted(ts, known)
+            inside = (idx < len(ts)) & (ts[np.minimum(idx, len(ts) - 1)] == known) if len(ts) else idx < 0
+            positions.append(idx[inside])
+        return positions
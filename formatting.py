@@ -0,0 +1,7 @@
+def format_price(p):
+    if p is None: return "N/A" 
+    try: p = float(p)
+    except: return "N/A" 
+    if abs(p) >= 10: return f"{p:,.2f}"
+    elif abs(p) >= 1: return f"{p:,.4f}" 
+    else: return f"{p:.6f}".rstrip("0").rstrip(".")
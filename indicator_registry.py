@@ -0,0 +1,166 @@
+"""Indicator registry and dependency-graph scheduler.
+
+Each node is a function of the OHLCV frame plus the nodes it names in
+`inputs` (a sequence of node names, or {keyword: node name} to pass a node
+under a different argument name), its fixed `params` and any run-time
+`context` values it asks for (e.g. the symbol). Intermediates such as the true range or RSI series are
+nodes too. Every node runs once per `compute` call however many indicators
+depend on it.
+
+Nodes run level by level in dependency order. Nodes on the same level are
+independent and go to a thread pool when an executor is given. A node that
+raises yields its error result. Nodes that depend on it are skipped with
+their own error result, and every other node is unaffected.
+
+Output nodes may carry a `vote(result, results) -> (bullish, bearish)`
+function. `tally` sums the votes, so a new indicator takes part in the
+overall bias by registering a vote and nothing else.
+"""
+from concurrent.futures import wait
+
+
+class IndicatorNode:
+    """One registered computation"""
+
+    __slots__ = ("name", "func", "inputs", "params", "context", "output", "vote", "error_extra")
+
+    def __init__(self, name, func, inputs=(), params=None, context=(), output=True, vote=None, error_extra=None):
+        self.name = name
+        self.func = func
+        self.inputs = dict(inputs) if isinstance(inputs, dict) else {name: name for name in inputs}
+        self.params = dict(params or {})
+        self.context = tuple(context)
+        self.output = output
+        self.vote = vote
+        self.error_extra = dict(error_extra or {})
+
+    def error(self, detail):
+        return {"status": "Error", "value": None, "detail": detail, **self.error_extra}
+
+
+class IndicatorRegistry:
+    """Named indicator and intermediate nodes with their dependencies"""
+
+    def __init__(self):
+        self._nodes = {}
+        self._levels = None
+
+    def register(self, name, func, inputs=(), params=None, context=(), output=True, vote=None, error_extra=None):
+        """Add (or replace) `func(df, **inputs, **params, **context)` under `name`"""
+        self._nodes[name] = IndicatorNode(name, func, inputs, params, context, output, vote, error_extra)
+        self._levels = None
+
+    def __contains__(self, name):
+        return name in self._nodes
+
+    @property
+    def outputs(self):
+        return [name for name, node in self._nodes.items() if node.output]
+
+    def levels(self):
+        """Node names grouped so every node's inputs sit on an earlier level"""
+        if self._levels is None:
+            depth = {}
+
+            def visit(name, path=()):
+                if name in depth:
+                    return depth[name]
+                if name in path:
+                    raise ValueError(f"Indicator dependency cycle: {' -> '.join(path + (name,))}")
+                node = self._nodes.get(name)
+                if node is None:
+                    raise KeyError(f"Unknown indicator input {name!r} (needed by {path[-1] if path else '?'})")
+                depth[name] = 1 + max((visit(dep, path + (name,)) for dep in node.inputs.values()), default=-1)
+                return depth[name]
+
+            for name in self._nodes:
+                visit(name)
+            levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+            for name, d in depth.items():
+                levels[d].append(name)
+            self._levels = levels
+        return self._levels
+
+    def _required(self, names):
+        needed, stack = set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self._nodes[name].inputs.values())
+        return needed
+
+    def _run(self, node, df, values, context):
+        kwargs = {key: values[dep] for key, dep in node.inputs.items()}
+        kwargs.update(node.params)
+        kwargs.update({key: context.get(key) for key in node.context})
+        return node.func(df, **kwargs)
+
+    def compute(self, df, names=None, executor=None, include_intermediates=False, on_result=None, **context):
+        """Run the requested nodes (all outputs by default) and everything they depend on
+
+        `on_result(name, result)` is called for each output node as soon as
+        its level has finished, so callers can show results before the rest
+        are done.
+        """
+        needed = self._required(names if names is not None else self.outputs)
+        values, failed = {}, {}
+
+        for level in self.levels():
+            runnable = []
+            for name in level:
+                if name not in needed:
+                    continue
+                node = self._nodes[name]
+                broken = [dep for dep in node.inputs.values() if dep in failed]
+                if broken:
+                    failed[name] = f"{broken[0]} unavailable"
+                else:
+                    runnable.append(node)
+
+            if executor is not None and len(runnable) > 1:
+                futures = {executor.submit(self._run, node, df, values, context): node for node in runnable}
+                wait(futures)
+                outcomes = [(futures[f], f.exception(), None if f.exception() else f.result()) for f in futures]
+            else:
+                outcomes = []
+                for node in runnable:
+                    try:
+                        outcomes.append((node, None, self._run(node, df, values, context)))
+                    except Exception as e:
+                        outcomes.append((node, e, None))
+
+            for node, exc, result in outcomes:
+                if exc is not None:
+                    failed[node.name] = str(exc) or type(exc).__name__
+                else:
+                    values[node.name] = result
+
+            if on_result is not None:
+                for name in level:
+                    if name in needed and self._nodes[name].output:
+                        on_result(name, self._result(name, values, failed))
+
+        results = {}
+        for name, node in self._nodes.items():
+            if name not in needed or not (node.output or include_intermediates or (names is not None and name in names)):
+                continue
+            results[name] = self._result(name, values, failed)
+        return results
+
+    def _result(self, name, values, failed):
+        return self._nodes[name].error(failed[name]) if name in failed else values[name]
+
+    def tally(self, results):
+        """(bullish, bearish) vote totals over the output nodes present in `results`"""
+        bullish = bearish = 0
+        for name, node in self._nodes.items():
+            if node.vote is None or name not in results:
+                continue
+            result = results[name]
+            if isinstance(result, dict) and result.get("status") == "Error":
+                continue
+            bull, bear = node.vote(result, results)
+            bullish += bull
+            bearish += bear
+        return bullish, bearish
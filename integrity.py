@@ -0,0 +1,218 @@
+"""Candle series integrity: gap, duplicate and ordering checks plus targeted backfill.
+
+Every fetched series is checked against the candle width it is supposed
+to have, with one pass of array operations and no per-bar Python:
+
+    out of order  a timestamp lower than the one before it
+    duplicates    the same close timestamp more than once
+    gaps          consecutive bars further apart than one interval; the
+                  missing close timestamps are whole multiples in between
+
+`clean` sorts the bars and keeps the last copy of a duplicated bar (a live
+candle is re-sent as it updates). Gaps cannot be repaired from the same
+response. `Backfiller` asks a range-capable source for exactly the missing
+bars and keeps them as a per-series patch. `apply` merges the patch into
+later fetches of that series, so a hole is requested once, not on every
+refresh. Whole histories are never refetched to fill a gap. A range source
+from another provider fills OHLC only (`volume=False`): its volume is on a
+different scale from the series', so the patched bars' volume is marked
+missing rather than mixed in.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import candles
+
+
+def inspect(timestamps, interval_ms):
+    """Integrity report for ms close timestamps expected every `interval_ms`"""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    steps = np.diff(ts)
+    out_of_order = int(np.count_nonzero(steps < 0))
+    ordered = np.sort(ts) if out_of_order else ts
+    ordered_steps = np.diff(ordered)
+    duplicates = int(np.count_nonzero(ordered_steps == 0))
+    at = np.flatnonzero(ordered_steps > interval_ms)
+    gaps = [
+        (int(ordered[i]), int(ordered[i + 1]), int((ordered[i + 1] - ordered[i]) // interval_ms) - 1) for i in at
+    ]
+    return {
+        "bars": len(ts),
+        "interval_ms": interval_ms,
+        "out_of_order": out_of_order,
+        "duplicates": duplicates,
+        "gaps": gaps,
+        "missing": sum(n for _, _, n in gaps),
+        "misaligned": int(np.count_nonzero(ordered_steps % interval_ms)) if len(ordered_steps) else 0,
+    }
+
+
+def is_clean(report):
+    return not (report["out_of_order"] or report["duplicates"] or report["gaps"])
+
+
+def clean_order(timestamps):
+    """Positions that put bars in time order with one bar per timestamp (the last copy wins)"""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    if len(ts) < 2 or np.all(ts[1:] > ts[:-1]):
+        return None
+    order = np.argsort(ts, kind="stable")
+    ordered = ts[order]
+    keep = np.append(ordered[1:] != ordered[:-1], True)
+    return order[keep]
+
+
+def clean(store):
+    """Store sorted by time with duplicates dropped; the same store when already clean"""
+    positions = clean_order(store.timestamps)
+    if positions is None:
+        return store
+    return candles.CandleStore.from_arrays(store.timestamps[positions], *store.values[:, positions])
+
+
+def clean_frame(df):
+    """DataFrame counterpart of `clean`, for frames indexed by timestamp"""
+    positions = clean_order(df.index.as_unit("ms").asi8)
+    return df if positions is None else df.iloc[positions]
+
+
+def missing_timestamps(report):
+    """Close timestamps of every bar the report's gaps are missing"""
+    step = report["interval_ms"]
+    parts = [np.arange(after + step, before, step, dtype=np.int64) for after, before, _ in report["gaps"]]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+def runs(timestamps, interval_ms, max_bars=None):
+    """Split sorted timestamps into (first, last) runs of consecutive bars, at most `max_bars` long"""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    if not len(ts):
+        return []
+    breaks = np.flatnonzero(np.diff(ts) != interval_ms) + 1
+    spans = []
+    for run in np.split(ts, breaks):
+        for i in range(0, len(run), max_bars or len(run)):
+            chunk = run[i:i + (max_bars or len(run))]
+            spans.append((int(chunk[0]), int(chunk[-1])))
+    return spans
+
+
+def merge(store, patch):
+    """`store` plus the bars of `patch` whose timestamps it lacks, within its own time span"""
+    if patch is None or not len(patch) or not len(store):
+        return store
+    ts = patch.timestamps
+    inside = (ts > store.timestamps[0]) & (ts < store.timestamps[-1])
+    new = inside & ~np.isin(ts, store.timestamps, assume_unique=True)
+    if not new.any():
+        return store
+    timestamps = np.concatenate((store.timestamps, ts[new]))
+    values = np.concatenate((store.values, patch.values[:, new]), axis=1)
+    order = np.argsort(timestamps, kind="stable")
+    return candles.CandleStore.from_arrays(timestamps[order], *values[:, order])
+
+
+class Backfiller:
+    """Fetches only the missing bars of gapped series and patches later reads of them"""
+
+    def __init__(self, fetch_range, bucket=None, workers=2, max_bars=1000, retry_after=300, volume=True,
+                 clock=time.monotonic):
+        self.fetch_range = fetch_range  # (symbol, interval_ms, first_close_ms, last_close_ms) -> CandleStore
+        self.volume = volume  # False: patched bars keep OHLC only, with volume missing
+        self.bucket = bucket
+        self.max_bars = max_bars
+        self.retry_after = retry_after
+        self.clock = clock
+        self.requests = 0
+        self.completed = 0
+        self.filled = 0
+        self.failures = 0
+        self._patches = {}
+        self._attempts = {}
+        self._merged = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def patch(self, symbol, interval_ms):
+        with self._lock:
+            return self._patches.get((symbol, interval_ms))
+
+    def submit(self, symbol, store, interval_ms):
+        """Queue fetches for the gaps in `store` not already patched or recently tried; returns the report"""
+        report = inspect(store.timestamps, interval_ms)
+        if not report["gaps"]:
+            return report
+        missing = missing_timestamps(report)
+        patch = self.patch(symbol, interval_ms)
+        if patch is not None:
+            missing = np.setdiff1d(missing, patch.timestamps, assume_unique=True)
+        now = self.clock()
+        for first, last in runs(missing, interval_ms, self.max_bars):
+            key = (symbol, interval_ms, first, last)
+            with self._lock:
+                if now - self._attempts.get(key, -np.inf) < self.retry_after:
+                    continue
+                if self.bucket is not None and not self.bucket.try_acquire():
+                    break  # out of upstream budget; the next fetch of this series tries again
+                self._attempts[key] = now
+                self.requests += 1
+            self._executor.submit(self._fill, key)
+        return report
+
+    def _fill(self, key):
+        symbol, interval_ms, first, last = key
+        try:
+            bars = self.fetch_range(symbol, interval_ms, first, last)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            return
+        wanted = np.arange(first, last + 1, interval_ms, dtype=np.int64)
+        bars = clean(bars)
+        keep = np.isin(bars.timestamps, wanted)
+        if not keep.any():
+            with self._lock:
+                self.completed += 1
+            return
+        values = bars.values[:, keep]
+        fresh = candles.CandleStore.from_arrays(bars.timestamps[keep], *(values if self.volume else values[:4]))
+        with self._lock:
+            current = self._patches.get((symbol, interval_ms))
+            if current is None:
+                self._patches[(symbol, interval_ms)] = fresh
+            else:
+                timestamps = np.concatenate((current.timestamps, fresh.timestamps))
+                positions = clean_order(timestamps)
+                values = np.concatenate((current.values, fresh.values), axis=1)
+                if positions is not None:
+                    timestamps, values = timestamps[positions], values[:, positions]
+                self._patches[(symbol, interval_ms)] = candles.CandleStore.from_arrays(timestamps, *values)
+            self.completed += 1
+            self.filled += int(keep.sum())
+
+    def apply(self, symbol, store, interval_ms):
+        """`store` with any backfilled bars merged in; memoised per store and patch"""
+        patch = self.patch(symbol, interval_ms)
+        if patch is None or store is None:
+            return store
+        key = (symbol, interval_ms)
+        with self._lock:
+            cached = self._merged.get(key)
+        if cached is not None and cached[0] is store and cached[1] is patch:
+            return cached[2]
+        merged = merge(store, patch)
+        with self._lock:
+            self._merged[key] = (store, patch, merged)
+        return merged
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "completed": self.completed, "filled": self.filled,
+                    "failures": self.failures,
+                    "patched_series": len(self._patches)}
@@ -0,0 +1,307 @@
+"""Concurrent-session load test for the dashboard.
+
+Starts a CoinGecko stub (synthetic data or recorded fixtures), launches
+`streamlit run streamlit_app.py` against it, then drives N simulated browser
+sessions over Streamlit's websocket protocol. Each session walks through the
+symbol / Risk:Reward / indicator-details interactions and times every rerun
+from request to `script_finished`.
+
+For each concurrency level the report gives rerun latency percentiles,
+server CPU utilisation, resident memory per session and the number of
+upstream requests that got past the app's caches.
+
+    $ python loadtest.py --sessions 1 5 10 25 --iterations 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+import stub_server
+
+try:
+    import websockets
+except ImportError:  # shipped with streamlit, but keep the failure readable
+    websockets = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+SYMBOL_LABELS = ("Select Cryptocurrency", "Enter Cryptocurrency Ticker")
+RR_LABEL = "Risk:Reward Ratio"
+DETAILS_LABEL = "Show Indicator Details"
+DEFAULT_SYMBOLS = ["BTC", "ETH", "SOL"]
+WIDGET_TYPES = ("selectbox", "checkbox", "text_input", "number_input")
+
+
+# --- SERVER PROCESS ---
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _process_stats(pid):
+    """(cpu_seconds, rss_bytes) for a process, via psutil or /proc"""
+    if psutil is not None:
+        proc = psutil.Process(pid)
+        cpu = proc.cpu_times()
+        return cpu.user + cpu.system, proc.memory_info().rss
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / ticks
+    with open(f"/proc/{pid}/statm") as f:
+        rss_pages = int(f.read().split()[1])
+    return cpu_seconds, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def start_streamlit(api_base, port, extra_secrets=None, app_path=APP_PATH, extra_args=()):
+    secrets = {"CG_PUBLIC_API_KEY": "", "CG_API_BASE": api_base, "EXCHANGE_API_BASE": api_base, "DATA_SOURCE": "live"}
+    secrets.update(extra_secrets or {})
+    secrets_file = tempfile.NamedTemporaryFile("w", suffix=".toml", delete=False)
+    with secrets_file:
+        for key, value in secrets.items():
+            secrets_file.write(f"{key} = {json.dumps(value)}\n")
+
+    cmd = [
+        sys.executable, "-m", "streamlit", "run", app_path,
+        "--server.headless", "true",
+        "--server.address", "127.0.0.1",
+        "--server.port", str(port),
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+        "--secrets.files", secrets_file.name,
+        *extra_args,
+    ]
+    # Run from the repo root so its .streamlit/config.toml applies
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=os.path.dirname(APP_PATH))
+
+    health_url = f"http://127.0.0.1:{port}/_stcore/health"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Streamlit exited early: {proc.stderr.read().decode(errors='replace')}")
+        try:
+            with urllib.request.urlopen(health_url, timeout=1) as response:
+                if response.status == 200:
+                    return proc, secrets_file.name
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("Streamlit server did not become healthy within 60s")
+
+
+# --- SIMULATED SESSION ---
+class SimulatedSession:
+    """One browser tab: tracks widgets from deltas and replays interactions"""
+
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.widgets = {}
+        self.values = {}
+        self.latencies = []
+        self.errors = 0
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def _track_widget(self, element):
+        kind = element.WhichOneof("type")
+        if kind not in WIDGET_TYPES:
+            return
+        widget = getattr(element, kind)
+        self.widgets[widget.label] = (kind, widget.id, list(getattr(widget, "options", [])))
+
+    async def rerun(self):
+        """Send the current widget states and wait for the script to finish"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        for label, value in self.values.items():
+            kind, widget_id, _ = self.widgets[label]
+            state = WidgetState(id=widget_id)
+            if kind == "checkbox":
+                state.bool_value = value
+            elif kind == "number_input":
+                state.double_value = value
+            else:
+                state.string_value = value
+            msg.rerun_script.widget_states.widgets.append(state)
+
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                if element.WhichOneof("type") == "exception":
+                    self.errors += 1
+                self._track_widget(element)
+            elif kind == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors += 1
+                break
+        self.latencies.append(time.perf_counter() - started)
+
+    def set(self, label, value):
+        if label in self.widgets:
+            self.values[label] = value
+
+    async def run_scenario(self, symbols, iterations, rr_options):
+        await self.rerun()
+        symbol_label = next((label for label in SYMBOL_LABELS if label in self.widgets), None)
+        for i in range(iterations):
+            for symbol in symbols:
+                if symbol_label:
+                    self.set(symbol_label, symbol)
+                    await self.rerun()
+            rr_choices = rr_options or [o for o in self.widgets.get(RR_LABEL, (None, None, []))[2] if o != "Custom"]
+            if rr_choices:
+                self.set(RR_LABEL, rr_choices[i % len(rr_choices)])
+                await self.rerun()
+            self.set(DETAILS_LABEL, not self.values.get(DETAILS_LABEL, False))
+            await self.rerun()
+
+
+async def _run_level(ws_url, n_sessions, symbols, iterations, rr_options, clear_cache):
+    sessions = [SimulatedSession(ws_url) for _ in range(n_sessions)]
+    await asyncio.gather(*(s.connect() for s in sessions))
+    if clear_cache:
+        msg = BackMsg()
+        msg.clear_cache = True
+        await sessions[0].ws.send(msg.SerializeToString())
+        await asyncio.sleep(0.2)
+    await asyncio.gather(*(s.run_scenario(symbols, iterations, rr_options) for s in sessions))
+    return sessions
+
+
+# --- REPORTING ---
+def _percentiles(latencies):
+    if not latencies:
+        return {}
+    arr = np.asarray(latencies) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+    }
+
+
+def run_load_test(levels, iterations=2, symbols=None, rr_options=None, fixture_dir=None,
+                  upstream_latency_ms=0, clear_cache=True, extra_secrets=None):
+    """Drive each concurrency level in turn and return one result dict per level"""
+    if websockets is None:
+        raise RuntimeError("loadtest.py needs the 'websockets' package (installed with streamlit)")
+
+    symbols = symbols or DEFAULT_SYMBOLS
+    stub = stub_server.StubServer(fixture_dir=fixture_dir, latency_ms=upstream_latency_ms).start()
+    port = _free_port()
+    proc, secrets_path = start_streamlit(stub.api_base, port, extra_secrets)
+    ws_url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    results = []
+
+    try:
+        # One untimed pass so imports and first-run allocations don't count against level 1
+        asyncio.run(_run_until_measured(ws_url, 1, symbols[:1], 1, rr_options, False, proc.pid))
+        for n_sessions in levels:
+            stub.reset_request_counts()
+            cpu_before, rss_before = _process_stats(proc.pid)
+            started = time.perf_counter()
+            sessions, cpu_after, rss_peak = asyncio.run(
+                _run_until_measured(ws_url, n_sessions, symbols, iterations, rr_options, clear_cache, proc.pid)
+            )
+            wall = time.perf_counter() - started
+
+            latencies = [lat for s in sessions for lat in s.latencies]
+            results.append({
+                "sessions": n_sessions,
+                "reruns": len(latencies),
+                "errors": sum(s.errors for s in sessions),
+                "wall_s": wall,
+                "reruns_per_s": len(latencies) / wall if wall else 0.0,
+                **_percentiles(latencies),
+                "cpu_util": (cpu_after - cpu_before) / wall if wall else 0.0,
+                "rss_mb": rss_peak / 2**20,
+                "mb_per_session": max(rss_peak - rss_before, 0) / 2**20 / n_sessions,
+                "upstream_requests": stub.request_counts(),
+            })
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        stub.stop()
+        os.unlink(secrets_path)
+    return results
+
+
+async def _run_until_measured(ws_url, n_sessions, symbols, iterations, rr_options, clear_cache, pid):
+    """Run one level and sample server stats while its sessions are still connected"""
+    sessions = await _run_level(ws_url, n_sessions, symbols, iterations, rr_options, clear_cache)
+    cpu_after, rss_peak = _process_stats(pid)
+    await asyncio.gather(*(s.close() for s in sessions))
+    return sessions, cpu_after, rss_peak
+
+
+def format_report(results):
+    header = f"{'sessions':>8} {'reruns':>7} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'rr/s':>7} {'cpu':>6} {'MB/sess':>8}  upstream"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        upstream = ", ".join(f"{k}={v}" for k, v in sorted(r["upstream_requests"].items())) or "0"
+        lines.append(
+            f"{r['sessions']:>8} {r['reruns']:>7} {r['errors']:>4} "
+            f"{r.get('p50_ms', 0):>7.0f}ms {r.get('p95_ms', 0):>6.0f}ms {r.get('p99_ms', 0):>6.0f}ms {r.get('max_ms', 0):>6.0f}ms "
+            f"{r['reruns_per_s']:>7.1f} {r['cpu_util'] * 100:>5.0f}% {r['mb_per_session']:>8.2f}  {upstream}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for streamlit_app.py")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10], help="concurrency levels to run in order")
+    parser.add_argument("--iterations", type=int, default=2, help="scenario loops per session")
+    parser.add_argument("--symbols", nargs="+", default=DEFAULT_SYMBOLS)
+    parser.add_argument("--fixture-dir", default=None, help="serve recorded fixtures instead of synthetic stub data")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0)
+    parser.add_argument("--warm", action="store_true", help="keep st.cache_data between levels")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_load_test(
+        args.sessions, args.iterations, args.symbols, fixture_dir=args.fixture_dir,
+        upstream_latency_ms=args.upstream_latency_ms, clear_cache=not args.warm,
+    )
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Monte Carlo odds for a breakout trade plan.
+
+Future closes are simulated by block-bootstrapping the loaded history's log
+returns: runs of `block` consecutive returns are drawn at random and
+chained, so short-range volatility clustering survives. All paths are
+simulated at once as one (paths, horizon) array.
+
+A plan is an entry trigger, a stop and one or more targets on the same
+side. On every path the trade enters on the first close through the
+trigger, or at once if the trigger has already been hit. From there the
+first close beyond the stop or a target decides the outcome. All targets
+(one per risk:reward choice) are scored on the same paths, so the options
+are compared on identical futures. Closes only: an intrabar touch that
+reverses before the close does not count.
+"""
+import numpy as np
+
+OUTCOME_COLUMNS = ["target", "p_target", "p_stop", "p_open", "p_no_entry", "bars_to_target", "bars_to_stop",
+                   "expected_r"]
+
+
+def log_returns(close):
+    close = np.asarray(close, dtype=float)
+    returns = np.diff(np.log(close))
+    return returns[np.isfinite(returns)]
+
+
+def block_bootstrap(returns, n_paths, horizon, block=6, rng=None):
+    """(n_paths, horizon) float32 returns built from random runs of `block` consecutive historical returns"""
+    rng = np.random.default_rng(rng)
+    returns = np.asarray(returns, dtype=np.float32)
+    block = max(1, min(block, len(returns)))
+    n_blocks = -(-horizon // block)
+    starts = rng.integers(0, len(returns) - block + 1, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :horizon]
+    return returns[idx]
+
+
+def _first(mask, horizon):
+    """Index of the first True per row, `horizon` where there is none"""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), horizon)
+
+
+def simulate_plan(close, entry, stop, targets, direction="LONG", triggered=False, horizon=42, n_paths=20_000,
+                  block=6, seed=0):
+    """Outcome probabilities, mean bars to hit and expected R per target, as a dict of arrays (OUTCOME_COLUMNS)"""
+    returns = log_returns(close)
+    if len(returns) < 2:
+        raise ValueError("Not enough history to bootstrap returns")
+    sign = 1.0 if direction == "LONG" else -1.0
+    targets = np.atleast_1d(np.asarray(targets, dtype=float))
+
+    # In sign-adjusted log space a short behaves like a long: up is favourable
+    origin = np.log(float(close[-1]))
+    x = sign * (origin + np.cumsum(block_bootstrap(returns, n_paths, horizon, block, seed), axis=1))
+    entry_x, stop_x = sign * np.log(entry), sign * np.log(stop)
+    target_x = sign * np.log(targets)
+
+    entered_at = np.full(n_paths, -1) if triggered else _first(x >= entry_x, horizon)
+    in_trade = np.arange(horizon)[None, :] > entered_at[:, None]
+    best = np.maximum.accumulate(np.where(in_trade, x, -np.inf), axis=1)
+    worst = np.minimum.accumulate(np.where(in_trade, x, np.inf), axis=1)
+    stop_at = _first(worst <= stop_x, horizon)
+
+    entered = entered_at < horizon
+    risk = abs(entry_x - stop_x)
+    final_r = (x[:, -1] - entry_x) / risk  # open trades marked at the last close
+    result = {key: np.zeros(len(targets)) for key in OUTCOME_COLUMNS}
+    result["target"] = targets
+    for k, tx in enumerate(target_x):
+        target_at = _first(best >= tx, horizon)
+        won = entered & (target_at < stop_at)
+        lost = entered & (stop_at < target_at)
+        still_open = entered & ~won & ~lost
+        reward = (tx - entry_x) / risk
+        result["p_target"][k] = won.mean()
+        result["p_stop"][k] = lost.mean()
+        result["p_open"][k] = still_open.mean()
+        result["p_no_entry"][k] = 1.0 - entered.mean()
+        result["bars_to_target"][k] = target_at[won].mean() + 1 if won.any() else np.nan
+        result["bars_to_stop"][k] = stop_at[lost].mean() + 1 if lost.any() else np.nan
+        result["expected_r"][k] = (won.sum() * reward - lost.sum() + final_r[still_open].sum()) / n_paths
+    return result
@@ -0,0 +1,304 @@
+"""Live L2 order book from an exchange depth stream, and its liquidity history.
+
+Exchanges publish the book as a REST snapshot (`/depth`, stamped with
+`lastUpdateId`) plus a websocket stream of diffs (`<pair>@depth`). Each diff
+carries its first and last update ids (`U`, `u`) and the changed
+`[price, qty]` levels. A quantity of 0 deletes the level. `DepthFeed` runs
+the usual sync procedure on a background thread. It opens the stream, takes
+a snapshot, drops the diffs the snapshot already contains, then applies the
+rest in order. A gap in the update ids means a diff was lost, so the book is
+rebuilt from a new snapshot.
+
+`OrderBook` keeps each side as two sorted numpy arrays, prices and sizes. A
+diff changes existing levels in place by binary search. It only reallocates
+when levels are added or removed. Each side keeps at most `max_levels` levels
+nearest the touch. Most of the cost of applying a diff is fixed per call, so
+the feed merges every diff already waiting on the socket into one apply.
+
+Every `interval` seconds the book is binned into price buckets around the mid
+and written to `DepthHistory`. That is a fixed-size ring buffer, so memory
+stays flat however long the feed runs and however fast diffs arrive.
+`heatmap_frames` turns the ring into price x time cells for
+`chart.liquidity_heatmap`.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import datasources
+import decode
+import replay
+
+try:
+    from websockets.exceptions import ConnectionClosed
+    from websockets.sync.client import connect
+except ImportError:  # in requirements.txt; without it the heatmap panel says so and the rest of the app runs
+    connect = None
+    ConnectionClosed = OSError
+
+STREAM_BASE = "wss://stream.binance.com:9443/ws"
+
+
+def levels(rows):
+    """[[price, qty], ...] (numbers or numeric strings) -> (prices, sizes) float arrays"""
+    table = np.array(rows, dtype=float).reshape(-1, 2)
+    return table[:, 0], table[:, 1]
+
+
+def merge_levels(px, qty, new_px, new_qty):
+    """Apply changed levels to one side held as ascending `px` with sizes `qty`; size 0 removes a level"""
+    if not len(new_px):
+        return px, qty
+    if len(new_px) > 1:
+        order = np.argsort(new_px, kind="stable")
+        new_px, new_qty = new_px[order], new_qty[order]
+        last = np.append(new_px[1:] != new_px[:-1], True)  # a level listed twice (or in two diffs): the later entry wins
+        new_px, new_qty = new_px[last], new_qty[last]
+
+    pos = np.searchsorted(px, new_px)
+    found = pos < len(px)
+    found[found] = px[pos[found]] == new_px[found]
+    qty[pos[found]] = new_qty[found]
+
+    insert = ~found & (new_qty > 0)
+    if insert.any():
+        px = np.insert(px, pos[insert], new_px[insert])
+        qty = np.insert(qty, pos[insert], new_qty[insert])
+    if (new_qty[found] == 0).any():
+        keep = qty > 0
+        px, qty = px[keep], qty[keep]
+    return px, qty
+
+
+class OrderBook:
+    """Bids and asks as ascending price arrays with sizes: the best bid is the last bid, the best ask the first ask"""
+
+    def __init__(self, max_levels=1000):
+        self.max_levels = max_levels
+        self.update_id = 0
+        self.bid_px = self.bid_qty = self.ask_px = self.ask_qty = np.zeros(0)
+
+    def __len__(self):
+        return len(self.bid_px) + len(self.ask_px)
+
+    def load(self, bids, asks, update_id):
+        """Replace the book with a snapshot"""
+        self.bid_px = self.bid_qty = self.ask_px = self.ask_qty = np.zeros(0)
+        self.update_id = 0
+        self.apply(bids, asks, update_id)
+
+    def apply(self, bids, asks, update_id):
+        """Apply the changed levels of one diff, or of consecutive diffs concatenated in order"""
+        bid_px, bid_qty = merge_levels(self.bid_px, self.bid_qty, *levels(bids))
+        ask_px, ask_qty = merge_levels(self.ask_px, self.ask_qty, *levels(asks))
+        self.bid_px, self.bid_qty = bid_px[-self.max_levels:], bid_qty[-self.max_levels:]
+        self.ask_px, self.ask_qty = ask_px[:self.max_levels], ask_qty[:self.max_levels]
+        self.update_id = update_id
+
+    @property
+    def best_bid(self):
+        return float(self.bid_px[-1]) if len(self.bid_px) else None
+
+    @property
+    def best_ask(self):
+        return float(self.ask_px[0]) if len(self.ask_px) else None
+
+    @property
+    def mid(self):
+        if not (len(self.bid_px) and len(self.ask_px)):
+            return None
+        return (self.bid_px[-1] + self.ask_px[0]) / 2
+
+    def binned(self, edges):
+        """Quote notional (price x size) resting in each bucket between consecutive `edges`, both sides"""
+        bins = len(edges) - 1
+        px = np.concatenate((self.bid_px, self.ask_px))
+        qty = np.concatenate((self.bid_qty, self.ask_qty))
+        bucket = np.searchsorted(edges, px, side="right") - 1
+        inside = (bucket >= 0) & (bucket < bins)
+        return np.bincount(bucket[inside], weights=px[inside] * qty[inside], minlength=bins)
+
+
+class DepthHistory:
+    """Fixed-size ring of binned book snapshots: time, mid and notional per price bucket around the mid"""
+
+    def __init__(self, capacity=600, bins=50, span=0.01):
+        self.capacity = capacity
+        self.offsets = np.linspace(-span, span, bins + 1)  # bucket edges relative to the mid
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.mids = np.zeros(capacity)
+        self.notional = np.zeros((capacity, bins), dtype=np.float32)
+        self.count = 0  # snapshots ever written; the ring holds the last `capacity`
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.mids.nbytes + self.notional.nbytes
+
+    def append(self, time_ms, book):
+        mid = book.mid
+        if mid is None:
+            return
+        row = self.count % self.capacity
+        self.times[row] = time_ms
+        self.mids[row] = mid
+        self.notional[row] = book.binned(mid * (1 + self.offsets))
+        self.count += 1
+
+    def view(self):
+        """Copies of times, mids and notional rows, oldest first"""
+        rows = np.arange(self.count - len(self), self.count) % self.capacity
+        return self.times[rows], self.mids[rows], self.notional[rows]
+
+
+def heatmap_frames(state, max_columns=90):
+    """(cells, mids) DataFrames for the heatmap; consecutive snapshots are averaged down to `max_columns`"""
+    times, mids, notional, offsets = state["times"], state["mids"], state["notional"], state["offsets"]
+    n = len(times)
+    if n == 0:
+        return pd.DataFrame(columns=["t0", "t1", "lo", "hi", "notional"]), pd.DataFrame(columns=["time", "mid"])
+
+    size = -(-n // max_columns)
+    starts = np.arange(0, n, size)
+    counts = np.diff(np.append(starts, n))
+    col_mid = np.add.reduceat(mids, starts) / counts
+    col_notional = np.add.reduceat(notional, starts, axis=0) / counts[:, None]
+    step = int(np.median(np.diff(times))) if n > 1 else 1000
+    t0 = times[starts]
+    t1 = np.append(t0[1:], times[-1] + step)
+
+    edges = (col_mid[:, None] * (1 + offsets[None, :])).astype(np.float32)  # float32 halves the bytes sent
+    bins = len(offsets) - 1
+    cells = pd.DataFrame({
+        "t0": np.repeat(t0, bins), "t1": np.repeat(t1, bins),
+        "lo": edges[:, :-1].ravel(), "hi": edges[:, 1:].ravel(), "notional": col_notional.astype(np.float32).ravel(),
+    })
+    return cells[cells["notional"] > 0], pd.DataFrame({"time": t0 + (t1 - t0) // 2, "mid": col_mid})
+
+
+class DepthFeed:
+    """Background thread keeping an OrderBook in sync with an exchange depth stream, sampled into a DepthHistory"""
+
+    def __init__(self, pair, api_base=datasources.EXCHANGE_API_BASE, stream_base=STREAM_BASE, interval=1.0,
+                 capacity=600, bins=50, span=0.01, max_levels=1000, snapshot_limit=1000, max_batch=500,
+                 timeout=10, clock=time.time):
+        self.pair = pair
+        self.api_base = api_base
+        self.stream_url = f"{stream_base}/{pair.lower()}@depth@100ms"
+        self.interval = interval
+        self.snapshot_limit = snapshot_limit
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.clock = clock
+        self.book = OrderBook(max_levels)
+        self.history = DepthHistory(capacity, bins, span)
+        self.status = "connecting"
+        self.error = None
+        self.updates = 0
+        self.resyncs = 0
+        self.rate = 0.0
+        self._sampled_at, self._sampled_updates = None, 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if connect is None:
+            self.status, self.error = "unavailable", "the order book feed needs the 'websockets' package"
+            return self
+        self._thread = threading.Thread(target=self._run, name=f"depth-{self.pair}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout)
+
+    def snapshot(self):
+        """Copy of the history and the touch, safe to read from any thread"""
+        with self._lock:
+            times, mids, notional = self.history.view()
+            return {
+                "pair": self.pair, "times": times, "mids": mids, "notional": notional,
+                "offsets": self.history.offsets, "best_bid": self.book.best_bid, "best_ask": self.book.best_ask,
+                "levels": len(self.book), "status": self.status, "error": self.error,
+                "updates": self.updates, "resyncs": self.resyncs, "rate": self.rate,
+            }
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with connect(self.stream_url, open_timeout=self.timeout, close_timeout=1) as ws:
+                    self._stream(ws)
+                backoff = 1.0
+            except (OSError, TimeoutError, ConnectionClosed, datasources.SourceError, ValueError, KeyError) as exc:
+                with self._lock:
+                    self.status, self.error = "reconnecting", str(exc) or type(exc).__name__
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _stream(self, ws):
+        """Sync from a snapshot, then apply diffs until a gap, an error or stop()"""
+        # The first diff proves the stream is live, so the snapshot taken next cannot predate it
+        pending = [decode.loads(ws.recv(timeout=self.timeout))]
+        self._sync(pending[0]["U"])
+        while not self._stop.is_set():
+            bids, asks, update_id, applied = [], [], self.book.update_id, 0
+            for event in pending:
+                if event["u"] <= update_id:
+                    continue
+                if event["U"] > update_id + 1:
+                    with self._lock:
+                        self.resyncs += 1
+                    return  # a diff was lost; reconnect and rebuild from a fresh snapshot
+                bids += event["b"]
+                asks += event["a"]
+                update_id, applied = event["u"], applied + 1
+            with self._lock:
+                if applied:
+                    self.book.apply(bids, asks, update_id)
+                    self.updates += applied
+                self._sample()
+            pending = self._receive(ws)
+
+    def _receive(self, ws):
+        """Every diff already waiting, at least one unless a second passes, so a backlog is merged in one apply"""
+        pending = []
+        try:
+            pending.append(decode.loads(ws.recv(timeout=1.0)))
+            while len(pending) < self.max_batch:
+                pending.append(decode.loads(ws.recv(timeout=0)))
+        except TimeoutError:
+            pass
+        return pending
+
+    def _sync(self, first_update_id):
+        """Load a snapshot recent enough to continue from the stream's first diff"""
+        for _ in range(3):
+            response = replay.http_get(f"{self.api_base}/depth", params={"symbol": self.pair, "limit": self.snapshot_limit},
+                                       timeout=self.timeout)
+            if response.status_code != 200:
+                raise datasources.SourceError(f"depth snapshot: HTTP {response.status_code}")
+            snapshot = decode.loads(response.content)
+            if snapshot["lastUpdateId"] + 1 >= first_update_id:
+                with self._lock:
+                    self.book.load(snapshot["bids"], snapshot["asks"], snapshot["lastUpdateId"])
+                    self.status, self.error = "live", None
+                return
+        raise datasources.SourceError("depth snapshot stays behind the stream")
+
+    def _sample(self):
+        """Write the binned book into the history once per interval (caller holds the lock)"""
+        now = self.clock()
+        if self._sampled_at is not None and now - self._sampled_at < self.interval:
+            return
+        if self._sampled_at is not None:
+            self.rate = (self.updates - self._sampled_updates) / (now - self._sampled_at)
+        self._sampled_at, self._sampled_updates = now, self.updates
+        self.history.append(int(now * 1000), self.book)
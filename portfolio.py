@@ -0,0 +1,231 @@
+"""Position sizing and combined risk across the active trade plans.
+
+Every directional plan (LONG or SHORT with an entry trigger and a stop) is
+sized so that hitting its stop loses `risk_per_trade` of account equity:
+
+    units = equity * risk_per_trade / |entry - stop|
+
+A tight stop would ask for a huge position, so the notional is capped at
+`max_position` x equity, and such a plan then risks less than the
+budget. Plans of other kinds hold no position.
+
+`Portfolio` keeps the plans as arrays, one row per symbol:
+
+    w  signed notional (long +, short -)
+    s  signed dollar risk to the stop
+
+The aggregates are gross and net exposure, total risk if every stop is hit,
+correlated risk sqrt(s' P s) with P the correlation matrix of returns, and
+the dollar volatility per bar sqrt(w' C w) with C their covariance. Longs
+and shorts on coins that move together offset in the last two. When one
+plan changes by dw, the products C w and P s change by dw times one column,
+and the quadratic forms by 2 dw (C w)_i + dw^2 C_ii. So an update costs O(n)
+rather than O(n^2). The sums are rebuilt in full every `resync_every`
+updates to stop floating-point drift, and whenever the account or the
+covariance changes.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+DIRECTIONS = {"LONG": 1.0, "SHORT": -1.0}
+Z_95 = 1.645  # one-sided 95% quantile of the normal distribution
+
+
+def size_positions(equity, risk_per_trade, entry, stop, max_position=1.0):
+    """(units, notional, risk $) per plan; notional is capped at max_position x equity"""
+    entry = np.asarray(entry, dtype=float)
+    distance = np.abs(entry - np.asarray(stop, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        units = np.where(distance > 0, equity * risk_per_trade / distance, 0.0)
+        units = np.minimum(units, np.where(entry > 0, max_position * equity / entry, 0.0))
+    units = np.nan_to_num(units)
+    return units, units * entry, units * distance
+
+
+def position_size(equity, risk_per_trade, entry, stop, max_position=1.0):
+    """`size_positions` for one plan in plain floats, for single-plan updates"""
+    distance = abs(entry - stop)
+    units = equity * risk_per_trade / distance if distance > 0 else 0.0
+    units = min(units, max_position * equity / entry if entry > 0 else 0.0)
+    return units, units * entry, units * distance
+
+
+def plan_levels(plan):
+    """(direction, entry, stop) of a directional plan, None for any other plan"""
+    direction = DIRECTIONS.get((plan or {}).get("direction"))
+    entry, stop = (plan or {}).get("entry_trigger"), (plan or {}).get("stop_loss")
+    if direction is None or entry is None or stop is None or not (np.isfinite(entry) and np.isfinite(stop)):
+        return None
+    return direction, float(entry), float(stop)
+
+
+def returns_covariance(aligned, window):
+    """Covariance of the last `window` bar log returns of an aligned Close matrix; missing bars count as no move"""
+    close = aligned["Close"][-(window + 1):]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.diff(np.log(close), axis=0)
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+    if len(returns) < 2:
+        return np.zeros((close.shape[1],) * 2)
+    return np.atleast_2d(np.cov(returns, rowvar=False))
+
+
+class Portfolio:
+    """Sized positions for the active plans plus exposure and risk aggregates, updated one plan at a time"""
+
+    def __init__(self, equity=10_000.0, risk_per_trade=0.01, max_position=1.0, resync_every=256):
+        self.equity = float(equity)
+        self.risk_per_trade = float(risk_per_trade)
+        self.max_position = float(max_position)
+        self.resync_every = resync_every
+        self.symbols = []
+        self._index = {}
+        self._plans = {}
+        self._direction = np.zeros(0)
+        self._entry = np.zeros(0)
+        self._stop = np.zeros(0)
+        self._active = np.zeros(0, dtype=bool)
+        self._cov = np.zeros((0, 0))
+        self._corr = np.zeros((0, 0))
+        self._lock = threading.Lock()
+        self._resync()
+
+    def __len__(self):
+        return int(self._active.sum())
+
+    # --- sizing ---
+    def _size(self, rows):
+        units, notional, risk = size_positions(self.equity, self.risk_per_trade, self._entry[rows], self._stop[rows],
+                                               self.max_position)
+        sign = self._direction[rows] * self._active[rows]
+        return units * self._active[rows], sign * notional, sign * risk
+
+    def _resync(self):
+        self._units, self._w, self._s = self._size(slice(None))
+        self._cw = self._cov @ self._w
+        self._ps = self._corr @ self._s
+        self._variance = float(self._w @ self._cw)
+        self._correlated = float(self._s @ self._ps)
+        self._gross = float(np.abs(self._w).sum())
+        self._net = float(self._w.sum())
+        self._heat = float(np.abs(self._s).sum())
+        self._since_resync = 0
+
+    def _add_symbol(self, symbol):
+        self._index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        for name in ("_direction", "_entry", "_stop", "_units", "_w", "_s", "_cw", "_ps"):
+            setattr(self, name, np.append(getattr(self, name), 0.0))
+        self._active = np.append(self._active, False)
+        n = len(self.symbols)
+        # A symbol without return history yet: no volatility, uncorrelated with the rest
+        self._cov = np.pad(self._cov, ((0, 1), (0, 1)))
+        self._corr = np.pad(self._corr, ((0, 1), (0, 1)))
+        self._corr[n - 1, n - 1] = 1.0
+
+    # --- updates ---
+    def set_account(self, equity, risk_per_trade, max_position=None):
+        """New equity or risk budget: every position is resized at once"""
+        with self._lock:
+            changed = (float(equity), float(risk_per_trade)) != (self.equity, self.risk_per_trade)
+            if max_position is not None and float(max_position) != self.max_position:
+                self.max_position, changed = float(max_position), True
+            if changed:
+                self.equity, self.risk_per_trade = float(equity), float(risk_per_trade)
+                self._resync()
+
+    def set_covariance(self, symbols, cov):
+        """Per-bar return covariance for `symbols` (any order, any subset of the plans)"""
+        with self._lock:
+            for symbol in symbols:
+                if symbol not in self._index:
+                    self._add_symbol(symbol)
+            rows = np.array([self._index[symbol] for symbol in symbols], dtype=np.int64)
+            n = len(self.symbols)
+            self._cov = np.zeros((n, n))
+            self._cov[np.ix_(rows, rows)] = cov
+            std = np.sqrt(np.clip(np.diag(self._cov), 0.0, None))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                corr = self._cov / np.outer(std, std)
+            corr = np.nan_to_num(np.clip(corr, -1.0, 1.0))
+            np.fill_diagonal(corr, 1.0)
+            self._corr = corr
+            self._resync()
+
+    def update(self, symbol, plan):
+        """Track the latest plan for `symbol`; only its row and the running products change"""
+        levels = plan_levels(plan)
+        with self._lock:
+            if symbol not in self._index:
+                if levels is None:
+                    return
+                self._add_symbol(symbol)
+            i = self._index[symbol]
+            self._plans[symbol] = plan
+            self._active[i] = levels is not None
+            if levels is not None:
+                self._direction[i], self._entry[i], self._stop[i] = levels
+
+            units, w, s = 0.0, 0.0, 0.0
+            if levels is not None:
+                units, notional, risk = position_size(self.equity, self.risk_per_trade, levels[1], levels[2],
+                                                      self.max_position)
+                w, s = levels[0] * notional, levels[0] * risk
+            dw, ds = w - self._w[i], s - self._s[i]
+            self._variance += 2 * dw * self._cw[i] + dw * dw * self._cov[i, i]
+            self._correlated += 2 * ds * self._ps[i] + ds * ds * self._corr[i, i]
+            self._cw += dw * self._cov[:, i]
+            self._ps += ds * self._corr[:, i]
+            self._gross += abs(w) - abs(self._w[i])
+            self._net += dw
+            self._heat += abs(s) - abs(self._s[i])
+            self._units[i], self._w[i], self._s[i] = units, w, s
+
+            self._since_resync += 1
+            if self._since_resync >= self.resync_every:
+                self._resync()
+
+    def remove(self, symbol):
+        self.update(symbol, None)
+
+    # --- reads ---
+    def position(self, symbol):
+        """{units, notional, risk, risk_pct} for a symbol's plan, None when it has no active plan"""
+        with self._lock:
+            i = self._index.get(symbol)
+            if i is None or not self._active[i]:
+                return None
+            risk = abs(float(self._s[i]))
+            return {"units": float(self._units[i]), "notional": abs(float(self._w[i])), "risk": risk,
+                    "risk_pct": risk / self.equity if self.equity else np.nan}
+
+    def summary(self):
+        """Exposure and risk aggregates over all active plans, in dollars and as a share of equity"""
+        with self._lock:
+            volatility = float(np.sqrt(max(self._variance, 0.0)))
+            correlated = float(np.sqrt(max(self._correlated, 0.0)))
+            values = {
+                "gross_exposure": self._gross, "net_exposure": self._net, "total_risk": self._heat,
+                "correlated_risk": correlated, "bar_volatility": volatility, "var_95": Z_95 * volatility,
+            }
+            equity = self.equity or np.nan
+            summary = {key: float(value) for key, value in values.items()}
+            summary.update({f"{key}_pct": value / equity for key, value in values.items()})
+            summary.update({"plans": int(self._active.sum()), "equity": self.equity,
+                            "risk_per_trade": self.risk_per_trade})
+            return summary
+
+    def positions(self):
+        """One row per active plan: direction, levels, size, exposure and risk"""
+        with self._lock:
+            rows = np.flatnonzero(self._active)
+            equity = self.equity or np.nan
+            return pd.DataFrame({
+                "Direction": np.where(self._direction[rows] > 0, "LONG", "SHORT"),
+                "Entry": self._entry[rows], "Stop": self._stop[rows],
+                "Triggered": [bool(self._plans[self.symbols[i]].get("trigger_hit")) for i in rows],
+                "Units": self._units[rows], "Notional $": np.abs(self._w[rows]),
+                "Risk $": np.abs(self._s[rows]), "Risk %": np.abs(self._s[rows]) / equity * 100,
+            }, index=pd.Index([self.symbols[i] for i in rows], name="Symbol"))
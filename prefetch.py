@@ -0,0 +1,273 @@
+"""Refresh-ahead cache for upstream fetches.
+
+`RefreshAheadCache.get` serves a value while it is fresh. Once its TTL has
+lapsed it keeps serving the stale value (up to `max_stale` seconds) and
+revalidates in the background, so a viewer only blocks on upstream I/O when
+nothing usable is cached at all. Loads often run on the cache's own
+threads, so a loader reports failure by raising; `last_error` hands the
+message to whoever reads the key. Concurrent misses for the same key share a
+single upstream call.
+
+A scheduler thread tracks which keys have been read recently and refreshes
+them shortly before they expire, most-viewed first. Every upstream HTTP
+request, foreground or background, draws one token from `bucket`, so
+prefetching never pushes the app over the provider's rate limit. A load can
+make several requests (CoinGecko candles take two, a hedged fetch asks a
+second source), so the client that sends them charges the bucket, and the
+cache does not charge per load. The cache decides when a background refresh
+may start: only while the bucket holds a token for it and for every refresh
+already in flight. A blocking miss always goes ahead. Its requests can drive
+the bucket below zero, and background refreshes then wait until the deficit
+has refilled.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """Requests-per-minute budget shared by foreground loads and background refreshes"""
+
+    def __init__(self, rate_per_minute, burst=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, rate_per_minute // 4))
+        self.tokens = self.capacity
+        self.clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def has(self, count=1):
+        """Whether `count` tokens are available, without taking any"""
+        with self._lock:
+            self._refill()
+            return self.tokens >= count
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def consume(self):
+        """Record a request that goes ahead regardless of budget; tokens may go negative"""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+
+
+class _Entry:
+    __slots__ = ("value", "valid", "fetched_at", "ttl", "loader", "is_valid", "inflight",
+                 "last_access", "views", "failures", "next_retry", "error")
+
+    def __init__(self):
+        self.value = None
+        self.valid = False
+        self.fetched_at = None
+        self.ttl = 0.0
+        self.loader = None
+        self.is_valid = None
+        self.inflight = None
+        self.last_access = 0.0
+        self.views = 0.0
+        self.failures = 0
+        self.next_retry = 0.0
+        self.error = None
+
+
+class RefreshAheadCache:
+    """Stale-while-revalidate cache with a refresh-ahead scheduler for viewed keys"""
+
+    def __init__(self, rate_per_minute=25, refresh_margin=15, active_window=600, max_stale=None,
+                 negative_ttl=15, evict_after=3600, tick=1.0, workers=4, clock=time.monotonic):
+        self.refresh_margin = refresh_margin
+        self.active_window = active_window
+        self.max_stale = max_stale
+        self.negative_ttl = negative_ttl
+        self.evict_after = evict_after
+        self.tick = tick
+        self.clock = clock
+        self.bucket = TokenBucket(rate_per_minute, clock=clock)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._refreshing = 0  # background refreshes started whose requests have not all been charged yet
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                       "refreshes": 0, "refresh_errors": 0}
+
+    # --- lifecycle ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prefetch-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- reads ---
+    def _max_stale(self, entry):
+        return entry.ttl if self.max_stale is None else self.max_stale
+
+    def _touch(self, entry, now):
+        # Views decay with a half-life of one active window so old popularity fades
+        if entry.last_access:
+            entry.views *= math.pow(0.5, (now - entry.last_access) / self.active_window)
+        entry.views += 1
+        entry.last_access = now
+
+    def get(self, key, loader, ttl, is_valid=None):
+        """Cached value for key, loading through `loader` only when nothing usable is cached"""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.loader, entry.is_valid, entry.ttl = loader, is_valid, ttl
+            self._touch(entry, now)
+
+            if entry.fetched_at is not None:
+                age = now - entry.fetched_at
+                if entry.valid and age < ttl:
+                    self._stats["hits"] += 1
+                    return entry.value
+                if not entry.valid and age < self.negative_ttl:
+                    self._stats["hits"] += 1
+                    return entry.value
+                if entry.valid and age < ttl + self._max_stale(entry):
+                    self._stats["stale_hits"] += 1
+                    if entry.inflight is None and now >= entry.next_retry and self._can_refresh():
+                        self._start_refresh(key, entry)
+                    return entry.value
+
+            if entry.inflight is not None:
+                waiter = entry.inflight
+                self._stats["coalesced"] += 1
+            else:
+                waiter = None
+                entry.inflight = threading.Event()
+                self._stats["misses"] += 1
+
+        if waiter is not None:
+            waiter.wait()
+            return entry.value
+
+        self._load(entry)
+        return entry.value
+
+    # --- loads ---
+    def _load(self, entry):
+        error = None
+        try:
+            value = entry.loader()
+            ok = entry.is_valid(value) if entry.is_valid else value is not None
+        except Exception as e:
+            value, ok, error = None, False, str(e) or type(e).__name__
+
+        with self._lock:
+            now = self.clock()
+            entry.error = error
+            if ok:
+                entry.value, entry.valid, entry.fetched_at = value, True, now
+                entry.failures = 0
+            else:
+                entry.failures += 1
+                entry.next_retry = now + min(300, self.negative_ttl * 2 ** (entry.failures - 1))
+                if not entry.valid:
+                    # Nothing good to fall back on: cache the failure briefly
+                    entry.value, entry.fetched_at = value, now
+            event, entry.inflight = entry.inflight, None
+        if event is not None:
+            event.set()
+        return ok
+
+    def _can_refresh(self):
+        # Each refresh in flight will charge at least one token that the bucket does not show yet
+        return self.bucket.has(self._refreshing + 1)
+
+    def _start_refresh(self, key, entry):
+        """Submit a background load of `entry`; call with the lock held"""
+        entry.inflight = threading.Event()
+        self._refreshing += 1
+        self._executor.submit(self._refresh, key, entry)
+
+    def _refresh(self, key, entry):
+        ok = self._load(entry)
+        with self._lock:
+            self._refreshing -= 1
+            self._stats["refreshes" if ok else "refresh_errors"] += 1
+
+    # --- scheduler ---
+    def _due(self, now):
+        """Recently viewed keys expiring within the refresh margin, most viewed first"""
+        due, expired = [], []
+        for key, entry in self._entries.items():
+            idle = now - entry.last_access
+            if idle > self.evict_after and entry.inflight is None:
+                expired.append(key)
+                continue
+            if entry.inflight is not None or not entry.valid or idle > self.active_window:
+                continue
+            if now < entry.next_retry:
+                continue
+            if now - entry.fetched_at >= entry.ttl - self.refresh_margin:
+                due.append((-entry.views, entry.fetched_at + entry.ttl, key))
+        for key in expired:
+            del self._entries[key]
+        due.sort()
+        return [key for _, _, key in due]
+
+    def run_once(self):
+        """One scheduler pass; returns how many refreshes were started"""
+        started = 0
+        with self._lock:
+            for key in self._due(self.clock()):
+                if not self._can_refresh():
+                    break
+                self._start_refresh(key, self._entries[key])
+                started += 1
+        return started
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            try:
+                self.run_once()
+            except RuntimeError:
+                # Executor shut down between the stop check and submit
+                return
+
+    # --- introspection ---
+    def viewed_keys(self):
+        now = self.clock()
+        with self._lock:
+            return sorted(
+                (k for k, e in self._entries.items() if now - e.last_access <= self.active_window),
+                key=lambda k: -self._entries[k].views,
+            )
+
+    def last_error(self, key):
+        """Message of the exception the last load of `key` raised; None once a load succeeds"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.error if entry is not None else None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), tokens=self.bucket.tokens)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,97 @@
+"""Progressive rendering under a per-rerun latency budget.
+
+A rerun gets `Budget` seconds of wall-clock time, counted from its start.
+The upstream fetches and the indicator run all start at once on a shared
+pool. Each piece is rendered as soon as it is ready: the price card when
+the price arrives, then each indicator card as its node finishes. Work
+still running when the budget is spent is not cancelled. It finishes in
+the background and records its result in `LastGood`. Until then the page
+shows the last good value for that piece, marked pending, or an empty
+pending card if there is none.
+
+`Feed` carries the indicator run's events from the worker thread to the
+script thread. The script thread is the only one that touches Streamlit
+elements.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeout
+
+
+class Budget:
+    """Wall-clock allowance for one rerun; `seconds=None` waits for everything"""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.started = clock()
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def remaining(self):
+        """Seconds left, or None for no limit"""
+        if self.seconds is None:
+            return None
+        return max(0.0, self.seconds - self.elapsed())
+
+    def expired(self):
+        return self.seconds is not None and self.remaining() <= 0
+
+    def timeout(self, cap=None):
+        """Seconds to block for: what is left of the budget, at most `cap` (None means no limit)"""
+        remaining = self.remaining()
+        if cap is None:
+            return remaining
+        return max(0.0, cap) if remaining is None else min(remaining, max(0.0, cap))
+
+
+def wait(future, budget):
+    """(True, result) if `future` finishes within the budget, else (False, None); a raising future counts as (True, None)"""
+    try:
+        return True, future.result(timeout=budget.remaining())
+    except FutureTimeout:
+        return False, None
+    except Exception:
+        return True, None
+
+
+class Feed:
+    """Events from a background job, read by the script thread"""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def put(self, kind, *payload):
+        self._queue.put((kind, *payload))
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrives within `timeout` seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LastGood:
+    """Most recent good value per key with the time it was recorded; least recently written keys are dropped first"""
+
+    def __init__(self, max_entries=2048, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        with self._lock:
+            self._values[key] = (value, self.clock())
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def get(self, key):
+        """(value, recorded_at) or (None, None)"""
+        with self._lock:
+            return self._values.get(key, (None, None))
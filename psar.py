@@ -0,0 +1,184 @@
+"""Parabolic SAR kernel with per-bar trend, reversal and bars-since-flip output.
+
+Follows the positional algorithm of `ta.trend.PSARIndicator` (acceleration
+factor `step` up to `max_step`, SAR clamped by the previous two lows/highs,
+the first two bars copy the close). Unlike `ta` it writes by position, so it
+behaves the same on a DatetimeIndex, and in one pass it returns:
+
+    sar              SAR value per bar
+    up_trend         True while the SAR sits below price
+    reversal         True on the bar where the trend flipped
+    bars_since_flip  bars since the last flip (since the first bar if none)
+
+Input is a 1-D series (scalar Python loop, the fast path for one symbol) or
+a (T, N) matrix where each step is vectorised across symbols. Columns may
+start with NaN rows (shorter histories). Everything the recursion needs is
+kept in a `PSARState`; passing it back in with only the new bars continues
+exactly where the previous call stopped. `state.since_flip` answers "bars
+since last flip" for every symbol without touching the history.
+"""
+import numpy as np
+
+_STATE_FIELDS = ("sar", "up_trend", "af", "up_high", "down_low", "high1", "high2", "low1", "low2",
+                 "seen", "since_flip")
+
+
+class PSARState:
+    """Recursion state for N columns after the last processed bar"""
+
+    __slots__ = _STATE_FIELDS + ("step", "max_step")
+
+    def __init__(self, n_cols, step=0.02, max_step=0.2):
+        self.step = step
+        self.max_step = max_step
+        self.sar = np.full(n_cols, np.nan)
+        self.up_trend = np.ones(n_cols, dtype=bool)
+        self.af = np.full(n_cols, step)
+        self.up_high = np.full(n_cols, np.nan)
+        self.down_low = np.full(n_cols, np.nan)
+        self.high1 = np.full(n_cols, np.nan)
+        self.high2 = np.full(n_cols, np.nan)
+        self.low1 = np.full(n_cols, np.nan)
+        self.low2 = np.full(n_cols, np.nan)
+        self.seen = np.zeros(n_cols, dtype=np.int64)  # valid bars processed
+        self.since_flip = np.zeros(n_cols, dtype=np.int64)
+
+    def copy(self):
+        other = PSARState(len(self.sar), self.step, self.max_step)
+        for name in _STATE_FIELDS:
+            setattr(other, name, getattr(self, name).copy())
+        return other
+
+
+def psar(high, low, close, step=0.02, max_step=0.2, state=None):
+    """SAR, trend, reversal and bars-since-flip for every bar; `state` continues a previous call"""
+    one_dim = np.ndim(close) == 1
+    high, low, close = (np.asarray(a, dtype=float).reshape(len(a), -1) for a in (high, low, close))
+    n_rows, n_cols = close.shape
+    state = PSARState(n_cols, step, max_step) if state is None else state.copy()
+    if (state.step, state.max_step) != (step, max_step):
+        raise ValueError("PSAR state was built with a different step/max_step")
+
+    out = {
+        "sar": np.full((n_rows, n_cols), np.nan),
+        "up_trend": np.zeros((n_rows, n_cols), dtype=bool),
+        "reversal": np.zeros((n_rows, n_cols), dtype=bool),
+        "bars_since_flip": np.zeros((n_rows, n_cols), dtype=np.int64),
+    }
+    if n_cols == 1:
+        _run_scalar(high[:, 0], low[:, 0], close[:, 0], state, out)
+    else:
+        _run_vector(high, low, close, state, out)
+
+    if one_dim:
+        out = {key: values[:, 0] for key, values in out.items()}
+    out["state"] = state
+    return out
+
+
+def _run_scalar(high, low, close, state, out):
+    step, max_step = state.step, state.max_step
+    sar, up, af = float(state.sar[0]), bool(state.up_trend[0]), float(state.af[0])
+    up_high, down_low = float(state.up_high[0]), float(state.down_low[0])
+    high1, high2, low1, low2 = float(state.high1[0]), float(state.high2[0]), float(state.low1[0]), float(state.low2[0])
+    seen, since = int(state.seen[0]), int(state.since_flip[0])
+    sar_out, up_out, rev_out, since_out = (out[k][:, 0] for k in ("sar", "up_trend", "reversal", "bars_since_flip"))
+
+    for t in range(len(close)):
+        c, h, l = close[t], high[t], low[t]
+        if c != c:  # NaN: column hasn't started yet
+            continue
+        rev = False
+        if seen == 0:
+            sar, up, af, up_high, down_low = c, True, step, h, l
+        elif seen == 1:
+            sar = c
+        elif up:
+            s = sar + af * (up_high - sar)
+            if l < s:
+                rev, s, down_low, af = True, up_high, l, step
+            else:
+                if h > up_high:
+                    up_high, af = h, min(af + step, max_step)
+                if low2 < s:
+                    s = low2
+                elif low1 < s:
+                    s = low1
+            sar = s
+        else:
+            s = sar - af * (sar - down_low)
+            if h > s:
+                rev, s, up_high, af = True, down_low, h, step
+            else:
+                if l < down_low:
+                    down_low, af = l, min(af + step, max_step)
+                if high2 > s:
+                    s = high2
+                elif high1 > s:
+                    s = high1
+            sar = s
+        if rev:
+            up, since = not up, 0
+        elif seen:
+            since += 1
+        high2, high1, low2, low1 = high1, h, low1, l
+        seen += 1
+        sar_out[t], up_out[t], rev_out[t], since_out[t] = sar, up, rev, since
+
+    state.sar[0], state.up_trend[0], state.af[0] = sar, up, af
+    state.up_high[0], state.down_low[0] = up_high, down_low
+    state.high1[0], state.high2[0], state.low1[0], state.low2[0] = high1, high2, low1, low2
+    state.seen[0], state.since_flip[0] = seen, since
+
+
+def _run_vector(high, low, close, state, out):
+    step, max_step = state.step, state.max_step
+    s = state
+    for t in range(close.shape[0]):
+        c, h, l = close[t], high[t], low[t]
+        valid = ~np.isnan(c)
+        first = valid & (s.seen == 0)
+        second = valid & (s.seen == 1)
+        run = valid & (s.seen >= 2)
+
+        with np.errstate(invalid="ignore"):
+            cand_up = s.sar + s.af * (s.up_high - s.sar)
+            rev_up = l < cand_up
+            new_high = ~rev_up & (h > s.up_high)
+            sar_up = np.where(s.low2 < cand_up, s.low2, np.where(s.low1 < cand_up, s.low1, cand_up))
+            sar_up = np.where(rev_up, s.up_high, sar_up)
+
+            cand_dn = s.sar - s.af * (s.sar - s.down_low)
+            rev_dn = h > cand_dn
+            new_low = ~rev_dn & (l < s.down_low)
+            sar_dn = np.where(s.high2 > cand_dn, s.high2, np.where(s.high1 > cand_dn, s.high1, cand_dn))
+            sar_dn = np.where(rev_dn, s.down_low, sar_dn)
+
+        reversal = run & np.where(s.up_trend, rev_up, rev_dn)
+        extend = run & np.where(s.up_trend, new_high, new_low)
+        next_down_low = np.where(s.up_trend & rev_up, l, np.where(~s.up_trend & new_low, l, s.down_low))
+        next_up_high = np.where(~s.up_trend & rev_dn, h, np.where(s.up_trend & new_high, h, s.up_high))
+
+        s.sar = np.where(run, np.where(s.up_trend, sar_up, sar_dn), np.where(first | second, c, s.sar))
+        s.down_low = np.where(run, next_down_low, np.where(first, l, s.down_low))
+        s.up_high = np.where(run, next_up_high, np.where(first, h, s.up_high))
+        s.af = np.where(reversal | first, step, np.where(extend, np.minimum(s.af + step, max_step), s.af))
+        s.up_trend = np.where(first, True, s.up_trend != reversal)
+        s.since_flip = np.where(reversal | first, 0, s.since_flip + (valid & ~first))
+        s.high2, s.high1 = np.where(valid, s.high1, s.high2), np.where(valid, h, s.high1)
+        s.low2, s.low1 = np.where(valid, s.low1, s.low2), np.where(valid, l, s.low1)
+        s.seen = s.seen + valid
+
+        out["sar"][t] = np.where(valid, s.sar, np.nan)
+        out["up_trend"][t] = valid & s.up_trend
+        out["reversal"][t] = reversal
+        out["bars_since_flip"][t] = np.where(valid, s.since_flip, 0)
+
+
+def close_crossings(close, sar, lookback=2):
+    """True where close crossed the SAR within the last `lookback` bars (the app's reversal flag)"""
+    close = np.asarray(close, dtype=float)[-(lookback + 1):]
+    sar = np.asarray(sar, dtype=float)[-(lookback + 1):]
+    above, below = sar > close, sar < close
+    crossed = (above[1:] & below[:-1]) | (below[1:] & above[:-1])
+    return crossed.any(axis=0)
@@ -0,0 +1,295 @@
+"""Volatility and trend regime of every bar from rolling statistics.
+
+Each bar gets two labels:
+
+    volatility  low / normal / high: the mean of two percentile ranks among
+                the last `lookback` bars, ATR as a share of price and the
+                realized volatility (std of the last `rv_window` log
+                returns); below LOW_RANK is low, above HIGH_RANK is high
+    trend       trending / ranging: Kaufman's efficiency ratio, the net move
+                over `er_window` bars divided by the sum of the bar-to-bar
+                moves; TRENDING_ER or more is trending
+
+`RegimeTracker` keeps rolling-window structures instead of rescanning each
+window. Realized volatility and the efficiency ratio are running sums over a
+deque, O(1) per bar, rebuilt every `resync_every` bars to stop
+floating-point drift. A percentile rank keeps a sorted copy of its window,
+so a bar costs two binary searches and one list insert/delete. Like
+`DivergenceScanner`, the tracker remembers the last timestamp it has seen
+and each `update` only pushes newer bars. The last bar of a series is
+usually the live candle, whose close still changes, so by default only the
+closed bars before it are pushed. The live bar is classified on a copy of
+the state and never remembered.
+
+`latest_regimes` answers the same question for the last bar of every column
+of a (T, N) matrix at once, for the multi-symbol scanner.
+
+`thresholds` maps a regime to the RSI bands and the Bollinger squeeze
+percentile used by the momentum and volatility indicators. A normal,
+ranging market keeps the fixed 70/30 and 20th percentile.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+LOOKBACK = 180  # bars the volatility measures are ranked against (30 days of 4h candles)
+RV_WINDOW = 20
+ER_WINDOW = 20
+MIN_PERIODS = 30  # values a rank needs before it counts
+LOW_RANK, HIGH_RANK = 0.25, 0.75
+TRENDING_ER = 0.3
+
+# Quiet markets rarely reach RSI 70/30 and spend most bars in narrow bands, volatile ones the opposite
+VOLATILITY_THRESHOLDS = {
+    "low": {"overbought": 65, "oversold": 35, "squeeze_pct": 10},
+    "normal": {"overbought": 70, "oversold": 30, "squeeze_pct": 20},
+    "high": {"overbought": 75, "oversold": 25, "squeeze_pct": 30},
+}
+TRENDING_RSI_SHIFT = 5  # a trend holds RSI near an extreme, so only a further move counts
+
+REGIME_COLUMNS = ["volatility", "trend", "atr_rank", "rv_rank", "efficiency"]
+
+
+def thresholds(volatility="normal", trend="ranging"):
+    """{overbought, oversold, squeeze_pct} for a regime"""
+    levels = dict(VOLATILITY_THRESHOLDS.get(volatility, VOLATILITY_THRESHOLDS["normal"]))
+    if trend == "trending":
+        levels["overbought"] += TRENDING_RSI_SHIFT
+        levels["oversold"] -= TRENDING_RSI_SHIFT
+    return levels
+
+
+def volatility_level(atr_rank, rv_rank):
+    """'low' / 'normal' / 'high' from the two percentile ranks (normal while neither is known)"""
+    ranks = [r for r in (atr_rank, rv_rank) if r == r]
+    if not ranks:
+        return "normal"
+    score = sum(ranks) / len(ranks)
+    return "low" if score < LOW_RANK else "high" if score > HIGH_RANK else "normal"
+
+
+def trend_state(efficiency):
+    return "trending" if efficiency >= TRENDING_ER else "ranging"
+
+
+def label(volatility, trend):
+    return f"{volatility.capitalize()} Volatility · {trend.capitalize()}"
+
+
+class RollingRank:
+    """Midrank of each new value among the last `window` values, from a sorted copy of the window"""
+
+    def __init__(self, window, min_periods=1):
+        self.window = window
+        self.min_periods = min_periods
+        self._fifo = deque()
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._fifo)
+
+    def copy(self):
+        clone = RollingRank(self.window, self.min_periods)
+        clone._fifo = deque(self._fifo)
+        clone._sorted = list(self._sorted)
+        return clone
+
+    def push(self, value):
+        """Add `value` (NaN is skipped) and return its rank in [0, 1]; NaN until min_periods values"""
+        if value != value:
+            return np.nan
+        if len(self._fifo) == self.window:
+            del self._sorted[bisect_left(self._sorted, self._fifo.popleft())]
+        self._fifo.append(value)
+        insort(self._sorted, value)
+        n = len(self._sorted)
+        if n < self.min_periods:
+            return np.nan
+        return (bisect_left(self._sorted, value) + bisect_right(self._sorted, value)) / (2 * n)
+
+
+class RegimeTracker:
+    """Incremental regime classification for one symbol over a growing or sliding series"""
+
+    def __init__(self, lookback=LOOKBACK, rv_window=RV_WINDOW, er_window=ER_WINDOW, min_periods=MIN_PERIODS,
+                 resync_every=None, live_last_bar=True):
+        self.lookback = lookback
+        self.rv_window = rv_window
+        self.er_window = er_window
+        self.min_periods = min_periods
+        self.resync_every = resync_every or lookback * 10
+        self.live_last_bar = live_last_bar
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.last_timestamp = None  # timestamp of the last bar pushed
+        self.bars = 0
+        self._atr_rank = RollingRank(self.lookback, self.min_periods)
+        self._rv_rank = RollingRank(self.lookback, self.min_periods)
+        self._closes = deque(maxlen=self.er_window + 1)
+        self._returns = deque()
+        self._moves = deque()
+        self._sum = self._sum_sq = self._path = 0.0
+        self._since_resync = 0
+        self._current = (np.nan, np.nan, np.nan, "normal", "ranging")
+        self._since = 0
+
+    def copy(self):
+        """Independent copy of the rolling state, for bars that must not be remembered"""
+        clone = RegimeTracker(self.lookback, self.rv_window, self.er_window, self.min_periods, self.resync_every,
+                              self.live_last_bar)
+        clone.last_timestamp, clone.bars = self.last_timestamp, self.bars
+        clone._atr_rank, clone._rv_rank = self._atr_rank.copy(), self._rv_rank.copy()
+        clone._closes = deque(self._closes, maxlen=self._closes.maxlen)
+        clone._returns, clone._moves = deque(self._returns), deque(self._moves)
+        clone._sum, clone._sum_sq, clone._path = self._sum, self._sum_sq, self._path
+        clone._since_resync, clone._current, clone._since = self._since_resync, self._current, self._since
+        return clone
+
+    def _resync(self):
+        self._sum = float(sum(self._returns))
+        self._sum_sq = float(sum(r * r for r in self._returns))
+        self._path = float(sum(self._moves))
+        self._since_resync = 0
+
+    def push(self, close, atr):
+        """One bar; returns (atr_rank, rv_rank, efficiency, volatility, trend)"""
+        prev = self._closes[-1] if self._closes else np.nan
+        self._closes.append(close)
+        if prev == prev and prev > 0 and close > 0:
+            r, move = float(np.log(close / prev)), abs(close - prev)
+            self._returns.append(r)
+            self._sum += r
+            self._sum_sq += r * r
+            if len(self._returns) > self.rv_window:
+                old = self._returns.popleft()
+                self._sum -= old
+                self._sum_sq -= old * old
+            self._moves.append(move)
+            self._path += move
+            if len(self._moves) > self.er_window:
+                self._path -= self._moves.popleft()
+            self._since_resync += 1
+            if self._since_resync >= self.resync_every:
+                self._resync()
+
+        rv = np.nan
+        n = len(self._returns)
+        if n == self.rv_window and n > 1:
+            rv = float(np.sqrt(max(self._sum_sq - self._sum * self._sum / n, 0.0) / (n - 1)))
+        efficiency = np.nan
+        if len(self._moves) == self.er_window and len(self._closes) == self.er_window + 1:
+            net = abs(self._closes[-1] - self._closes[0])
+            efficiency = net / self._path if self._path > 0 else 0.0
+
+        atr_pct = atr / close if atr == atr and atr > 0 and close > 0 else np.nan
+        atr_rank = self._atr_rank.push(atr_pct)
+        rv_rank = self._rv_rank.push(rv)
+        current = (atr_rank, rv_rank, efficiency, volatility_level(atr_rank, rv_rank), trend_state(efficiency))
+        self._since = self._since + 1 if current[3:] == self._current[3:] else 1
+        self._current = current
+        self.bars += 1
+        return current
+
+    def update(self, timestamps, close, atr):
+        """Push the closed bars after the last one pushed; returns the regime of the latest bar"""
+        ts = pd.DatetimeIndex(timestamps).as_unit("ms").asi8
+        close = np.asarray(close, dtype=float)
+        atr = np.asarray(atr, dtype=float)
+        n = len(ts)
+        # Last position that is a closed bar
+        final = n - 1 - (1 if self.live_last_bar else 0)
+        with self._lock:
+            if self.last_timestamp is not None and n and ts[-1] < self.last_timestamp:
+                self.reset()  # an older series than the one remembered: start over
+            start = 0 if self.last_timestamp is None else int(np.searchsorted(ts, self.last_timestamp, side="right"))
+            for c, a in zip(close[start:final + 1].tolist(), atr[start:final + 1].tolist()):
+                self.push(c, a)
+            if start <= final:
+                self.last_timestamp = int(ts[final])
+            if final < n - 1 and start < n:
+                # The live candle is classified on a copy, so its next revision replaces it
+                live = self.copy()
+                live.push(float(close[-1]), float(atr[-1]))
+                return live.current()
+            return self.current()
+
+    def current(self):
+        """{volatility, trend, label, atr_rank, rv_rank, efficiency, bars_in_regime, thresholds} of the last bar pushed"""
+        atr_rank, rv_rank, efficiency, volatility, trend = self._current
+        return {
+            "volatility": volatility, "trend": trend, "label": label(volatility, trend),
+            "atr_rank": atr_rank, "rv_rank": rv_rank, "efficiency": efficiency,
+            "bars_in_regime": self._since, "thresholds": thresholds(volatility, trend),
+        }
+
+
+def classify(close, atr, index=None, **params):
+    """Regime of every bar of one series as a DataFrame with REGIME_COLUMNS"""
+    tracker = RegimeTracker(**params)
+    close = np.asarray(close, dtype=float)
+    rows = [tracker.push(c, a) for c, a in zip(close.tolist(), np.asarray(atr, dtype=float).tolist())]
+    frame = pd.DataFrame(rows, columns=["atr_rank", "rv_rank", "efficiency", "volatility", "trend"], index=index)
+    return frame[REGIME_COLUMNS]
+
+
+# --- MANY SYMBOLS ---
+def _window_sum(values, window):
+    """Trailing sums of `window` rows (NaN counts as 0) and the number of non-NaN rows in each"""
+    def sums(x):
+        c = np.cumsum(x, axis=0)
+        out = c.copy()
+        out[window:] -= c[:-window]
+        return out
+    return sums(np.nan_to_num(values)), sums((~np.isnan(values)).astype(np.int64))
+
+
+def _last_rank(values, lookback, min_periods):
+    """Midrank of the last row among the non-NaN values of the last `lookback` rows, per column"""
+    window = values[-lookback:]
+    last = window[-1]
+    count = np.sum(~np.isnan(window), axis=0)
+    with np.errstate(invalid="ignore"):
+        below = np.sum(window < last, axis=0)
+        at_or_below = np.sum(window <= last, axis=0)
+        rank = (below + at_or_below) / (2 * count)
+    return np.where((count >= min_periods) & ~np.isnan(last), rank, np.nan)
+
+
+def latest_regimes(close, atr, symbols=None, lookback=LOOKBACK, rv_window=RV_WINDOW, er_window=ER_WINDOW,
+                   min_periods=MIN_PERIODS):
+    """Regime of the last bar of each column of (T, N) close and ATR matrices, one row per symbol"""
+    close = np.asarray(close, dtype=float)
+    atr = np.asarray(atr, dtype=float)
+    n_cols = close.shape[1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        atr_pct = np.where(atr > 0, atr / close, np.nan)
+        log_close = np.log(np.where(close > 0, close, np.nan))
+    returns = np.vstack([np.full((1, n_cols), np.nan), np.diff(log_close, axis=0)])
+    moves = np.vstack([np.full((1, n_cols), np.nan), np.abs(np.diff(close, axis=0))])
+
+    s1, count = _window_sum(returns, rv_window)
+    s2, _ = _window_sum(returns * returns, rv_window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rv = np.sqrt(np.maximum(s2 - s1 * s1 / rv_window, 0.0) / (rv_window - 1))
+    rv = np.where(count == rv_window, rv, np.nan)
+
+    path = np.nansum(moves[-er_window:], axis=0)
+    moved = np.sum(~np.isnan(moves[-er_window:]), axis=0)
+    net = np.abs(close[-1] - close[-er_window - 1]) if len(close) > er_window else np.full(n_cols, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        efficiency = np.where(path > 0, net / path, 0.0)
+    efficiency = np.where((moved == er_window) & ~np.isnan(net), efficiency, np.nan)
+
+    atr_rank = _last_rank(atr_pct, lookback, min_periods)
+    rv_rank = _last_rank(rv, lookback, min_periods)
+    table = pd.DataFrame({
+        "volatility": [volatility_level(a, r) for a, r in zip(atr_rank.tolist(), rv_rank.tolist())],
+        "trend": [trend_state(e) for e in efficiency.tolist()],
+        "atr_rank": atr_rank, "rv_rank": rv_rank, "efficiency": efficiency,
+    }, index=pd.Index(symbols if symbols is not None else range(n_cols)))
+    return table[REGIME_COLUMNS]
@@ -0,0 +1,58 @@
+"""Compiled HTML templates and a minified stylesheet for the dashboard.
+
+Streamlit re-sends every element on every rerun, so page weight is paid
+on each interaction. This module keeps that weight down:
+
+- `template` compiles an HTML template once per process. It drops the
+  whitespace between tags and binds the result to `str.format_map`, so a
+  render is a single format call and the output carries no indentation.
+- `style_block` minifies the stylesheet once per process.
+- Callers join related cards into one element instead of one
+  `st.markdown` per card.
+
+The browser caches any element of at least `global.minCachedMessageSize`
+bytes, which .streamlit/config.toml sets to 1 KB. When a rerun emits such
+an element unchanged, the server sends a short reference instead of the
+element. The stylesheet therefore travels once per session, and an
+unchanged card grid or trade plan is not sent again.
+"""
+import re
+from functools import lru_cache
+
+_BETWEEN_TAGS = re.compile(r">\s+<")
+_LINE_BREAKS = re.compile(r"\s*\n\s*")
+_CSS_COMMENTS = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON = re.compile(r"\s*:\s*(?=[^{}]*;|[^{}]*})")  # inside declarations only, not in selectors
+
+
+class Template:
+    """HTML with `{name}` fields, whitespace between tags removed"""
+
+    __slots__ = ("source", "_format")
+
+    def __init__(self, source):
+        self.source = _LINE_BREAKS.sub(" ", _BETWEEN_TAGS.sub("><", source.strip()))
+        self._format = self.source.format_map
+
+    def render(self, **values):
+        return self._format(values)
+
+
+@lru_cache(maxsize=64)
+def template(source):
+    """Compiled `Template` for `source`, built once per process"""
+    return Template(source)
+
+
+def minify_css(css):
+    """CSS without comments or optional whitespace"""
+    css = _CSS_COMMENTS.sub("", css)
+    css = _CSS_SPACE.sub(r"\1", " ".join(css.split()))
+    return _CSS_COLON.sub(":", css).replace(";}", "}")
+
+
+@lru_cache(maxsize=8)
+def style_block(css):
+    """`<style>` element for a stylesheet, minified once per process"""
+    return f"<style>{minify_css(css)}</style>"
@@ -0,0 +1,214 @@
+"""Record/replay layer for CoinGecko HTTP traffic.
+
+Every fetch function in streamlit_app.py goes through `http_get`, which behaves
+according to the configured mode:
+
+    live    - pass the request straight through to the network
+    record  - pass through and save each successful response body as a fixture
+    replay  - serve responses from fixtures only, never touching the network
+
+Fixtures are the raw response bodies, gzip-compressed, one file per
+(endpoint, query) pair. Optional latency and error injection apply in every
+mode so slow or flaky upstreams can be simulated deterministically.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import requests
+
+MODES = ("live", "record", "replay")
+API_BASE = "https://api.coingecko.com/api/v3"
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ERROR_KINDS = ("timeout", "connection", "rate_limit")
+
+_config = {
+    "mode": "live",
+    "fixture_dir": DEFAULT_FIXTURE_DIR,
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "error_rate": 0.0,
+    "seed": None,
+}
+_rng = random.Random()
+_lock = threading.Lock()
+_request_counts = Counter()
+
+
+class ReplayResponse:
+    """Minimal stand-in for requests.Response served from a fixture"""
+
+    def __init__(self, content, status_code=200, url=""):
+        self.content = content
+        self.status_code = status_code
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for url: {self.url}", response=self)
+
+
+def configure(mode="live", fixture_dir=None, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None):
+    """Select the data mode and optional latency / error injection"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown data mode {mode!r}; expected one of {', '.join(MODES)}")
+    if not 0.0 <= float(error_rate) <= 1.0:
+        raise ValueError("error_rate must be between 0 and 1")
+
+    with _lock:
+        if seed is not None and seed != _config["seed"]:
+            _rng.seed(seed)
+        _config.update(
+            mode=mode,
+            fixture_dir=fixture_dir or DEFAULT_FIXTURE_DIR,
+            latency_ms=float(latency_ms),
+            jitter_ms=float(jitter_ms),
+            error_rate=float(error_rate),
+            seed=seed,
+        )
+
+
+def current_mode():
+    return _config["mode"]
+
+
+def endpoint_name(url):
+    """Collapse a CoinGecko URL to its endpoint, e.g. 'coins/{id}/ohlc'"""
+    path = urlparse(url).path.split("/api/v3/", 1)[-1].strip("/")
+    parts = path.split("/")
+    if len(parts) == 3 and parts[0] == "coins":
+        parts[1] = "{id}"
+    return "/".join(parts)
+
+
+def fixture_path(url, params=None, fixture_dir=None):
+    """Fixture file for a request; headers (API keys) never form part of the key"""
+    path = urlparse(url).path.split("/api/v3/", 1)[-1].strip("/")
+    name = path.replace("/", "__")
+    if params:
+        query = "_".join(f"{k}={params[k]}" for k in sorted(params))
+        name += "__" + query
+    name = re.sub(r"[^A-Za-z0-9._=,-]", "-", name)
+    return os.path.join(fixture_dir or _config["fixture_dir"], name + ".json.gz")
+
+
+def save_fixture(url, params, content):
+    path = fixture_path(url, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_fixture(url, params):
+    path = fixture_path(url, params)
+    try:
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        raise requests.exceptions.ConnectionError(f"Replay mode: no fixture recorded for {url} ({os.path.basename(path)})")
+
+
+def request_counts():
+    """Upstream requests issued through http_get, per endpoint"""
+    with _lock:
+        return dict(_request_counts)
+
+
+def reset_request_counts():
+    with _lock:
+        _request_counts.clear()
+
+
+def _inject_faults(url, timeout):
+    with _lock:
+        latency = _config["latency_ms"]
+        if _config["jitter_ms"]:
+            latency += _rng.uniform(0, _config["jitter_ms"])
+        fail = _config["error_rate"] > 0 and _rng.random() < _config["error_rate"]
+        kind = _rng.choice(ERROR_KINDS) if fail else None
+
+    if latency > 0:
+        if timeout is not None and latency / 1000.0 >= timeout:
+            time.sleep(timeout)
+            raise requests.exceptions.Timeout(f"Injected latency {latency:.0f}ms exceeded timeout for {url}")
+        time.sleep(latency / 1000.0)
+
+    if kind == "timeout":
+        raise requests.exceptions.Timeout(f"Injected timeout for {url}")
+    if kind == "connection":
+        raise requests.exceptions.ConnectionError(f"Injected connection error for {url}")
+    if kind == "rate_limit":
+        body = b'{"status": {"error_code": 429, "error_message": "Injected rate limit"}}'
+        return ReplayResponse(body, status_code=429, url=url)
+    return None
+
+
+def http_get(url, params=None, headers=None, timeout=None):
+    """Drop-in for requests.get used by all CoinGecko fetchers"""
+    with _lock:
+        _request_counts[endpoint_name(url)] += 1
+        mode = _config["mode"]
+
+    injected = _inject_faults(url, timeout)
+    if injected is not None:
+        return injected
+
+    if mode == "replay":
+        return ReplayResponse(load_fixture(url, params), url=url)
+
+    response = requests.get(url, params=params, headers=headers, timeout=timeout)
+    if mode == "record" and response.status_code == 200:
+        save_fixture(url, params, response.content)
+    return response
+
+
+# --- RECORDING CLI ---
+def record_coin(coin_id, days=30, api_key=""):
+    """Capture the three endpoints the dashboard uses for one coin"""
+    headers = {'x-cg-demo-api-key': api_key} if api_key else {}
+    requests_to_make = [
+        (f"{API_BASE}/simple/price", {'ids': coin_id, 'vs_currencies': 'usd', 'include_24hr_change': 'true'}),
+        (f"{API_BASE}/coins/{coin_id}/ohlc", {'vs_currency': 'usd', 'days': days}),
+        (f"{API_BASE}/coins/{coin_id}/market_chart", {'vs_currency': 'usd', 'days': days}),
+    ]
+    saved = []
+    for url, params in requests_to_make:
+        response = http_get(url, params=params, headers=headers, timeout=15)
+        response.raise_for_status()
+        saved.append(fixture_path(url, params))
+    return saved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record CoinGecko responses as replay fixtures")
+    parser.add_argument("coin_ids", nargs="+", help="CoinGecko coin ids, e.g. bitcoin ethereum solana")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--fixture-dir", default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--api-key", default=os.environ.get("CG_PUBLIC_API_KEY", ""))
+    args = parser.parse_args(argv)
+
+    configure(mode="record", fixture_dir=args.fixture_dir)
+    for coin_id in args.coin_ids:
+        for path in record_coin(coin_id, args.days, args.api_key):
+            print(f"recorded {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Trading-session seasonality from historical candles.
+
+The app's session rule (`get_session_info`) labels a UTC time of day. It
+has hour boundaries, so `session_table` evaluates it once per UTC hour
+and every later lookup is an array index. Nothing here calls it per bar.
+
+A candle can span several hours, and so several sessions: a 4h bar
+opening at 12:00 covers the end of London and the start of the
+London/New York overlap. Each bar is therefore spread evenly over the
+hours it covers. Every session and every hour of the week gets a weighted
+share of the bar's
+
+    volatility  |log return| close to close
+    range       (high - low) / close
+    volume      quote volume (bars without volume are left out)
+
+Profiles are means over all bar-hours in a session, and they are also
+given relative to the mean over every hour ("1.3x" = 30% busier than an
+average hour). Candles wider than `MAX_INTERVAL_HOURS` span too much of
+the day to attribute, so those series get no profile.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+HOUR_MS = 3_600_000
+WEEK_HOURS = 168
+MAX_INTERVAL_HOURS = 4
+METRICS = ("volatility", "range", "volume")
+# 1970-01-01 was a Thursday; shift so hour-of-week 0 is Monday 00:00 UTC
+_EPOCH_WEEKDAY_HOURS = 3 * 24
+
+
+def session_table(label_at):
+    """Session label for each UTC hour of the day, from a function of a UTC datetime"""
+    midnight = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    return np.array([label_at(midnight.replace(hour=hour)) for hour in range(24)], dtype=object)
+
+
+def hour_of_week(timestamps_ms):
+    """0 (Monday 00:00 UTC) .. 167 for each ms timestamp"""
+    return (np.asarray(timestamps_ms, dtype=np.int64) // HOUR_MS + _EPOCH_WEEKDAY_HOURS) % WEEK_HOURS
+
+
+def covered_hours(timestamps_ms, interval_ms):
+    """(bars, hours per bar) hour-of-week of every hour each close-stamped bar covers"""
+    hours = max(1, int(interval_ms // HOUR_MS))
+    opens = np.asarray(timestamps_ms, dtype=np.int64) - interval_ms
+    return (hour_of_week(opens)[:, None] + np.arange(hours)[None, :]) % WEEK_HOURS
+
+
+def bar_metrics(store):
+    """Per-bar volatility, range and volume, float64"""
+    close = np.asarray(store.close, dtype=float)
+    high, low = np.asarray(store.high, dtype=float), np.asarray(store.low, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatility = np.abs(np.diff(np.log(close), prepend=np.nan))
+        range_ = (high - low) / close
+    return {"volatility": volatility, "range": range_, "volume": np.asarray(store.volume, dtype=float)}
+
+
+def _weighted_means(slots, weights, values, n_slots):
+    valid = np.isfinite(values)
+    w = np.where(valid, weights, 0.0)
+    totals = np.bincount(slots, weights=w * np.where(valid, values, 0.0), minlength=n_slots)
+    counts = np.bincount(slots, weights=w, minlength=n_slots)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return totals / counts, counts
+
+
+def session_profile(store, table):
+    """Per-session and per-hour-of-week activity for one candle series, or None if its candles are too wide"""
+    if store is None or len(store) < 3:
+        return None
+    interval_ms = int(np.median(np.diff(store.timestamps)))
+    if interval_ms > MAX_INTERVAL_HOURS * HOUR_MS:
+        return None
+
+    hours = covered_hours(store.timestamps, interval_ms)  # (bars, k)
+    weights = np.full(hours.shape, 1.0 / hours.shape[1])
+    names = list(dict.fromkeys(table))  # session names in first-seen order
+    codes = np.array([names.index(label) for label in table])
+    session_of_hour = codes[np.arange(WEEK_HOURS) % 24]
+
+    metrics = bar_metrics(store)
+    flat_hours, flat_weights = hours.ravel(), weights.ravel()
+    by_session, by_hour = {}, {}
+    for name in METRICS:
+        per_hour_values = np.repeat(metrics[name], hours.shape[1])
+        by_hour[name], hour_weight = _weighted_means(flat_hours, flat_weights, per_hour_values, WEEK_HOURS)
+        by_session[name], session_weight = _weighted_means(
+            session_of_hour[flat_hours], flat_weights, per_hour_values, len(names)
+        )
+        overall = np.nansum(by_hour[name] * hour_weight) / hour_weight.sum() if hour_weight.sum() else np.nan
+        by_session[f"{name}_rel"] = by_session[name] / overall
+        by_hour[f"{name}_rel"] = by_hour[name] / overall
+        if name == "range":
+            by_session["hours"] = session_weight
+
+    hour_index = pd.MultiIndex.from_arrays(
+        [np.arange(WEEK_HOURS) // 24, np.arange(WEEK_HOURS) % 24], names=["weekday", "hour"]
+    )
+    return {
+        "sessions": pd.DataFrame(by_session, index=pd.Index(names, name="session")),
+        "hour_of_week": pd.DataFrame(by_hour, index=hour_index),
+        "bars": len(store),
+        "interval_hours": interval_ms / HOUR_MS,
+        "days": (int(store.timestamps[-1]) - int(store.timestamps[0])) / (24 * HOUR_MS),
+    }
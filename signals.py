@@ -0,0 +1,269 @@
+"""Append-only history of every computed signal snapshot, in SQLite.
+
+Each rerun's analysis (price, the five indicator statuses and values, the
+overall bias and the trade plan) becomes one row. `SignalStore.append`
+only puts the row on a queue. A writer thread drains the queue and
+commits rows in batches, so the request path never waits on disk. A
+snapshot identical to the previous one for its symbol (apart from the
+time) is dropped, so idle reruns do not grow the log.
+
+Layout, chosen to stay small and fast at millions of rows:
+
+    signals  WITHOUT ROWID, primary key (symbol, ts): rows are clustered by
+             symbol and time, so "SOL over the last week" is one contiguous
+             range scan of the key B-tree
+    labels   symbols and status strings ("Strong Bullish", "Squeeze", ...)
+             are stored once and referenced by small integer ids
+
+The database runs in WAL mode, so readers never block the writer and the
+writer never blocks readers.
+
+    $ python signals.py --db signals.db                 # rows per symbol
+    $ python signals.py --db signals.db SOL --days 7    # bias changes for SOL
+"""
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+INDICATORS = ("trend", "momentum", "volatility", "reversal", "liquidity")
+LABEL_COLUMNS = ("bias", *INDICATORS, "direction")
+VALUE_COLUMNS = ("price", *(f"{name}_value" for name in INDICATORS), "entry", "stop", "target")
+COLUMNS = ("ts", "bar_ts", *LABEL_COLUMNS, *VALUE_COLUMNS, "trigger_hit")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS labels (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS signals (
+    symbol INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    bar_ts INTEGER,
+    {", ".join(f"{c} INTEGER" for c in LABEL_COLUMNS)},
+    {", ".join(f"{c} REAL" for c in VALUE_COLUMNS)},
+    trigger_hit INTEGER,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID;
+"""
+_STOP = object()
+
+
+def _ms(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value // 1_000_000
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if np.isfinite(value) else None
+
+
+def snapshot(symbol, price, bar_ts, indicator_data, bias, trade_params, ts=None):
+    """One signal row from a rerun's results; `ts` defaults to now"""
+    row = {
+        "symbol": symbol,
+        "ts": _ms(ts) if ts is not None else time.time_ns() // 1_000_000,
+        "bar_ts": _ms(bar_ts),
+        "bias": bias,
+        "price": _number(price),
+        "direction": trade_params.get("direction"),
+        "entry": _number(trade_params.get("entry_trigger")),
+        "stop": _number(trade_params.get("stop_loss")),
+        "target": _number(trade_params.get("target")),
+        "trigger_hit": int(bool(trade_params.get("trigger_hit"))),
+    }
+    for name in INDICATORS:
+        result = indicator_data.get(name) or {}
+        row[name] = result.get("status")
+        row[f"{name}_value"] = _number(result.get("value"))
+    return row
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SignalStore:
+    """Queue-fed, batch-committing signal log with time-range queries"""
+
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.skipped = 0
+        self._queue = queue.SimpleQueue()
+        self._last = {}
+        self._label_ids = {}
+        self._label_text = {}
+        self._reader = threading.local()
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._thread = threading.Thread(target=self._run, name="signal-writer", daemon=True)
+        self._thread.start()
+
+    # --- writes ---
+    def append(self, row):
+        """Queue a snapshot (see `snapshot`); returns at once"""
+        self._queue.put(row)
+
+    def flush(self, timeout=None):
+        """Block until everything appended so far is committed"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+
+    def _label_id(self, conn, text):
+        if text is None:
+            return None
+        label = self._label_ids.get(text)
+        if label is None:
+            conn.execute("INSERT OR IGNORE INTO labels (text) VALUES (?)", (text,))
+            label = conn.execute("SELECT id FROM labels WHERE text = ?", (text,)).fetchone()[0]
+            self._label_ids[text] = label
+        return label
+
+    def _encode(self, conn, row):
+        signature = tuple(row.get(c) for c in COLUMNS[1:])
+        if self._last.get(row["symbol"]) == signature:
+            return None
+        self._last[row["symbol"]] = signature
+        return (
+            self._label_id(conn, row["symbol"]), row["ts"], row.get("bar_ts"),
+            *(self._label_id(conn, row.get(c)) for c in LABEL_COLUMNS),
+            *(row.get(c) for c in VALUE_COLUMNS), row.get("trigger_hit"),
+        )
+
+    def _write(self, conn, rows):
+        encoded = [values for values in (self._encode(conn, row) for row in rows) if values is not None]
+        self.skipped += len(rows) - len(encoded)
+        if encoded:
+            placeholders = ", ".join("?" * (len(COLUMNS) + 1))
+            conn.executemany(f"INSERT OR REPLACE INTO signals (symbol, {', '.join(COLUMNS)}) VALUES ({placeholders})",
+                             encoded)
+        conn.commit()
+        self.written += len(encoded)
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while True:
+                rows, waiters, stop = [], [], False
+                item = self._queue.get()
+                # Drain whatever else is already queued into the same transaction
+                while True:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        rows.append(item)
+                    if stop or len(rows) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                try:
+                    self._write(conn, rows)
+                except sqlite3.Error:
+                    conn.rollback()
+                    self._label_ids.clear()  # ids minted in the failed transaction are gone
+                    self._last.clear()
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    # --- reads ---
+    def _conn(self):
+        conn = getattr(self._reader, "conn", None)
+        if conn is None:
+            conn = self._reader.conn = connect(self.path)
+        return conn
+
+    def _labels(self, conn, ids=()):
+        if not self._label_text or any(i not in self._label_text for i in ids if pd.notna(i)):
+            self._label_text = dict(conn.execute("SELECT id, text FROM labels"))
+        return self._label_text
+
+    def timeline(self, symbol, start=None, end=None, columns=None):
+        """Snapshots for `symbol` with start <= time < end, as a DataFrame indexed by UTC time"""
+        columns = list(columns or COLUMNS[1:])
+        conn = self._conn()
+        symbol_id = conn.execute("SELECT id FROM labels WHERE text = ?", (symbol,)).fetchone()
+        if symbol_id is None:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz="UTC", name="time"))
+        start_ms = _ms(start) if start is not None else -(2**62)
+        end_ms = _ms(end) if end is not None else 2**62
+        rows = conn.execute(
+            f"SELECT ts, {', '.join(columns)} FROM signals WHERE symbol = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (symbol_id[0], start_ms, end_ms),
+        ).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=["ts", *columns])
+        labels = self._labels(conn, {v for c in columns if c in LABEL_COLUMNS for v in df[c].unique()})
+        for column in columns:
+            if column in LABEL_COLUMNS:
+                df[column] = df[column].map(labels)
+            elif column == "bar_ts":
+                df[column] = pd.to_datetime(df[column], unit="ms", utc=True)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("ts"), unit="ms", utc=True), name="time")
+        return df
+
+    def bias_timeline(self, symbol, days=7, now=None):
+        """Bias changes for `symbol` over the last `days`: one row per run of the same bias, with its price"""
+        end = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+        df = self.timeline(symbol, start=end - pd.Timedelta(days=days), columns=["bias", "price"])
+        return df[df["bias"].ne(df["bias"].shift())]
+
+    def stats(self):
+        """Rows and time span per symbol"""
+        conn = self._conn()
+        rows = conn.execute("SELECT symbol, COUNT(*), MIN(ts), MAX(ts) FROM signals GROUP BY symbol").fetchall()
+        labels = self._labels(conn, [r[0] for r in rows])
+        return [
+            {"symbol": labels[s], "rows": n, "first": pd.Timestamp(lo, unit="ms", tz="UTC"),
+             "last": pd.Timestamp(hi, unit="ms", tz="UTC")}
+            for s, n, lo, hi in rows
+        ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the signal history")
+    parser.add_argument("symbol", nargs="?")
+    parser.add_argument("--db", default="signals.db")
+    parser.add_argument("--days", type=float, default=7)
+    args = parser.parse_args(argv)
+
+    store = SignalStore(args.db)
+    try:
+        if args.symbol is None:
+            for row in store.stats():
+                print(f"{row['symbol']:>8} {row['rows']:>9} rows  {row['first']:%Y-%m-%d %H:%M} -> {row['last']:%Y-%m-%d %H:%M}")
+            return
+        timeline = store.bias_timeline(args.symbol.upper(), days=args.days)
+        for when, row in timeline.iterrows():
+            print(f"{when:%Y-%m-%d %H:%M}  {row['bias']:<15} {row['price']:.6g}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Materialized analyses: versioned snapshots written by a batch worker.
+
+Every page load used to fetch the candles and run the whole indicator
+pipeline, even for the handful of symbols every visitor looks at.
+`SnapshotWorker` runs that pipeline on a background thread for a fixed
+symbol list every `interval` seconds. It writes each result to a
+`SnapshotStore` as the symbol's next version. The page then reads the latest
+snapshot and only computes on demand when there is none, or when it is
+older than the page accepts.
+
+Layout, in SQLite (WAL mode, as in signals.py):
+
+    snapshots  WITHOUT ROWID, primary key (symbol, version): the latest
+               version of a symbol is one seek to the end of its key range
+               payload  the payload dict (price, candles, indicator results,
+                        bias, trade plan) as an .npz archive: the arrays
+                        as plain NumPy buffers plus one JSON document
+                        for everything else; see `encode`
+               format   FORMAT at write time; rows of another format are
+                        ignored, so a change to the payload never reaches
+                        old readers
+
+Nothing is pickled. The file's path comes from config, and loading a pickle
+from a file someone else can write runs their code. Pickles also break when
+a pandas upgrade changes the pickled classes. JSON holds str, bool, int,
+float (NaN included), None, dicts with str keys, lists and tuples. The
+arrays go into the .npz file, read back with `allow_pickle=False`:
+CandleStore buffers, the values and timestamps of pandas Series on a
+DatetimeIndex, and pandas Timestamps as ms. Any other type is refused when
+the snapshot is written.
+
+The store also keeps each symbol's latest snapshot in memory. A read that
+finds one young enough is a dict lookup, and anything else is one indexed
+query. Each symbol keeps its last `keep` versions.
+
+    $ python snapshots.py --db snapshots.db          # latest version per symbol
+    $ python snapshots.py --db snapshots.db BTC      # versions kept for BTC
+"""
+import argparse
+import io
+import json
+import sqlite3
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+import candles
+
+FORMAT = 2
+JSON_KEY = "payload_json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    symbol TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created REAL NOT NULL,
+    bar_ts INTEGER,
+    format INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (symbol, version)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _ms(value):
+    return None if value is None else pd.Timestamp(value).value // 1_000_000
+
+
+# --- PAYLOAD FORMAT ---
+def encode(payload):
+    """Payload dict -> .npz bytes; TypeError for a value the format cannot hold"""
+    arrays = {}
+
+    def store(array):
+        key = f"a{len(arrays)}"
+        arrays[key] = np.ascontiguousarray(array)
+        return key
+
+    def walk(value):
+        if value is None or isinstance(value, (str, bool, int, float)):
+            return value
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, dict):
+            if not all(isinstance(k, str) for k in value):
+                raise TypeError("snapshot dict keys must be strings")
+            return {k: walk(v) for k, v in value.items()}
+        if isinstance(value, tuple):
+            return {"__tuple__": [walk(v) for v in value]}
+        if isinstance(value, list):
+            return [walk(v) for v in value]
+        if isinstance(value, pd.Timestamp):
+            return {"__timestamp__": _ms(value)}
+        if isinstance(value, candles.CandleStore):
+            return {"__candles__": [store(value.timestamps), store(value.values)]}
+        if isinstance(value, pd.Series) and isinstance(value.index, pd.DatetimeIndex) and value.dtype.kind in "fiub":
+            return {"__series__": [store(value.index.as_unit("ms").asi8), store(value.to_numpy(dtype=float))],
+                    "name": walk(value.name), "index_name": walk(value.index.name)}
+        raise TypeError(f"cannot store {type(value).__name__} in a snapshot")
+
+    document = json.dumps(walk(payload)).encode()
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays, **{JSON_KEY: np.frombuffer(document, dtype=np.uint8)})
+    return buffer.getvalue()
+
+
+def decode(blob):
+    """.npz bytes from `encode` -> payload dict; never unpickles. ValueError for anything else"""
+    def read_only(key):
+        array = arrays[key]
+        array.flags.writeable = False
+        return array
+
+    def hook(obj):
+        if "__tuple__" in obj:
+            return tuple(obj["__tuple__"])
+        if "__timestamp__" in obj:
+            return pd.Timestamp(obj["__timestamp__"], unit="ms")
+        if "__candles__" in obj:
+            return candles.CandleStore(*(read_only(key) for key in obj["__candles__"]))
+        if "__series__" in obj:
+            index_key, values_key = obj["__series__"]
+            index = pd.DatetimeIndex(pd.to_datetime(arrays[index_key], unit="ms"), name=obj["index_name"])
+            return pd.Series(arrays[values_key], index=index, name=obj["name"])
+        return obj
+
+    def walk(value):
+        if isinstance(value, dict):
+            return hook({k: walk(v) for k, v in value.items()})
+        if isinstance(value, list):
+            return [walk(v) for v in value]
+        return value
+
+    try:
+        with np.load(io.BytesIO(blob), allow_pickle=False) as archive:
+            arrays = {key: archive[key] for key in archive.files}
+        document = json.loads(arrays.pop(JSON_KEY).tobytes())
+        return walk(document)
+    except (OSError, KeyError, IndexError, TypeError, ValueError, AttributeError, EOFError, zipfile.BadZipFile) as e:
+        # Bad archive, or JSON pointing at arrays that are missing or malformed
+        raise ValueError(f"not a snapshot payload: {e}") from e
+
+
+class SnapshotStore:
+    """Latest and recent analysis snapshots per symbol, versioned"""
+
+    def __init__(self, path, keep=24, clock=time.time):
+        self.path = path
+        self.keep = keep
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    @staticmethod
+    def _snapshot(symbol, version, created, bar_ts, payload):
+        return {"symbol": symbol, "version": version, "created": created,
+                "bar_ts": None if bar_ts is None else pd.Timestamp(bar_ts, unit="ms"), **payload}
+
+    # --- writes ---
+    def write(self, symbol, payload, bar_ts=None):
+        """Store `payload` as the next version of `symbol`; returns the version"""
+        blob = encode(payload)
+        created = self.clock()
+        conn = self._conn()
+        with self._lock, conn:
+            conn.execute("BEGIN IMMEDIATE")  # another store on the same file cannot take the same version
+            row = conn.execute("SELECT MAX(version) FROM snapshots WHERE symbol = ?", (symbol,)).fetchone()
+            version = (row[0] or 0) + 1
+            conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                         (symbol, version, created, _ms(bar_ts), FORMAT, blob))
+            conn.execute("DELETE FROM snapshots WHERE symbol = ? AND version <= ?", (symbol, version - self.keep))
+            self._latest[symbol] = self._snapshot(symbol, version, created, _ms(bar_ts), payload)
+        return version
+
+    # --- reads ---
+    def latest(self, symbol, max_age=None):
+        """Newest snapshot of `symbol` no older than `max_age` seconds, None if there is none.
+
+        The returned dict is shared with other readers; treat it as read-only.
+        """
+        snapshot = self._latest.get(symbol)
+        if snapshot is None or (max_age is not None and self.clock() - snapshot["created"] > max_age):
+            # Not in memory, or a restarted or separate writer may have stored a newer one
+            self.misses += 1
+            row = self._conn().execute(
+                "SELECT version, created, bar_ts, payload FROM snapshots WHERE symbol = ? AND format = ? "
+                "ORDER BY version DESC LIMIT 1", (symbol, FORMAT),
+            ).fetchone()
+            if row is None:
+                return None
+            if snapshot is None or row[0] > snapshot["version"]:
+                try:
+                    payload = decode(row[3])
+                except ValueError:
+                    return None  # damaged or foreign row: compute on demand instead
+                snapshot = self._snapshot(symbol, row[0], row[1], row[2], payload)
+                with self._lock:
+                    current = self._latest.get(symbol)
+                    if current is None or current["version"] < snapshot["version"]:
+                        self._latest[symbol] = snapshot
+        else:
+            self.hits += 1
+        if max_age is not None and self.clock() - snapshot["created"] > max_age:
+            return None
+        return snapshot
+
+    def versions(self, symbol):
+        """(version, created, bar_ts) of every kept snapshot of `symbol`, oldest first"""
+        rows = self._conn().execute(
+            "SELECT version, created, bar_ts FROM snapshots WHERE symbol = ? ORDER BY version", (symbol,),
+        ).fetchall()
+        return [(v, pd.Timestamp(c, unit="s", tz="UTC"), None if b is None else pd.Timestamp(b, unit="ms", tz="UTC"))
+                for v, c, b in rows]
+
+    def stats(self):
+        """Kept versions, latest version and its age per symbol"""
+        rows = self._conn().execute(
+            "SELECT symbol, COUNT(*), MAX(version), MAX(created) FROM snapshots GROUP BY symbol ORDER BY symbol",
+        ).fetchall()
+        now = self.clock()
+        return [{"symbol": s, "versions": n, "latest": v, "age_s": now - c} for s, n, v, c in rows]
+
+
+class SnapshotWorker:
+    """Materializes `compute(symbol)` for a fixed symbol list every `interval` seconds on a background thread.
+
+    `compute` returns the payload dict (with an optional "bar_ts") or None
+    when the data is unavailable. A failed symbol keeps its previous
+    snapshot and is tried again on the next cycle.
+    """
+
+    def __init__(self, store, symbols, compute, interval=60.0, clock=time.monotonic):
+        self.store = store
+        self.symbols = list(symbols)
+        self.compute = compute
+        self.interval = interval
+        self.clock = clock
+        self.cycles = 0
+        self.written = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_cycle_s = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=False):
+        """Stop after the symbol being computed; `wait` blocks until then"""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def run_once(self):
+        """One pass over every symbol; returns the number of snapshots written"""
+        started, written = self.clock(), 0
+        for symbol in self.symbols:
+            if self._stop.is_set():
+                break
+            try:
+                payload = self.compute(symbol)
+            except Exception as e:
+                payload, self.last_error = None, f"{symbol}: {e}"
+            if payload is None:
+                self.failures += 1
+                continue
+            try:
+                self.store.write(symbol, payload, bar_ts=payload.get("bar_ts"))
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                self.failures += 1
+                self.last_error = f"{symbol}: {e}"
+                continue
+            written += 1
+        self.written += written
+        self.cycles += 1
+        self.last_cycle_s = self.clock() - started
+        return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = self.clock()
+            self.run_once()
+            self._stop.wait(max(0.0, self.interval - (self.clock() - started)))
+
+    def stats(self):
+        return {"cycles": self.cycles, "written": self.written, "failures": self.failures,
+                "last_cycle_s": self.last_cycle_s, "last_error": self.last_error}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the analysis snapshots")
+    parser.add_argument("symbol", nargs="?")
+    parser.add_argument("--db", default="snapshots.db")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.db)
+    if args.symbol is None:
+        for row in store.stats():
+            print(f"{row['symbol']:>8}  v{row['latest']:<6} {row['versions']:>3} kept  {row['age_s']:7.0f}s old")
+        return
+    for version, created, bar_ts in store.versions(args.symbol.upper()):
+        bar = f"{bar_ts:%Y-%m-%d %H:%M}" if bar_ts is not None else "-"
+        print(f"v{version:<6} written {created:%Y-%m-%d %H:%M:%S}  last bar {bar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,35 @@ import pytz
 import time
 from datetime import time as dt_time, timedelta, timezone
 import ta
-from ta.volatility import AverageTrueRange
-from ta.trend import PSARIndicator
 from ta.momentum import RSIIndicator
 from ta.volatility import BollingerBands
 import random
+import sqlite3
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import archive
+import batch_indicators
+import chart
+import correlation
+import datasources
+import divergence
+import indicator_registry
+import integrity
+import montecarlo
+import orderbook
+import portfolio
+import prefetch
+import progressive
+import psar
+import regime
+import render
+import replay
+import sessions
+import signals
+import snapshots
+import symbols
+from formatting import format_price
 
 
 
@@ -30,6 +53,15 @@ RISK_REWARD_OPTIONS = {
     "Custom": None
 } 
 
+# --- CACHING / PREFETCH ---
+PRICE_TTL = 60  # seconds
+HISTORY_TTL = 300  # seconds
+PREFETCH_MARGIN = 20  # refresh viewed symbols this many seconds before expiry
+PREFETCH_RATE_PER_MIN = 25  # upstream budget (CoinGecko demo plan allows 30 calls/min)
+SYMBOL_INDEX_TTL = 24 * 3600  # seconds; the coin list changes slowly
+PENDING_POLL_S = 0.5  # how often a page with pending cards checks whether their data has arrived
+REPAINT_S = 0.1  # results arriving this close together share one repaint
+
 # --- PAGE CONFIG ---
 st.set_page_config(
     page_title="Crypto Market Analyzer",
@@ -39,10 +71,47 @@ st.set_page_config(
 
 # --- API KEYS ---
 CG_PUBLIC_API_KEY = st.secrets.get("CG_PUBLIC_API_KEY", "") 
+CG_API_BASE = st.secrets.get("CG_API_BASE", replay.API_BASE)
+EXCHANGE_API_BASE = st.secrets.get("EXCHANGE_API_BASE", datasources.EXCHANGE_API_BASE)
+
+# --- MARKET DATA SOURCES (priority order; later ones back up slow or failing earlier ones; "exchange" is opt-in) ---
+MARKET_DATA_SOURCES = [name.strip() for name in st.secrets.get("MARKET_DATA_SOURCES", "coingecko").split(",")]
+
+# --- DATA SOURCE (live / record / replay) ---
+replay.configure(
+    mode=st.secrets.get("DATA_SOURCE", "live"),
+    fixture_dir=st.secrets.get("FIXTURE_DIR", replay.DEFAULT_FIXTURE_DIR),
+    latency_ms=st.secrets.get("REPLAY_LATENCY_MS", 0),
+    jitter_ms=st.secrets.get("REPLAY_JITTER_MS", 0),
+    error_rate=st.secrets.get("REPLAY_ERROR_RATE", 0.0),
+    seed=st.secrets.get("REPLAY_SEED", None),
+)
+
+# --- HISTORY ARCHIVE (optional, appends every fetched history) ---
+ARCHIVE_DIR = st.secrets.get("ARCHIVE_DIR", "")
+
+# --- SIGNAL HISTORY (optional, every computed snapshot is appended here; like the archive, off unless set) ---
+SIGNAL_DB = st.secrets.get("SIGNAL_DB", "")
+
+# --- ANALYSIS SNAPSHOTS (optional, a background worker keeps these symbols' analyses ready for the page) ---
+SNAPSHOT_DB = st.secrets.get("SNAPSHOT_DB", "")
+SNAPSHOT_SYMBOLS = [s.strip().upper() for s in st.secrets.get("SNAPSHOT_SYMBOLS", "BTC,ETH,SOL").split(",") if s.strip()]
+
+# --- RENDER BUDGET (seconds a rerun waits before showing pending cards; 0 waits for everything behind a spinner) ---
+RENDER_BUDGET_S = float(st.secrets.get("RENDER_BUDGET_S", 1.5))
 
-# --- STYLES ---
-st.markdown("""
-<style>
+# --- ACCOUNT (full mode; defaults for the sidebar's position sizing inputs) ---
+ACCOUNT_EQUITY = float(st.secrets.get("ACCOUNT_EQUITY", 10_000))
+RISK_PER_TRADE_PCT = float(st.secrets.get("RISK_PER_TRADE_PCT", 1.0))
+
+# --- ORDER BOOK (websocket depth diffs; the REST snapshot comes from EXCHANGE_API_BASE) ---
+DEPTH_STREAM_BASE = st.secrets.get("DEPTH_STREAM_BASE", orderbook.STREAM_BASE)
+
+# --- SYMBOL INDEX (full mode; CoinGecko's coin list saved here between restarts) ---
+SYMBOL_INDEX_PATH = st.secrets.get("SYMBOL_INDEX_PATH", "symbol_index.json")
+
+# --- STYLES (minified once per process; see render.py) ---
+APP_CSS = """
 * {
     font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
 }
@@ -154,13 +223,17 @@ header[data-testid="stHeader"], footer {visibility: hidden !important;}
     margin-bottom: 12px;
 }
 
+.indicator-grid {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    gap: 12px;
+}
 .indicator-card {
     background: #1a2332;
     border-radius: 10px;
     padding: 16px 18px;
     border-left: 4px solid #374151;
     box-shadow: 0 2px 8px rgba(0,0,0,0.2);
-    margin-bottom: 12px;
 }
 .indicator-card .card-header {
     display: flex;
@@ -200,7 +273,7 @@ header[data-testid="stHeader"], footer {visibility: hidden !important;}
     padding: 16px 18px;
     border-left: 4px solid #8B5CF6;
     box-shadow: 0 2px 8px rgba(0,0,0,0.2);
-    margin-top: 12px;
+    grid-column: 1 / -1;
 }
 .indicator-card-full .card-header {
     display: flex;
@@ -292,6 +365,14 @@ header[data-testid="stHeader"], footer {visibility: hidden !important;}
     line-height: 1.6;
 }
 
+.pending { opacity: 0.6; }
+.pending-note {
+    display: block;
+    font-size: 12px;
+    color: #9CA3AF !important;
+    margin-top: 6px;
+}
+
 .bullish { color: #34D399 !important; font-weight: 700; }
 .bearish { color: #F87171 !important; font-weight: 700; }
 .neutral { color: #FBBF24 !important; font-weight: 700; }
@@ -328,8 +409,8 @@ header[data-testid="stHeader"], footer {visibility: hidden !important;}
         font-size: 22px;
     }
 }
-</style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(render.style_block(APP_CSS), unsafe_allow_html=True)
 
 # --- CONSTANTS ---
 TIMEZONE_MAP = {
@@ -343,15 +424,15 @@ TIMEZONE_MAP = {
     "India (IST)": "Asia/Kolkata",
 }
 
-# --- FULL COIN MAP (commented for demo, uncomment for paid version) ---
-# FULL_COIN_MAP = {
-#     'BTC': 'bitcoin', 'ETH': 'ethereum', 'SOL': 'solana',
-#     'ADA': 'cardano', 'XRP': 'ripple', 'DOGE': 'dogecoin',
-#     'DOT': 'polkadot', 'LINK': 'chainlink', 'MATIC': 'polygon',
-#     'UNI': 'uniswap', 'ATOM': 'cosmos', 'LTC': 'litecoin',
-#     'BCH': 'bitcoin-cash', 'NEAR': 'near', 'ALGO': 'algorand',
-#     'AVAX': 'avalanche-2', 'FTM': 'fantom'
-# }
+# --- FULL COIN MAP (pins the coin a colliding ticker means; fallback while the symbol index loads) ---
+FULL_COIN_MAP = {
+    'BTC': 'bitcoin', 'ETH': 'ethereum', 'SOL': 'solana',
+    'ADA': 'cardano', 'XRP': 'ripple', 'DOGE': 'dogecoin',
+    'DOT': 'polkadot', 'LINK': 'chainlink', 'MATIC': 'polygon',
+    'UNI': 'uniswap', 'ATOM': 'cosmos', 'LTC': 'litecoin',
+    'BCH': 'bitcoin-cash', 'NEAR': 'near', 'ALGO': 'algorand',
+    'AVAX': 'avalanche-2', 'FTM': 'fantom'
+}
 
 # --- DEMO COIN MAP (only 3 coins) ---
 DEMO_COIN_MAP = {
@@ -360,174 +441,177 @@ DEMO_COIN_MAP = {
     'SOL': 'solana',
 }
 
-def format_price(p):
-    if p is None: return "N/A" 
-    try: p = float(p)
-    except: return "N/A" 
-    if abs(p) >= 10: return f"{p:,.2f}"
-    elif abs(p) >= 1: return f"{p:,.4f}" 
-    else: return f"{p:.6f}".rstrip("0").rstrip(".")
+# --- MARKET REGIME ---
+ADAPTIVE_THRESHOLDS = True  # RSI bands and the squeeze percentile follow the regime; False keeps 70/30 and the 20th
+
+# --- MARKET CORRELATION ---
+# Each coin is one candle load (two CoinGecko calls) per refresh; all of FULL_COIN_MAP would exceed PREFETCH_RATE_PER_MIN
+CORRELATION_UNIVERSE = [s.strip().upper() for s in st.secrets.get("CORRELATION_SYMBOLS", ",".join(DEMO_COIN_MAP)).split(",")
+                        if s.strip()]
+CORRELATION_WINDOW = 42  # bars (7 days of 4h candles)
+
+# --- PRICE CHART ---
+CHART_MAX_POINTS = 600  # candles / line points sent to the browser per view
+CHART_RANGES = {"1W": 7, "1M": 30, "3M": 90, "1Y": 365, "All": None}  # days of history per zoom level
+
+# --- PORTFOLIO ---
+PORTFOLIO_MAX_POSITION = 1.0  # largest position as a multiple of equity, however tight the stop
+PORTFOLIO_WINDOW = CORRELATION_WINDOW  # bars of returns behind the correlated risk
+
+# --- ORDER BOOK HEATMAP ---
+DEPTH_INTERVAL_S = 1.0  # one binned book snapshot per second
+DEPTH_HISTORY = 900  # snapshots kept per pair (15 minutes)
+DEPTH_BINS = 40  # price buckets across the window
+DEPTH_SPAN = 0.01  # window is the mid ±1%
+DEPTH_FEEDS = 4  # live pairs at once; the least recently opened one is closed first
+HEATMAP_COLUMNS = 90  # time columns sent to the browser (columns x buckets stays under Altair's 5,000-row limit)
+HEATMAP_REFRESH_S = 2  # seconds between heatmap redraws
+
+# --- ANALYSIS SNAPSHOTS ---
+SNAPSHOT_INTERVAL_S = PRICE_TTL  # one worker pass per price refresh
+SNAPSHOT_MAX_AGE_S = 2 * SNAPSHOT_INTERVAL_S  # an older snapshot is ignored and the page computes on demand
+SNAPSHOT_KEEP = 24  # versions kept per symbol
+SNAPSHOT_RISK_REWARD = "1:2 (Moderate/Default)"  # plan stored with the snapshot; the page re-plans for the user's choice
+
+# --- TRADE ODDS (Monte Carlo) ---
+MC_PATHS = 20_000  # simulated futures per plan
+MC_HORIZON_BARS = 42  # bars simulated ahead (7 days of 4h candles)
+MC_BLOCK_BARS = 6  # consecutive historical returns per bootstrap block (one day of 4h candles)
 
 # --- COINGECKO API ---
+def load_symbol_index():
+    """CoinGecko's coin list as a SymbolIndex; the copy on disk covers restarts and upstream outages"""
+    saved = symbols.SymbolIndex.load(SYMBOL_INDEX_PATH, preferred=FULL_COIN_MAP)
+    if saved is not None and saved.age() < SYMBOL_INDEX_TTL:
+        return saved
+    try:
+        coins = datasources.CoinGeckoSource(CG_API_BASE, CG_PUBLIC_API_KEY, bucket=get_prefetcher().bucket).fetch_coin_list()
+    except (requests.exceptions.RequestException, datasources.SourceError, ValueError):
+        return saved
+    index = symbols.SymbolIndex(coins, preferred=FULL_COIN_MAP)
+    try:
+        index.save(SYMBOL_INDEX_PATH)
+    except OSError:
+        pass
+    return index
+
+def get_symbol_index():
+    """Shared symbol index, refreshed in the background once a day; None until the first load succeeds"""
+    return get_prefetcher().get(
+        ("symbol_index",),
+        load_symbol_index,
+        ttl=SYMBOL_INDEX_TTL,
+        is_valid=lambda index: index is not None,
+    )
+
 def get_coin_id(symbol):
     """Map symbol to CoinGecko coin ID - uses demo or full map based on DEMO_MODE"""
-    symbol = symbol.upper().replace("USD", "").replace("USDT", "")
-    
     if DEMO_MODE:
+        symbol = symbol.upper().replace("USD", "").replace("USDT", "")
         return DEMO_COIN_MAP.get(symbol, symbol.lower())
-    else:
-        # Full map would be used here
-        return symbol.lower()
-
-@st.cache_data(ttl=60, show_spinner=False)
-def fetch_crypto_price_coingecko(symbol, api_key=""):
-    """Fetch current price from CoinGecko"""
-    coin_id = get_coin_id(symbol)
-    url = "https://api.coingecko.com/api/v3/simple/price"
-    params = {
-        'ids': coin_id, 
-        'vs_currencies': 'usd', 
-        'include_24hr_change': 'true'
-    }
-    headers = {}
-    if api_key:
-        headers['x-cg-demo-api-key'] = api_key
     
-    try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        data = response.json()
-        if coin_id in data and 'usd' in data[coin_id]:
-            price = float(data[coin_id]['usd'])
-            change_percent = float(data[coin_id].get('usd_24h_change', 0))
-            return price, change_percent
-    except Exception as e:
-        pass
-    return None, None
+    index = get_symbol_index()
+    coin_id = index.resolve(symbol) if index is not None else None
+    return coin_id or FULL_COIN_MAP.get(symbol.strip().upper(), symbol.strip().lower())
 
-@st.cache_data(ttl=300, show_spinner=False)
-def fetch_historical_data_coingecko(symbol, days=30, api_key=""):
-    """Fetch REAL historical OHLC data from CoinGecko"""
-    coin_id = get_coin_id(symbol)
-    
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/ohlc"
-    
-    if days <= 1:
-        interval = '1m'
-    elif days <= 30:
-        interval = '1h'
-    elif days <= 90:
-        interval = '4h'
-    else:
-        interval = '1d'
-    
-    params = {
-        'vs_currency': 'usd',
-        'days': days,
-    }
-    
-    headers = {}
-    if api_key:
-        headers['x-cg-demo-api-key'] = api_key
-    
-    try:
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        data = response.json()
-        
-        if not data or len(data) < 10:
-            st.error(f"Insufficient historical data returned for {symbol}. Please try again.")
-            return None
-        
-        df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df = df.set_index('timestamp')
-        
-        df = df.rename(columns={
-            'open': 'Open',
-            'high': 'High',
-            'low': 'Low',
-            'close': 'Close'
-        })
-        
-        df = df.sort_index()
-        
-        return df
-        
-    except requests.exceptions.Timeout:
-        st.error("⏱️ Historical data request timed out. Please try again.")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"🌐 Network error fetching historical data: {str(e)}")
-        return None
-    except Exception as e:
-        st.error(f"❌ Error fetching historical data: {str(e)}")
-        return None
+# --- MARKET DATA SOURCES ---
+@st.cache_resource(show_spinner=False, on_release=lambda market: market.shutdown())
+def get_market_data():
+    """Sources in priority order with hedging and circuit breakers, shared by every session.
 
-@st.cache_data(ttl=300, show_spinner=False)
-def fetch_volume_data_coingecko(symbol, days=30, api_key=""):
-    """Fetch REAL volume data from CoinGecko"""
-    coin_id = get_coin_id(symbol)
-    
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
-    params = {
-        'vs_currency': 'usd',
-        'days': days,
+    Every HTTP request they send, hedges and failovers included, is charged to the prefetcher's upstream budget.
+    """
+    available = {
+        "coingecko": lambda: datasources.CoinGeckoSource(CG_API_BASE, CG_PUBLIC_API_KEY, coin_id=get_coin_id),
+        "exchange": lambda: datasources.ExchangeSource(EXCHANGE_API_BASE),
     }
-    
-    headers = {}
-    if api_key:
-        headers['x-cg-demo-api-key'] = api_key
-    
-    try:
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        data = response.json()
-        
-        if not data or 'total_volumes' not in data or not data['total_volumes']:
-            return None
-        
-        volume_data = data['total_volumes']
-        df_volume = pd.DataFrame(volume_data, columns=['timestamp', 'Volume'])
-        df_volume['timestamp'] = pd.to_datetime(df_volume['timestamp'], unit='ms')
-        df_volume = df_volume.set_index('timestamp')
-        
-        return df_volume
-        
-    except Exception:
+    return datasources.MarketData([available[name]() for name in MARKET_DATA_SOURCES if name in available],
+                                  bucket=get_prefetcher().bucket)
+
+@st.cache_resource(show_spinner=False, on_release=lambda cache: cache.stop())
+def get_prefetcher():
+    """Process-wide refresh-ahead cache shared by every session"""
+    return prefetch.RefreshAheadCache(
+        rate_per_minute=PREFETCH_RATE_PER_MIN,
+        refresh_margin=PREFETCH_MARGIN,
+    ).start()
+
+@st.cache_resource(show_spinner=False, on_release=lambda backfiller: backfiller and backfiller.shutdown())
+def get_backfiller():
+    """Fills candle gaps from the exchange's range queries under the shared upstream budget; None without it.
+
+    The exchange's volume only joins a series already in its unit; otherwise the patched bars carry OHLC only.
+    """
+    if "exchange" not in MARKET_DATA_SOURCES:
         return None
+    source, primary = datasources.ExchangeSource(EXCHANGE_API_BASE), get_market_data().sources[0]
+    return integrity.Backfiller(source.fetch_range, bucket=get_prefetcher().bucket,
+                                volume=source.volume_unit == primary.volume_unit)
 
-def merge_ohlc_with_volume(df_ohlc, df_volume):
-    """Merge OHLC data with volume data by timestamp alignment"""
-    if df_ohlc is None or df_volume is None:
-        return df_ohlc
-    
-    df = df_ohlc.copy()
-    df['Volume'] = df_volume['Volume'].reindex(df.index, method='nearest')
-    
-    if df['Volume'].isna().any():
-        median_volume = df['Volume'].median()
-        df['Volume'] = df['Volume'].fillna(median_volume)
-    
-    return df
+def fetch_crypto_price(symbol):
+    """Current price and 24h change from the first source to answer"""
+    try:
+        return get_market_data().fetch("fetch_price", symbol)[0]
+    except datasources.SourceError:
+        return None, None
 
 def get_asset_price(symbol):
-    """Get current price from CoinGecko"""
-    return fetch_crypto_price_coingecko(symbol, CG_PUBLIC_API_KEY)
+    """Get current price from CoinGecko, or the next source when it is slow or down"""
+    return get_prefetcher().get(
+        ("price", symbol),
+        lambda: fetch_crypto_price(symbol),
+        ttl=PRICE_TTL,
+        is_valid=lambda result: result[0] is not None,
+    )
+
+def load_candles(symbol, days=30):
+    """Fetch OHLC and volume as one compact CandleStore from the first source to answer.
+
+    Often runs on a prefetch thread, where st.* calls are dropped: a SourceError
+    propagates to the prefetcher instead, and report_candle_error shows it.
+    """
+    store, _ = get_market_data().fetch_candles(symbol, days)
+    
+    backfiller = get_backfiller()
+    if backfiller is not None:
+        backfiller.submit(symbol, store, datasources.coingecko_candle_ms(days))
+    
+    if ARCHIVE_DIR:
+        try:
+            archive.CandleArchive(ARCHIVE_DIR).append(symbol, store)
+        except OSError:
+            pass
+    return store
+
+def get_candles(symbol, days=30):
+    """Shared read-only candle store for a symbol, with any backfilled gaps merged in"""
+    store = get_prefetcher().get(
+        ("candles", symbol, days),
+        lambda: load_candles(symbol, days),
+        ttl=HISTORY_TTL,
+    )
+    backfiller = get_backfiller()
+    if backfiller is None or store is None:
+        return store
+    return backfiller.apply(symbol, store, datasources.coingecko_candle_ms(days))
 
 def get_historical_data(symbol, days=30):
     """Get REAL historical data with volume"""
-    df_ohlc = fetch_historical_data_coingecko(symbol, days, CG_PUBLIC_API_KEY)
-    
-    if df_ohlc is None or len(df_ohlc) < 10:
-        return None
-    
-    df_volume = fetch_volume_data_coingecko(symbol, days, CG_PUBLIC_API_KEY)
-    
-    if df_volume is not None:
-        df = merge_ohlc_with_volume(df_ohlc, df_volume)
+    store = get_candles(symbol, days)
+    return store.to_frame() if store is not None else None
+
+def report_candle_error(symbol, days=30, have_data=False):
+    """Show why the last candle load for a symbol failed; call from the script thread"""
+    error = get_prefetcher().last_error(("candles", symbol, days))
+    if have_data:
+        if error:
+            st.warning(f"⚠️ Showing the last candles received; refreshing them failed: {error}")
+    elif error and "timed out" in error:
+        st.error("⏱️ Historical data request timed out. Please try again.")
+    elif error:
+        st.error(f"❌ Error fetching historical data: {error}")
     else:
-        df = df_ohlc.copy()
-        df['Volume'] = None
-    
-    return df
+        st.error("❌ Unable to fetch historical data. Please try again.")
 
 # --- SWING POINT DETECTION ---
 def find_swing_points(df, lookback=30):
@@ -578,15 +662,41 @@ def find_swing_points(df, lookback=30):
     
     return resistance, support
 
+# --- SHARED INTERMEDIATES ---
+def calculate_true_range(df):
+    """True range as a (T, 1) column, shared by every ATR window"""
+    cols = [df[c].to_numpy(dtype=float)[:, None] for c in ('High', 'Low', 'Close')]
+    return batch_indicators.batch_true_range(*cols)
+
+def calculate_atr_series(df, window=14, tr=None):
+    """Wilder ATR as a Series, identical to ta's AverageTrueRange"""
+    cols = [df[c].to_numpy(dtype=float)[:, None] for c in ('High', 'Low', 'Close')]
+    atr = batch_indicators.batch_atr(*cols, window=window, tr=tr)
+    return pd.Series(atr[:, 0], index=df.index)
+
+def calculate_rsi_series(df, window=14):
+    return RSIIndicator(close=df['Close'], window=window).rsi()
+
+def calculate_regime(df, atr=None, tracker=None):
+    """Volatility / trend regime of the last bar and the RSI and squeeze thresholds it implies"""
+    if atr is None:
+        atr = calculate_atr_series(df, window=14)
+    if tracker is None:
+        tracker = regime.RegimeTracker()
+    current = tracker.update(df.index, df['Close'].to_numpy(dtype=float), atr.to_numpy())
+    if not ADAPTIVE_THRESHOLDS:
+        current["thresholds"] = regime.thresholds()
+    return current
+
 # --- INDICATOR FUNCTIONS ---
-def calculate_supertrend(df, period=10, multiplier=3):
+def calculate_supertrend(df, period=10, multiplier=3, atr=None):
     if df is None or len(df) < period:
         return {"status": "Error", "value": None, "detail": "Insufficient data"}
     
     high = df['High']; low = df['Low']; close = df['Close']
     
-    atr_indicator = AverageTrueRange(high=high, low=low, close=close, window=period)
-    atr = atr_indicator.average_true_range()
+    if atr is None:
+        atr = calculate_atr_series(df, window=period)
     
     hl2 = (high + low) / 2
     upper_band = hl2 + (multiplier * atr)
@@ -628,66 +738,46 @@ def calculate_supertrend(df, period=10, multiplier=3):
         "detail": f"SuperTrend line at ${format_price(current_value)}" if not DEMO_MODE else "SuperTrend: " + current_trend
     }
 
-def calculate_rsi_with_divergence(df, rsi_period=14, ma_period=9):
+def calculate_rsi_with_divergence(df, rsi_period=14, ma_period=9, scanner=None, rsi=None, market_regime=None):
     if df is None or len(df) < rsi_period + ma_period:
         return {"status": "Error", "value": None, "detail": "Insufficient data"}
     
     close = df['Close']
     
-    rsi_indicator = RSIIndicator(close=close, window=rsi_period)
-    rsi = rsi_indicator.rsi()
+    if rsi is None:
+        rsi = calculate_rsi_series(df, window=rsi_period)
     rsi_ma = rsi.rolling(window=ma_period).mean()
     
     current_rsi = rsi.iloc[-1]
     current_rsi_ma = rsi_ma.iloc[-1]
     
     lookback = 30
-    divergence = "No Divergence"
+    divergence_text = "No Divergence"
     
     if len(rsi) > lookback:
-        rsi_array = rsi.iloc[-lookback:].values
-        price_array = close.iloc[-lookback:].values
-        
-        price_highs = []; price_lows = []; rsi_highs = []; rsi_lows = []
-        
-        for i in range(2, len(price_array) - 1):
-            is_swing_high = (
-                i >= 2 and i <= len(price_array) - 2 and
-                price_array[i] > price_array[i-1] and price_array[i] > price_array[i-2] and
-                price_array[i] > price_array[i+1]
-            )
-            is_swing_low = (
-                i >= 2 and i <= len(price_array) - 2 and
-                price_array[i] < price_array[i-1] and price_array[i] < price_array[i-2] and
-                price_array[i] < price_array[i+1]
-            )
-            
-            if is_swing_high:
-                price_highs.append((i, price_array[i]))
-                rsi_highs.append((i, rsi_array[i]))
-            if is_swing_low:
-                price_lows.append((i, price_array[i]))
-                rsi_lows.append((i, rsi_array[i]))
-        
-        if len(price_highs) >= 2 and price_highs[-1][1] > price_highs[-2][1] and rsi_highs[-1][1] < rsi_highs[-2][1]:
-            divergence = "Bearish Divergence"
-        if len(price_lows) >= 2 and price_lows[-1][1] < price_lows[-2][1] and rsi_lows[-1][1] > rsi_lows[-2][1]:
-            divergence = "Bullish Divergence"
+        if scanner is not None:
+            _, highs, lows = scanner.update(df.index, close.values, {"RSI": rsi.values})
+        else:
+            highs, lows = divergence.find_pivots(close.values)
+        divergence_text = divergence.divergence_label(close.values, rsi.values, highs, lows, lookback)
     
-    if current_rsi > 70:
+    levels = market_regime["thresholds"] if market_regime else regime.thresholds()
+    overbought, oversold = levels["overbought"], levels["oversold"]
+    if current_rsi > overbought:
         status = "Overbought"
-    elif current_rsi < 30:
+    elif current_rsi < oversold:
         status = "Oversold"
     else:
         status = "Neutral"
     
+    bands = "" if (overbought, oversold) == (70, 30) else f" ({oversold}/{overbought})"
     return {
         "status": status,
         "value": current_rsi,
-        "detail": f"RSI: {status}" if DEMO_MODE else f"RSI: {current_rsi:.2f} | MA: {current_rsi_ma:.2f} | {divergence}"
+        "detail": f"RSI: {status}" if DEMO_MODE else f"RSI: {current_rsi:.2f}{bands} | MA: {current_rsi_ma:.2f} | {divergence_text}"
     }
 
-def calculate_bollinger_bands(df, period=20, std_dev=2):
+def calculate_bollinger_bands(df, period=20, std_dev=2, market_regime=None):
     if df is None or len(df) < period:
         return {"status": "Error", "value": None, "detail": "Insufficient data"}
     
@@ -711,10 +801,10 @@ def calculate_bollinger_bands(df, period=20, std_dev=2):
             width = (upper.iloc[i] - lower.iloc[i]) / middle.iloc[i]
             historical_widths.append(width)
     
+    squeeze_pct = (market_regime["thresholds"] if market_regime else regime.thresholds())["squeeze_pct"]
     is_squeeze = False
     if len(historical_widths) >= 100:
-        percentile_20 = np.percentile(historical_widths, 20)
-        if band_width <= percentile_20:
+        if band_width <= np.percentile(historical_widths, squeeze_pct):
             is_squeeze = True
     
     if current_close > current_upper:
@@ -739,7 +829,8 @@ def calculate_bollinger_bands(df, period=20, std_dev=2):
         "upper": current_upper,
         "middle": current_middle,
         "lower": current_lower,
-        "position": position
+        "position": position,
+        "regime": market_regime["label"] if market_regime else None
     }
 
 def calculate_parabolic_sar(df, step=0.02, max_step=0.2):
@@ -748,11 +839,11 @@ def calculate_parabolic_sar(df, step=0.02, max_step=0.2):
     
     high = df['High']; low = df['Low']; close = df['Close']
     
-    psar_indicator = PSARIndicator(high=high, low=low, close=close, step=step, max_step=max_step)
-    psar = psar_indicator.psar()
+    sar = psar.psar(high.values, low.values, close.values, step=step, max_step=max_step)
     
-    current_psar = psar.iloc[-1]
+    current_psar = sar["sar"][-1]
     current_close = close.iloc[-1]
+    bars_since_flip = int(sar["bars_since_flip"][-1])
     
     if current_close > current_psar:
         status = "Bullish"
@@ -761,13 +852,7 @@ def calculate_parabolic_sar(df, step=0.02, max_step=0.2):
         status = "Bearish"
         detail = "SAR: Bearish" if DEMO_MODE else f"SAR at ${format_price(current_psar)} — Above price"
     
-    is_reversal = False
-    if len(psar) > 2:
-        for i in range(1, min(3, len(psar))):
-            if (psar.iloc[-i] > close.iloc[-i] and psar.iloc[-i-1] < close.iloc[-i-1]) or \
-               (psar.iloc[-i] < close.iloc[-i] and psar.iloc[-i-1] > close.iloc[-i-1]):
-                is_reversal = True
-                break
+    is_reversal = bool(psar.close_crossings(close.values, sar["sar"]))
     
     if is_reversal and DEMO_MODE:
         detail += " | ⚠️ REVERSAL"
@@ -778,7 +863,8 @@ def calculate_parabolic_sar(df, step=0.02, max_step=0.2):
         "status": status,
         "value": current_psar,
         "detail": detail,
-        "is_reversal": is_reversal
+        "is_reversal": is_reversal,
+        "bars_since_flip": bars_since_flip
     }
 
 def calculate_volume_profile(df, num_bins=25):
@@ -839,51 +925,75 @@ def calculate_volume_profile(df, num_bins=25):
         "detail": detail
     }
 
-def calculate_all_indicators(symbol, df):
+@st.cache_resource(show_spinner=False)
+def get_divergence_scanner(symbol):
+    """Per-symbol divergence scanner shared by all sessions; each rerun only examines new bars"""
+    return divergence.DivergenceScanner()
+
+@st.cache_resource(show_spinner=False)
+def get_regime_tracker(symbol):
+    """Per-symbol regime tracker shared by all sessions; each rerun only pushes new bars"""
+    return regime.RegimeTracker()
+
+# --- INDICATOR REGISTRY ---
+# Indicators declare the intermediates they need; each intermediate is computed once per run.
+# A node with a vote takes part in determine_overall_bias, so adding an indicator means one register() call.
+INDICATOR_WORKERS = 0  # >0 runs independent nodes on a thread pool (GIL-bound; measured no faster on one symbol)
+
+def vote_trend(result, results):
+    return (2, 0) if result["status"] == "Bullish" else (0, 2) if result["status"] == "Bearish" else (0, 0)
+
+def vote_momentum(result, results):
+    bullish = (result["status"] == "Oversold") + ("Bullish Divergence" in result["detail"] and "Bearish Divergence" not in result["detail"])
+    bearish = (result["status"] == "Overbought") + ("Bearish Divergence" in result["detail"])
+    return bullish, bearish
+
+def vote_reversal(result, results):
+    return (1, 0) if result["status"] == "Bullish" else (0, 1) if result["status"] == "Bearish" else (0, 0)
+
+def vote_squeeze(result, results):
+    """A squeeze adds half a point in the SuperTrend direction"""
+    if result["status"] != "Squeeze" or "trend" not in results:
+        return 0, 0
+    trend = results["trend"]["status"]
+    return (0.5, 0) if trend == "Bullish" else (0, 0.5) if trend == "Bearish" else (0, 0)
+
+@st.cache_resource(show_spinner=False)
+def get_indicator_registry():
+    """Process-wide indicator graph"""
+    registry = indicator_registry.IndicatorRegistry()
+    registry.register("true_range", calculate_true_range, output=False)
+    registry.register("atr_10", calculate_atr_series, inputs={"tr": "true_range"}, params={"window": 10}, output=False)
+    registry.register("atr_14", calculate_atr_series, inputs={"tr": "true_range"}, params={"window": 14}, output=False)
+    registry.register("rsi_14", calculate_rsi_series, params={"window": 14}, output=False)
+    registry.register("swing_points", find_swing_points, params={"lookback": 30}, output=False)
+    registry.register("regime", calculate_regime, inputs={"atr": "atr_14"}, context=("tracker",), output=False)
+
+    registry.register("trend", calculate_supertrend, inputs={"atr": "atr_10"}, params={"period": 10}, vote=vote_trend)
+    registry.register("momentum", calculate_rsi_with_divergence, inputs={"rsi": "rsi_14", "market_regime": "regime"},
+                      params={"rsi_period": 14}, context=("scanner",), vote=vote_momentum)
+    registry.register("volatility", calculate_bollinger_bands, inputs={"market_regime": "regime"}, vote=vote_squeeze)
+    registry.register("reversal", calculate_parabolic_sar, vote=vote_reversal, error_extra={"is_reversal": False})
+    registry.register("liquidity", calculate_volume_profile)
+    return registry
+
+@st.cache_resource(show_spinner=False, on_release=lambda pool: pool.shutdown(wait=False))
+def get_indicator_executor(workers):
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="indicators")
+
+def calculate_all_indicators(symbol, df, on_result=None):
+    registry = get_indicator_registry()
     if df is None:
-        return {
-            "trend": {"status": "Error", "value": None, "detail": "No data"},
-            "momentum": {"status": "Error", "value": None, "detail": "No data"},
-            "volatility": {"status": "Error", "value": None, "detail": "No data"},
-            "reversal": {"status": "Error", "value": None, "detail": "No data"},
-            "liquidity": {"status": "Error", "value": None, "detail": "No data"}
-        }
+        return {name: {"status": "Error", "value": None, "detail": "No data", "is_reversal": False} for name in registry.outputs}
     
-    try:
-        return {
-            "trend": calculate_supertrend(df),
-            "momentum": calculate_rsi_with_divergence(df),
-            "volatility": calculate_bollinger_bands(df),
-            "reversal": calculate_parabolic_sar(df),
-            "liquidity": calculate_volume_profile(df)
-        }
-    except Exception as e:
-        return {
-            "trend": {"status": "Error", "value": None, "detail": str(e)},
-            "momentum": {"status": "Error", "value": None, "detail": "Error"},
-            "volatility": {"status": "Error", "value": None, "detail": "Error"},
-            "reversal": {"status": "Error", "value": None, "detail": "Error"},
-            "liquidity": {"status": "Error", "value": None, "detail": "Error"}
-        }
+    executor = get_indicator_executor(INDICATOR_WORKERS) if INDICATOR_WORKERS > 0 else None
+    # Trade parameters reuse the ATR and swing levels instead of recomputing them
+    return registry.compute(df, names=registry.outputs + ["atr_14", "swing_points", "regime"], executor=executor,
+                            scanner=get_divergence_scanner(symbol), tracker=get_regime_tracker(symbol),
+                            on_result=on_result)
 
 def determine_overall_bias(indicator_data):
-    bullish = 0; bearish = 0
-    
-    if indicator_data["trend"]["status"] == "Bullish": bullish += 2
-    elif indicator_data["trend"]["status"] == "Bearish": bearish += 2
-    
-    if indicator_data["momentum"]["status"] == "Overbought": bearish += 1
-    elif indicator_data["momentum"]["status"] == "Oversold": bullish += 1
-    
-    if "Bearish Divergence" in indicator_data["momentum"]["detail"]: bearish += 1
-    elif "Bullish Divergence" in indicator_data["momentum"]["detail"]: bullish += 1
-    
-    if indicator_data["reversal"]["status"] == "Bullish": bullish += 1
-    elif indicator_data["reversal"]["status"] == "Bearish": bearish += 1
-    
-    if indicator_data["volatility"]["status"] == "Squeeze":
-        if indicator_data["trend"]["status"] == "Bullish": bullish += 0.5
-        elif indicator_data["trend"]["status"] == "Bearish": bearish += 0.5
+    bullish, bearish = get_indicator_registry().tally(indicator_data)
     
     if bullish > bearish:
         return "Strong Bullish" if bullish - bearish >= 2 else "Bullish"
@@ -938,7 +1048,8 @@ def get_trade_parameters(price, atr_val, bias, indicator_data, risk_multiple, re
             "type": "neutral"
         }
     
-    resistance, support = find_swing_points(df, lookback=30)
+    levels = indicator_data.get("swing_points")
+    resistance, support = levels if isinstance(levels, tuple) else find_swing_points(df, lookback=30)
     
     if resistance is None or support is None:
         bb_upper = indicator_data['volatility'].get('upper', price * 1.02)
@@ -1006,177 +1117,709 @@ def get_trade_parameters(price, atr_val, bias, indicator_data, risk_multiple, re
     
     return trade_params
 
-# --- DISPLAY FUNCTION ---
-def display_analysis(symbol, price, price_change, vs_currency, indicator_data, bias, risk_multiple, reward_multiple, df, show_details):
+# --- TRADE ODDS ---
+@st.cache_data(show_spinner=False, ttl=HISTORY_TTL, max_entries=256)
+def simulate_trade_odds(symbol, last_bar, direction, entry, stop, targets, triggered, _close):
+    """Monte Carlo outcome odds per target; cached per symbol, last bar and plan levels"""
+    return montecarlo.simulate_plan(
+        _close, entry, stop, targets, direction, triggered,
+        horizon=MC_HORIZON_BARS, n_paths=MC_PATHS, block=MC_BLOCK_BARS,
+    )
+
+def display_trade_odds(symbol, trade_params, atr_val, risk_multiple, reward_multiple, df):
+    """Odds table for every risk:reward choice of the current plan, the selected one marked"""
+    entry, stop = trade_params["entry_trigger"], trade_params["stop_loss"]
+    side = 1 if trade_params["direction"] == "LONG" else -1
+    choices = {label: rr for label, rr in RISK_REWARD_OPTIONS.items() if rr is not None}
+    if (risk_multiple, reward_multiple) not in choices.values():
+        choices[f"1:{reward_multiple / risk_multiple:g} (Custom)"] = (risk_multiple, reward_multiple)
+    targets = tuple(float(entry + side * 1.5 * atr_val * reward / risk) for risk, reward in choices.values())
     
-    if df is None:
-        st.error("❌ No historical data available for analysis.")
+    try:
+        odds = simulate_trade_odds(
+            symbol, df.index[-1], trade_params["direction"], float(entry), float(stop), targets,
+            bool(trade_params["trigger_hit"]), df["Close"].to_numpy(),
+        )
+    except ValueError:
         return
     
-    atr_indicator = AverageTrueRange(high=df['High'], low=df['Low'], close=df['Close'], window=14)
-    atr_val = atr_indicator.average_true_range().iloc[-1]
-    
-    trade_params = get_trade_parameters(price, atr_val, bias, indicator_data, risk_multiple, reward_multiple, df)
-    
+    bar_hours = (df.index[-1] - df.index[-2]) / pd.Timedelta(hours=1)
+    selected = (risk_multiple, reward_multiple)
+    table = pd.DataFrame({
+        "R:R": [("▶ " if rr == selected else "") + label for label, rr in choices.items()],
+        "Target": ["$" + format_price(t) for t in odds["target"]],
+        "Hit Target": odds["p_target"],
+        "Hit Stop": odds["p_stop"],
+        "Still Open": odds["p_open"],
+        "No Entry": odds["p_no_entry"],
+        "Time to Target (h)": odds["bars_to_target"] * bar_hours,
+        "Time to Stop (h)": odds["bars_to_stop"] * bar_hours,
+        "Expected R": odds["expected_r"],
+    })
+    percent = st.column_config.NumberColumn(format="percent")
+    hours = st.column_config.NumberColumn(format="%.0f")
+    st.markdown('<div class="section-header">Outcome Odds</div>', unsafe_allow_html=True)
+    st.dataframe(
+        table, hide_index=True, width="stretch",
+        column_config={
+            "Hit Target": percent, "Hit Stop": percent, "Still Open": percent, "No Entry": percent,
+            "Time to Target (h)": hours, "Time to Stop (h)": hours,
+            "Expected R": st.column_config.NumberColumn(format="%+.2f"),
+        },
+    )
+    st.caption(
+        f"{MC_PATHS:,} simulated paths over the next {MC_HORIZON_BARS * bar_hours:.0f}h, bootstrapped from the "
+        f"last {len(df)} candles. Closes only; odds describe past volatility, not a forecast."
+    )
+
+# --- DISPLAY FUNCTION ---
+# Grid order: two cards per row, the liquidity card spans the last row
+INDICATOR_CARD_ORDER = ("trend", "momentum", "volatility", "reversal", "liquidity")
+INDICATOR_CARD_FULL = "liquidity"
+INDICATOR_CARD_TITLES = {
+    "trend": "Trend — SuperTrend",
+    "momentum": "Momentum — RSI",
+    "volatility": "Volatility — Bollinger Bands",
+    "reversal": "Reversal — Parabolic SAR",
+    "liquidity": "Liquidity — Volume Profile",
+}
+
+# HTML templates, compiled once per process (render.py)
+PRICE_CARD = render.template("""
+<div class="price-card{state}">
+    <div class="price-section">
+        <div class="label">Current Price</div>
+        <div class="value">${price} <span class="currency">{currency}</span></div>
+    </div>
+    <div class="change-section">
+        <div class="label">24h Change</div>
+        <div class="change {change_class}">{change}</div>
+    </div>
+    <div>{badge}{note}</div>
+</div>
+""")
+PRICE_CARD_PENDING = render.template("""
+<div class="price-card pending"><div class="label">Current Price</div>{note}</div>
+""")
+BIAS_BADGE = render.template("""
+<span class="bias-badge{state}" style="background: {background}; color: {color}; border: 2px {line} {border};">{label}</span>
+""")
+PENDING_NOTE = render.template("""
+<span class="pending-note">⏳ updating{when}</span>
+""")
+INDICATOR_CARD = render.template("""
+<div class="{kind}{state}" style="border-left-color: {border};">
+    <div class="card-header">
+        <span class="name">{title}</span>
+        <span class="signal-badge" style="background: {badge_background}; color: {color};">{badge}</span>
+    </div>
+    <div class="value">{value}</div>
+    <div class="explanation">{explanation}</div>
+</div>
+""")
+INDICATOR_GRID = render.template("""
+<div class="section-header">Technical Indicators</div>
+<div class="indicator-grid">{cards}</div>
+""")
+TRADE_PLAN = render.template("""
+<div class="recommendation-box{state}">
+    <div class="title">📋 {title}</div>
+    <div class="content">{content}</div>
+</div>
+""")
+DEMO_NOTICE = render.template("""
+<div class="demo-notice">
+    <strong>🔒 Demo Mode</strong> — This is a demonstration of the analysis method. 
+    Exact entry, target, and stop-loss levels are available in the full version.
+</div>
+""")
+DISCLAIMER = render.template("""
+<div class="disclaimer">
+    <strong>Risk Disclaimer:</strong> This is not financial advice. All trading involves risk. 
+    Past performance doesn't guarantee future results. Only trade with money you can afford to lose.
+</div>
+""")
+
+def bias_badge_style(bias):
+    """(color, background, label) of the overall bias badge"""
     if "Bullish" in bias:
-        bias_color = "#34D399"; bias_bg = "rgba(52, 211, 153, 0.15)"; bias_text = "BULLISH"
+        return "#34D399", "rgba(52, 211, 153, 0.15)", "BULLISH"
     elif "Bearish" in bias:
-        bias_color = "#F87171"; bias_bg = "rgba(248, 113, 113, 0.15)"; bias_text = "BEARISH"
+        return "#F87171", "rgba(248, 113, 113, 0.15)", "BEARISH"
+    else:
+        return "#FBBF24", "rgba(251, 191, 36, 0.15)", "NEUTRAL"
+
+def pending_note(since):
+    """Small "pending" label, with the time of the stale value shown if there is one"""
+    when = f" · showing {datetime.datetime.fromtimestamp(since, timezone.utc).strftime('%H:%M')} UTC" if since else ""
+    return PENDING_NOTE.render(when=when)
+
+def price_card_html(price, price_change, vs_currency, bias, pending=False, bias_since=None):
+    """Price card; `bias` None renders a pending badge, `pending` greys out a stale price"""
+    if price is None:
+        return PRICE_CARD_PENDING.render(note=pending_note(None))
+    if bias is None:
+        badge = BIAS_BADGE.render(state=" pending", background="none", color="#9CA3AF", line="dashed",
+                                  border="#4B5563", label="ANALYZING")
     else:
-        bias_color = "#FBBF24"; bias_bg = "rgba(251, 191, 36, 0.15)"; bias_text = "NEUTRAL"
+        bias_color, bias_bg, bias_text = bias_badge_style(bias)
+        badge = BIAS_BADGE.render(state=" pending" if bias_since else "", background=bias_bg, color=bias_color,
+                                  line="solid", border=bias_color, label=bias_text)
+    return PRICE_CARD.render(
+        state=" pending" if pending else "",
+        price=format_price(price),
+        currency=vs_currency.upper(),
+        change_class="bullish" if price_change > 0 else "bearish",
+        change=f"{'+' if price_change > 0 else ''}{price_change:.2f}%",
+        badge=badge,
+        note=pending_note(bias_since) if bias_since or bias is None else "",
+    )
+
+def indicator_card_html(name, result, pending=False, since=None):
+    """One indicator card; `result` None is a placeholder, `pending` marks a stale result"""
+    full = name == INDICATOR_CARD_FULL
+    if result is None:
+        color, badge, value, explanation = "#4B5563", "PENDING", "Calculating…", "Waiting for market data"
+    else:
+        status, value, explanation = result["status"], result["status"], result["detail"]
+        if name == "trend":
+            color = "#34D399" if status == "Bullish" else "#F87171" if status == "Bearish" else "#FBBF24"
+            badge = status.upper()
+        elif name == "momentum":
+            color = "#F87171" if status == "Overbought" else "#34D399" if status == "Oversold" else "#FBBF24"
+            badge = status.upper()
+        elif name == "volatility":
+            color = "#F59E0B" if status == "Squeeze" else "#60A5FA"
+            badge = "🔥 SQUEEZE" if status == "Squeeze" else "NORMAL"
+            value = "Squeeze Detected" if status == "Squeeze" else result.get("regime") or "Normal Volatility"
+        elif name == "reversal":
+            color = "#F87171" if result["is_reversal"] else "#34D399" if status == "Bullish" else "#FBBF24"
+            badge = "⚠️ REVERSAL" if result["is_reversal"] else status.upper()
+            value = "Reversal Imminent" if result["is_reversal"] else status
+        else:
+            color, badge = "#A78BFA", "POC"
+    if pending:
+        explanation = f"{explanation}<br>{pending_note(since)}"
+    return INDICATOR_CARD.render(
+        kind="indicator-card-full" if full else "indicator-card",
+        state=" pending" if pending or result is None else "",
+        border="#8B5CF6" if full and result is not None else color,
+        title=INDICATOR_CARD_TITLES[name],
+        badge_background="rgba(139, 92, 246, 0.2)" if full and result is not None else f"{color}22",
+        color=color,
+        badge=badge,
+        value=value,
+        explanation=explanation,
+    )
+
+def indicator_grid_html(cards):
+    """Every indicator card as one element; `cards` maps name -> card HTML"""
+    return INDICATOR_GRID.render(cards="".join(cards[name] for name in INDICATOR_CARD_ORDER if name in cards))
+
+def get_trade_atr(indicator_data, df):
+    atr = indicator_data.get("atr_14")
+    return (atr if isinstance(atr, pd.Series) else calculate_atr_series(df, window=14)).iloc[-1]
+
+def display_analysis(symbol, price, price_change, vs_currency, indicator_data, bias, risk_multiple, reward_multiple, df, show_details):
     
-    change_sign = "+" if price_change > 0 else ""
-    change_class = "bullish" if price_change > 0 else "bearish"
+    if df is None:
+        report_candle_error(symbol)
+        return
     
     # Price Card
-    st.markdown(f"""
-    <div class="price-card">
-        <div class="price-section">
-            <div class="label">Current Price</div>
-            <div class="value">${format_price(price)} <span class="currency">{vs_currency.upper()}</span></div>
-        </div>
-        <div class="change-section">
-            <div class="label">24h Change</div>
-            <div class="change {change_class}">{change_sign}{price_change:.2f}%</div>
-        </div>
-        <div>
-            <span class="bias-badge" style="background: {bias_bg}; color: {bias_color}; border: 2px solid {bias_color};">
-                {bias_text}
-            </span>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(price_card_html(price, price_change, vs_currency, bias), unsafe_allow_html=True)
     
     # Indicator Cards - only shown if show_details is True
     if show_details:
-        st.markdown('<div class="section-header">Technical Indicators</div>', unsafe_allow_html=True)
-        
-        # Get colors for indicators
-        trend_color = "#34D399" if indicator_data["trend"]["status"] == "Bullish" else "#F87171" if indicator_data["trend"]["status"] == "Bearish" else "#FBBF24"
-        momentum_color = "#F87171" if indicator_data["momentum"]["status"] == "Overbought" else "#34D399" if indicator_data["momentum"]["status"] == "Oversold" else "#FBBF24"
-        volatility_color = "#F59E0B" if indicator_data["volatility"]["status"] == "Squeeze" else "#60A5FA"
-        reversal_color = "#F87171" if indicator_data["reversal"]["is_reversal"] else "#34D399" if indicator_data["reversal"]["status"] == "Bullish" else "#FBBF24"
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="indicator-card" style="border-left-color: {trend_color};">
-                <div class="card-header">
-                    <span class="name">Trend — SuperTrend</span>
-                    <span class="signal-badge" style="background: {trend_color}22; color: {trend_color};">{indicator_data['trend']['status'].upper()}</span>
-                </div>
-                <div class="value">{indicator_data['trend']['status']}</div>
-                <div class="explanation">{indicator_data['trend']['detail']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            squeeze_label = "🔥 SQUEEZE" if indicator_data['volatility']['status'] == "Squeeze" else "NORMAL"
-            st.markdown(f"""
-            <div class="indicator-card" style="border-left-color: {volatility_color};">
-                <div class="card-header">
-                    <span class="name">Volatility — Bollinger Bands</span>
-                    <span class="signal-badge" style="background: {volatility_color}22; color: {volatility_color};">{squeeze_label}</span>
-                </div>
-                <div class="value">{'Squeeze Detected' if indicator_data['volatility']['status'] == 'Squeeze' else 'Normal Volatility'}</div>
-                <div class="explanation">{indicator_data['volatility']['detail']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div class="indicator-card" style="border-left-color: {momentum_color};">
-                <div class="card-header">
-                    <span class="name">Momentum — RSI</span>
-                    <span class="signal-badge" style="background: {momentum_color}22; color: {momentum_color};">{indicator_data['momentum']['status'].upper()}</span>
-                </div>
-                <div class="value">{indicator_data['momentum']['status']}</div>
-                <div class="explanation">{indicator_data['momentum']['detail']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            reversal_label = "⚠️ REVERSAL" if indicator_data['reversal']['is_reversal'] else indicator_data['reversal']['status'].upper()
-            reversal_color_display = "#F87171" if indicator_data['reversal']['is_reversal'] else reversal_color
-            st.markdown(f"""
-            <div class="indicator-card" style="border-left-color: {reversal_color_display};">
-                <div class="card-header">
-                    <span class="name">Reversal — Parabolic SAR</span>
-                    <span class="signal-badge" style="background: {reversal_color_display}22; color: {reversal_color_display};">{reversal_label}</span>
-                </div>
-                <div class="value">{'Reversal Imminent' if indicator_data['reversal']['is_reversal'] else indicator_data['reversal']['status']}</div>
-                <div class="explanation">{indicator_data['reversal']['detail']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Liquidity - Full width
-        st.markdown(f"""
-        <div class="indicator-card-full">
-            <div class="card-header">
-                <span class="name">Liquidity — Volume Profile</span>
-                <span class="signal-badge" style="background: rgba(139, 92, 246, 0.2); color: #A78BFA;">POC</span>
-            </div>
-            <div class="value">{indicator_data['liquidity']['status']}</div>
-            <div class="explanation">{indicator_data['liquidity']['detail']}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        cards = {name: indicator_card_html(name, indicator_data[name]) for name in INDICATOR_CARD_ORDER}
+        st.markdown(indicator_grid_html(cards), unsafe_allow_html=True)
+    
+    return display_trade_plan(symbol, price, indicator_data, bias, risk_multiple, reward_multiple, df)
+
+def display_trade_plan(symbol, price, indicator_data, bias, risk_multiple, reward_multiple, df):
+    """Trade plan box, outcome odds and disclaimer; returns the trade parameters"""
+    atr_val = get_trade_atr(indicator_data, df)
+    trade_params = get_trade_parameters(price, atr_val, bias, indicator_data, risk_multiple, reward_multiple, df)
+    if not DEMO_MODE:
+        get_portfolio().update(symbol, trade_params)
+    current_price = f"<strong>Current Price:</strong> <span class=\"current-price-label\">${format_price(trade_params['current_price'])}</span><br>"
     
     st.divider()
     
     # Trade Plan Box
     if DEMO_MODE:
-        st.markdown(f"""
-        <div class="recommendation-box">
-            <div class="title">📋 Trade Plan</div>
-            <div class="content">
-                <strong>Current Price:</strong> <span class="current-price-label">${format_price(trade_params['current_price'])}</span><br>
-                <strong>Analysis:</strong> {trade_params['entry_label']}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        # Plan, demo notice and disclaimer go out as one element
+        plan = TRADE_PLAN.render(state="", title="Trade Plan",
+                                 content=f"{current_price}<strong>Analysis:</strong> {trade_params['entry_label']}")
+        st.markdown(plan + DEMO_NOTICE.render() + DISCLAIMER.render(), unsafe_allow_html=True)
+        return trade_params
+    
+    if trade_params["type"] != "neutral" and trade_params["type"] != "demo":
+        trigger_status = "✅ TRIGGER HIT" if trade_params["trigger_hit"] else "⏳ PENDING TRIGGER"
+        trigger_class = "trigger-hit" if trade_params["trigger_hit"] else "trigger-pending"
         
-        # Demo notice
-        st.markdown("""
-        <div class="demo-notice">
-            <strong>🔒 Demo Mode</strong> — This is a demonstration of the analysis method. 
-            Exact entry, target, and stop-loss levels are available in the full version.
-        </div>
-        """, unsafe_allow_html=True)
+        position = get_portfolio().position(symbol)
+        size = ""
+        if position is not None:
+            size = (f"<strong>Position Size:</strong> {position['units']:,.4g} {symbol} (${position['notional']:,.0f}), "
+                    f"risking ${position['risk']:,.0f} ({position['risk_pct']:.2%} of equity)<br>")
+        
+        st.markdown(TRADE_PLAN.render(state="", title=trade_params["title"], content=(
+            f"{current_price}"
+            f"<strong>Entry Trigger:</strong> <span class=\"{trigger_class}\">{trade_params['entry_label']}</span> — {trigger_status}<br>"
+            f"<strong>Stop Loss:</strong> ${format_price(trade_params['stop_loss'])}<br>"
+            f"<strong>Target:</strong> ${format_price(trade_params['target'])}<br>"
+            f"{size}"
+            f"<strong>Strategy:</strong> {trade_params['strategy']}"
+        )), unsafe_allow_html=True)
+        
+        display_trade_odds(symbol, trade_params, atr_val, risk_multiple, reward_multiple, df)
+        st.markdown(DISCLAIMER.render(), unsafe_allow_html=True)
     else:
-        if trade_params["type"] != "neutral" and trade_params["type"] != "demo":
-            trigger_status = "✅ TRIGGER HIT" if trade_params["trigger_hit"] else "⏳ PENDING TRIGGER"
-            trigger_class = "trigger-hit" if trade_params["trigger_hit"] else "trigger-pending"
-            
-            st.markdown(f"""
-            <div class="recommendation-box">
-                <div class="title">📋 {trade_params['title']}</div>
-                <div class="content">
-                    <strong>Current Price:</strong> <span class="current-price-label">${format_price(trade_params['current_price'])}</span><br>
-                    <strong>Entry Trigger:</strong> <span class="{trigger_class}">{trade_params['entry_label']}</span> — {trigger_status}<br>
-                    <strong>Stop Loss:</strong> ${format_price(trade_params['stop_loss'])}<br>
-                    <strong>Target:</strong> ${format_price(trade_params['target'])}<br>
-                    <strong>Strategy:</strong> {trade_params['strategy']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(TRADE_PLAN.render(state="", title=trade_params["title"], content=(
+            f"{current_price}<strong>Strategy:</strong> {trade_params['strategy']}"
+        )) + DISCLAIMER.render(), unsafe_allow_html=True)
+    
+    return trade_params
+
+# --- PROGRESSIVE RENDERING ---
+@st.cache_resource(show_spinner=False, on_release=lambda pool: pool.shutdown(wait=False))
+def get_render_executor():
+    """Fetch and indicator jobs of budgeted reruns; a job keeps running after its rerun moves on"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="render")
+
+@st.cache_resource(show_spinner=False)
+def get_last_good():
+    """Last good price, indicator results and bias per symbol, shown while fresh ones are pending"""
+    return progressive.LastGood()
+
+def price_job(symbol, last_good):
+    price, price_change = get_asset_price(symbol)
+    if price is not None:
+        last_good.put(("price", symbol), (price, price_change))
+    return price, price_change
+
+def analysis_job(symbol, feed, last_good):
+    """Candles, then each indicator as it finishes, then the bias; every step goes to `feed` and `last_good`"""
+    def on_result(name, result):
+        last_good.put(("indicator", symbol, name), result)
+        feed.put("indicator", name, result)
+    
+    indicator_data = None
+    try:
+        df = get_historical_data(symbol, days=30)
+        feed.put("candles", df)
+        if df is not None:
+            indicator_data = calculate_all_indicators(symbol, df, on_result=on_result)
+            last_good.put(("bias", symbol), determine_overall_bias(indicator_data))
+    finally:
+        feed.put("done", indicator_data)
+    return indicator_data
+
+@st.fragment(run_every=PENDING_POLL_S)
+def await_pending(jobs):
+    """Rerun the page, without a budget, once the jobs that missed this rerun's budget are done"""
+    if all(job.done() for job in jobs):
+        st.session_state["render_budget_waived"] = True
+        st.rerun(scope="app")
+
+def display_analysis_progressive(symbol, vs_currency, risk_multiple, reward_multiple, show_details, session_name, show_chart):
+    """Render each part as soon as its data is ready; parts that miss RENDER_BUDGET_S show their last good value as pending"""
+    waived = st.session_state.pop("render_budget_waived", False)
+    budget = progressive.Budget(None if waived else RENDER_BUDGET_S)
+    pool, last_good, feed = get_render_executor(), get_last_good(), progressive.Feed()
+    jobs = (pool.submit(price_job, symbol, last_good), pool.submit(analysis_job, symbol, feed, last_good))
+    
+    price_slot = st.empty()
+    cards_slot = st.empty() if show_details else None
+    
+    price_ready, quote = progressive.wait(jobs[0], budget)
+    price, price_change = quote or (None, None)
+    if price_ready and price is None:
+        price_slot.error(f"❌ Unable to fetch price data for {symbol}. Please check the ticker symbol and try again.")
+        return
+    if not price_ready:
+        price, price_change = last_good.get(("price", symbol))[0] or (None, None)
+    
+    fresh = {}
+    def paint(bias, bias_since=None):
+        price_slot.markdown(price_card_html(price, price_change, vs_currency, bias, pending=not price_ready,
+                                            bias_since=bias_since), unsafe_allow_html=True)
+        if cards_slot is None:
+            return
+        cards = {}
+        for name in INDICATOR_CARD_ORDER:
+            if name in fresh:
+                cards[name] = indicator_card_html(name, fresh[name])
+            else:
+                stale, since = last_good.get(("indicator", symbol, name))
+                cards[name] = indicator_card_html(name, stale, pending=True, since=since)
+        cards_slot.markdown(indicator_grid_html(cards), unsafe_allow_html=True)
+    
+    # Results arriving within REPAINT_S of each other share one repaint instead of one element update each
+    df, indicator_data, changed, painted_at = None, None, True, budget.elapsed()
+    while not budget.expired():
+        event = feed.get(budget.timeout(painted_at + REPAINT_S - budget.elapsed() if changed else None))
+        if event is None:
+            if changed and not budget.expired():
+                paint(*last_good.get(("bias", symbol)))
+                changed, painted_at = False, budget.elapsed()
+            continue
+        if event[0] == "candles":
+            df = event[1]
+        elif event[0] == "indicator":
+            fresh[event[1]] = event[2]
+            changed = True
         else:
-            st.markdown(f"""
-            <div class="recommendation-box">
-                <div class="title">📋 {trade_params['title']}</div>
-                <div class="content">
-                    <strong>Current Price:</strong> <span class="current-price-label">${format_price(trade_params['current_price'])}</span><br>
-                    <strong>Strategy:</strong> {trade_params['strategy']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-    
-    # Disclaimer
-    st.markdown("""
-    <div class="disclaimer">
-        <strong>Risk Disclaimer:</strong> This is not financial advice. All trading involves risk. 
-        Past performance doesn't guarantee future results. Only trade with money you can afford to lose.
+            indicator_data = event[1]
+            if indicator_data is None:
+                price_slot.empty()
+                report_candle_error(symbol)
+                return
+            break
+    
+    if price_ready and indicator_data is not None:
+        bias = determine_overall_bias(indicator_data)
+        paint(bias)
+        trade_params = display_trade_plan(symbol, price, indicator_data, bias, risk_multiple, reward_multiple, df)
+        record_signal(symbol, price, df, indicator_data, bias, trade_params)
+        report_candle_error(symbol, have_data=True)
+        display_session_activity(symbol, session_name)
+        if show_chart:
+            display_price_chart(symbol, indicator_data)
+        return
+    
+    paint(*last_good.get(("bias", symbol)))
+    waiting = "live price" if not price_ready else "market data" if df is None else "indicators"
+    st.divider()
+    st.markdown(TRADE_PLAN.render(state=" pending", title="Trade Plan",
+                                  content=f"Waiting for {waiting}; the plan appears as soon as it arrives."),
+                unsafe_allow_html=True)
+    await_pending(jobs)
+
+# --- SESSION SEASONALITY ---
+@st.cache_data(show_spinner=False, ttl=HISTORY_TTL, max_entries=64)
+def get_session_profile(symbol, last_ts, bars, _store):
+    """Session and hour-of-week activity profile, cached per symbol and history"""
+    return sessions.session_profile(_store, sessions.session_table(get_session_info))
+
+def display_session_activity(symbol, session_name, store=None):
+    """Sidebar card: how busy the current session usually is for this symbol (from `store` when given)"""
+    store = store if store is not None else chart_history(symbol)
+    if store is None or len(store) < 3:
+        return
+    profile = get_session_profile(symbol, int(store.timestamps[-1]), len(store), store)
+    if profile is None or session_name not in profile["sessions"].index:
+        return
+    
+    row = profile["sessions"].loc[session_name]
+    activity = row["range_rel"]
+    color = "#34D399" if activity >= 1.1 else "#FBBF24" if activity <= 0.9 else "#22D3EE"
+    verdict = "busier than" if activity >= 1.1 else "quieter than" if activity <= 0.9 else "about as busy as"
+    volume = f" · {row['volume_rel']:.2f}× volume" if np.isfinite(row["volume_rel"]) else ""
+    st.sidebar.markdown(f"""
+    <div class='sidebar-item'>
+        <b>Typical Session Activity ({symbol})</b><br>
+        <span style='font-size: 20px; color: {color}; font-weight: 700;'>{activity:.2f}× range</span>{volume}<br>
+        {session_name} is usually {verdict} the average hour
+        ({profile['days']:.0f} days of {profile['interval_hours']:g}h candles)
     </div>
     """, unsafe_allow_html=True)
 
+# --- SIGNAL HISTORY ---
+@st.cache_resource(show_spinner=False, on_release=lambda store: store.close())
+def get_signal_store(path):
+    """Process-wide signal log; appends are queued and committed by its writer thread"""
+    return signals.SignalStore(path)
+
+def record_signal(symbol, price, df, indicator_data, bias, trade_params):
+    """Queue this rerun's snapshot for the signal history without touching disk"""
+    if not SIGNAL_DB:
+        return
+    try:
+        store = get_signal_store(SIGNAL_DB)
+    except (OSError, sqlite3.Error):
+        return
+    store.append(signals.snapshot(symbol, price, df.index[-1], indicator_data, bias, trade_params))
+
+# --- ANALYSIS SNAPSHOTS ---
+@st.cache_resource(show_spinner=False)
+def get_snapshot_store(path):
+    """Process-wide snapshot store; the latest snapshot per symbol is also kept in memory"""
+    return snapshots.SnapshotStore(path, keep=SNAPSHOT_KEEP)
+
+def materialize_analysis(symbol):
+    """Price, candles, indicators, bias and trade plan for one symbol, as the worker stores them"""
+    price, price_change = get_asset_price(symbol)
+    store = get_candles(symbol, days=30) if price is not None else None
+    if store is None:
+        return None
+    df = store.to_frame()
+    indicator_data = calculate_all_indicators(symbol, df)
+    bias = determine_overall_bias(indicator_data)
+    risk_multiple, reward_multiple = RISK_REWARD_OPTIONS[SNAPSHOT_RISK_REWARD]
+    trade_params = get_trade_parameters(price, get_trade_atr(indicator_data, df), bias, indicator_data,
+                                        risk_multiple, reward_multiple, df)
+    return {"price": price, "price_change": price_change, "candles": store, "indicator_data": indicator_data,
+            "bias": bias, "trade_params": trade_params, "bar_ts": df.index[-1]}
+
+@st.cache_resource(show_spinner=False, on_release=lambda worker: worker.stop())
+def get_snapshot_worker(path, symbols):
+    """Process-wide worker re-materializing `symbols` every SNAPSHOT_INTERVAL_S"""
+    return snapshots.SnapshotWorker(get_snapshot_store(path), symbols, materialize_analysis,
+                                    interval=SNAPSHOT_INTERVAL_S).start()
+
+def start_snapshot_worker():
+    """Make sure the worker runs from the first page load on, whatever is viewed"""
+    if not SNAPSHOT_DB or not SNAPSHOT_SYMBOLS:
+        return
+    try:
+        get_snapshot_worker(SNAPSHOT_DB, tuple(SNAPSHOT_SYMBOLS))
+    except (OSError, sqlite3.Error):
+        pass
+
+def get_analysis_snapshot(symbol):
+    """Latest snapshot of `symbol` young enough to show, None to compute on demand"""
+    if not SNAPSHOT_DB or symbol not in SNAPSHOT_SYMBOLS:
+        return None
+    try:
+        return get_snapshot_store(SNAPSHOT_DB).latest(symbol, max_age=SNAPSHOT_MAX_AGE_S)
+    except (OSError, sqlite3.Error):
+        return None
+
+def display_snapshot(snapshot, vs_currency, risk_multiple, reward_multiple, show_details, session_name, show_chart):
+    """The page from a worker snapshot, without fetching or computing anything"""
+    symbol, indicator_data, bias = snapshot["symbol"], snapshot["indicator_data"], snapshot["bias"]
+    df = snapshot["candles"].to_frame()
+    trade_params = display_analysis(symbol, snapshot["price"], snapshot["price_change"], vs_currency,
+                                    indicator_data, bias, risk_multiple, reward_multiple, df, show_details)
+    written = datetime.datetime.fromtimestamp(snapshot["created"], timezone.utc)
+    st.caption(f"Analysis as of {written:%H:%M:%S} UTC (snapshot v{snapshot['version']}, "
+               f"refreshed every {SNAPSHOT_INTERVAL_S:.0f}s)")
+    record_signal(symbol, snapshot["price"], df, indicator_data, bias, trade_params)
+    display_session_activity(symbol, session_name, store=snapshot["candles"])
+    if show_chart:
+        display_price_chart(symbol, indicator_data)
+
+# --- MARKET CORRELATION VIEW ---
+@st.cache_resource(show_spinner=False)
+def get_correlation_tracker(universe, window):
+    """One tracker per universe, shared by all sessions and synced incrementally each rerun"""
+    return correlation.RollingCorrelation(universe, window=window, benchmark="BTC")
+
+def display_market_correlation(universe, days=30):
+    frames = {}
+    for sym in universe:
+        store = get_candles(sym, days)
+        if store is not None:
+            frames[sym] = store
+    
+    if len(frames) < 2:
+        st.info("Not enough market data for the correlation view.")
+        return
+    
+    aligned = batch_indicators.align_ohlcv(frames)
+    tracker = get_correlation_tracker(tuple(frames), CORRELATION_WINDOW)
+    tracker.sync(aligned)
+    snapshot = tracker.snapshot()
+    atr = batch_indicators.batch_atr(aligned["High"], aligned["Low"], aligned["Close"], window=14)
+    regimes = regime.latest_regimes(aligned["Close"], atr, aligned["symbols"])
+    ranking = snapshot["ranking"].assign(Regime=[regime.label(regimes.at[sym, "volatility"], regimes.at[sym, "trend"])
+                                                 for sym in snapshot["ranking"].index])
+    
+    st.markdown('<div class="section-header">Market Correlation & Relative Strength</div>', unsafe_allow_html=True)
+    
+    history = [value for _, value in snapshot["history"]]
+    mean_corr = snapshot["mean_correlation"]
+    delta = None
+    if len(history) > CORRELATION_WINDOW:
+        delta = f"{mean_corr - history[-CORRELATION_WINDOW - 1]:+.2f} vs {CORRELATION_WINDOW} bars ago"
+    st.metric("Average Pairwise Correlation", f"{mean_corr:.2f}", delta=delta)
+    
+    col_rank, col_corr = st.columns(2)
+    with col_rank:
+        st.dataframe(ranking.style.format(precision=2), width="stretch")
+    with col_corr:
+        st.dataframe(snapshot["correlation"].style.format(precision=2), width="stretch")
+
+# --- PRICE CHART ---
+@st.cache_resource(show_spinner=False)
+def get_chart_cache():
+    """Downsampled chart data per symbol, last bar and zoom level, shared by every session"""
+    return chart.ChartCache()
+
+def chart_history(symbol):
+    """Candles for the chart: the archived series when it reaches further back than the live fetch"""
+    store = get_candles(symbol, 30)
+    if ARCHIVE_DIR and store is not None:
+        try:
+            archived = archive.CandleArchive(ARCHIVE_DIR).open(symbol, archive.infer_interval(store.timestamps))
+        except OSError:
+            archived = None
+        if archived is not None and len(archived) > len(store):
+            return archived
+    return store
+
+def chart_overlays(store):
+    """SuperTrend, Bollinger and PSAR series over the whole history"""
+    arrays = batch_indicators.compute_batch_arrays(batch_indicators.align_ohlcv({"chart": store}))
+    overlays = {key: arrays[key][:, 0] for key in ("supertrend", "supertrend_dir", "bb_upper", "bb_middle", "bb_lower", "psar")}
+    with np.errstate(invalid="ignore"):
+        overlays["psar_up"] = overlays["psar"] < np.asarray(store.close, dtype=float)
+    return overlays
+
+def display_price_chart(symbol, indicator_data):
+    store = chart_history(symbol)
+    if store is None or len(store) < 2:
+        st.info("Not enough history for the price chart.")
+        return
+    
+    st.markdown('<div class="section-header">Price Chart</div>', unsafe_allow_html=True)
+    zoom = st.segmented_control("Chart Range", list(CHART_RANGES), default="1M", key="chart_range") or "1M"
+    
+    cache = get_chart_cache()
+    timestamps = store.timestamps
+    last_ts = int(timestamps[-1])
+    overlays = cache.get(("overlays", symbol, len(store), last_ts), lambda: chart_overlays(store))
+    
+    days = CHART_RANGES[zoom]
+    lo = 0 if days is None else int(np.searchsorted(timestamps, last_ts - days * 86_400_000, side="left"))
+    data = cache.get(
+        ("view", symbol, len(store), last_ts, zoom, CHART_MAX_POINTS),
+        lambda: chart.downsample(
+            timestamps[lo:], [store[field][lo:] for field in ("Open", "High", "Low", "Close")],
+            {key: values[lo:] for key, values in overlays.items()}, CHART_MAX_POINTS,
+        ),
+    )
+    
+    liquidity = indicator_data["liquidity"]
+    poc = liquidity["value"] if liquidity["status"] == "Volume Profile" and not DEMO_MODE else None
+    st.altair_chart(chart.price_chart(data, poc), width="stretch")
+
+# --- PORTFOLIO ---
+def get_portfolio():
+    """This session's sized plans, following the sidebar's account inputs; each plan it computes is tracked"""
+    book = st.session_state.get("portfolio")
+    if book is None:
+        book = st.session_state["portfolio"] = portfolio.Portfolio(
+            ACCOUNT_EQUITY, RISK_PER_TRADE_PCT / 100, PORTFOLIO_MAX_POSITION
+        )
+    book.set_account(st.session_state.get("account_equity", ACCOUNT_EQUITY),
+                     st.session_state.get("risk_per_trade", RISK_PER_TRADE_PCT) / 100)
+    return book
+
+@st.cache_data(show_spinner=False, ttl=HISTORY_TTL, max_entries=64)
+def get_portfolio_covariance(symbols, last_bars, _stores):
+    """Return covariance of the plan symbols, cached per symbol set and latest bars"""
+    return portfolio.returns_covariance(batch_indicators.align_ohlcv(_stores), PORTFOLIO_WINDOW)
+
+def display_portfolio():
+    """Sized positions of every active plan in this session, with combined exposure and correlated risk"""
+    st.markdown('<div class="section-header">Portfolio Risk</div>', unsafe_allow_html=True)
+    if DEMO_MODE:
+        st.info("Position sizing and portfolio risk are part of the full version.")
+        return
+    
+    book = get_portfolio()
+    if not len(book):
+        st.info("No active trade plans yet. Each LONG or SHORT plan you look at is sized and added here.")
+        return
+    
+    stores = {symbol: get_candles(symbol, 30) for symbol in book.positions().index}
+    stores = {symbol: store for symbol, store in stores.items() if store is not None}
+    if stores:
+        key = (tuple(stores), tuple(int(store.timestamps[-1]) for store in stores.values()))
+        if st.session_state.get("portfolio_covariance") != key:
+            book.set_covariance(list(stores), get_portfolio_covariance(*key, stores))
+            st.session_state["portfolio_covariance"] = key
+    
+    summary = book.summary()
+    col_gross, col_net, col_risk, col_corr, col_var = st.columns(5)
+    col_gross.metric("Gross Exposure", f"${summary['gross_exposure']:,.0f}", f"{summary['gross_exposure_pct']:.0%} of equity",
+                     delta_color="off")
+    net = summary["net_exposure"]
+    col_net.metric("Net Exposure", f"{'-' if net < 0 else ''}${abs(net):,.0f}", f"{summary['net_exposure_pct']:+.0%} of equity",
+                   delta_color="off")
+    col_risk.metric("Risk if All Stops Hit", f"${summary['total_risk']:,.0f}", f"{summary['total_risk_pct']:.1%} of equity",
+                    delta_color="off")
+    col_corr.metric("Correlated Risk", f"${summary['correlated_risk']:,.0f}", f"{summary['correlated_risk_pct']:.1%} of equity",
+                    delta_color="off", help="√(sᵀ ρ s) over the signed stop risks s: correlated plans add up, opposite sides offset")
+    col_var.metric("95% VaR per Bar", f"${summary['var_95']:,.0f}", f"{summary['var_95_pct']:.1%} of equity",
+                   delta_color="off", help=f"Normal 95% loss over one bar from the last {PORTFOLIO_WINDOW} bars of returns")
+    st.dataframe(book.positions().style.format({
+        "Entry": format_price, "Stop": format_price, "Units": "{:,.4g}", "Notional $": "{:,.0f}",
+        "Risk $": "{:,.0f}", "Risk %": "{:.2f}",
+    }), width="stretch")
+    st.caption(f"{summary['plans']} plans · ${summary['equity']:,.0f} equity · {summary['risk_per_trade']:.2%} risk per trade · "
+               f"positions capped at {PORTFOLIO_MAX_POSITION:g}× equity")
+
+# --- ORDER BOOK HEATMAP ---
+@st.cache_resource(show_spinner=False, max_entries=DEPTH_FEEDS, on_release=lambda feed: feed.stop())
+def get_depth_feed(pair):
+    """Process-wide depth feed per pair; each keeps a live book and a fixed-size history"""
+    return orderbook.DepthFeed(
+        pair, EXCHANGE_API_BASE, DEPTH_STREAM_BASE, interval=DEPTH_INTERVAL_S,
+        capacity=DEPTH_HISTORY, bins=DEPTH_BINS, span=DEPTH_SPAN,
+    ).start()
+
+@st.fragment(run_every=HEATMAP_REFRESH_S)
+def display_order_book(symbol):
+    """Resting liquidity around the mid over time, redrawn in place from the live depth feed"""
+    if orderbook.connect is None:
+        st.info("The order book heatmap needs the `websockets` package: `pip install websockets`.")
+        return
+    pair = datasources.ExchangeSource(EXCHANGE_API_BASE).pair(symbol)
+    state = get_depth_feed(pair).snapshot()
+    
+    st.markdown('<div class="section-header">Order Book Liquidity</div>', unsafe_allow_html=True)
+    if not len(state["times"]):
+        reason = f" ({state['error']})" if state["error"] else ""
+        st.info(f"Waiting for the {pair} order book: {state['status']}{reason}")
+        return
+    
+    latest, half = state["notional"][-1], DEPTH_BINS // 2
+    bids, asks = float(latest[:half].sum()), float(latest[half:].sum())
+    col_bid, col_ask, col_imb = st.columns(3)
+    col_bid.metric(f"Bids within {DEPTH_SPAN:.0%}", f"${bids:,.0f}")
+    col_ask.metric(f"Asks within {DEPTH_SPAN:.0%}", f"${asks:,.0f}")
+    col_imb.metric("Imbalance", f"{(bids - asks) / (bids + asks):+.0%}" if bids + asks else "n/a",
+                   help="(bids − asks) / (bids + asks); positive means more resting demand than supply near the price")
+    
+    cells, mids = orderbook.heatmap_frames(state, HEATMAP_COLUMNS)
+    st.altair_chart(chart.liquidity_heatmap(cells, mids), width="stretch")
+    st.caption(f"{pair} · {state['status']} · {state['rate']:.0f} updates/s · {state['levels']:,} levels · "
+               f"{len(state['times'])} snapshots, one per {DEPTH_INTERVAL_S:g}s")
+
+# --- TICKER AUTOCOMPLETE ---
+def use_ticker_suggestion():
+    """Copy the clicked suggestion into the ticker input"""
+    choice = st.session_state.get("ticker_suggestion")
+    if choice:
+        st.session_state["ticker_input"] = choice
+    st.session_state["ticker_suggestion"] = None
+
+def display_ticker_suggestions(query):
+    """Which coin a known ticker means (collisions ranked) and prefix matches for other tickers"""
+    index = get_symbol_index() if query else None
+    if index is None:
+        return
+    
+    candidates = index.candidates(query)
+    if candidates:
+        best, others = candidates[0], len(candidates) - 1
+        shared = f" · {others} other coin{'s' if others > 1 else ''} use{'' if others > 1 else 's'} this ticker" if others else ""
+        st.caption(f"{best['symbol']} → {best['name']} ({best['id']}){shared}")
+    
+    matches = {}
+    for coin in index.complete(query):
+        if coin["symbol"] != query.strip().upper():
+            matches.setdefault(coin["symbol"], coin["name"])
+    if matches:
+        st.pills(
+            "Suggestions", list(matches), format_func=lambda ticker: f"{ticker} · {matches[ticker]}",
+            key="ticker_suggestion", on_change=use_ticker_suggestion,
+        )
+
 # --- SIDEBAR ---
 utc_now = datetime.datetime.now(timezone.utc)
 session_name = get_session_info(utc_now)
@@ -1225,8 +1868,15 @@ st.sidebar.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+if not DEMO_MODE:
+    st.sidebar.markdown("<p class='sidebar-title'>💼 Account</p>", unsafe_allow_html=True)
+    st.sidebar.number_input("Account Equity ($)", min_value=100.0, value=ACCOUNT_EQUITY, step=1000.0, key="account_equity")
+    st.sidebar.number_input("Risk per Trade (%)", min_value=0.05, max_value=10.0, value=RISK_PER_TRADE_PCT, step=0.25,
+                            key="risk_per_trade")
+
 # --- MAIN ---
 st.markdown('<div class="main-title">📊 Crypto Market Analyzer</div>', unsafe_allow_html=True)
+start_snapshot_worker()
 
 col1, col2, col3 = st.columns([1.5, 2.5, 1.5])
 
@@ -1244,15 +1894,21 @@ with col2:
             help="Demo mode: BTC, ETH, SOL available"
         )
     else:
-        # Full mode: text input
+        # Full mode: text input with suggestions from the symbol index
         user_input = st.text_input(
             "Enter Cryptocurrency Ticker",
             placeholder="e.g., BTC, ETH, SOL, ADA, DOGE",
-            label_visibility="visible"
+            label_visibility="visible",
+            key="ticker_input"
         )
+        display_ticker_suggestions(user_input)
 
 with col3:
     show_indicator_details = st.checkbox("Show Indicator Details", value=False)
+    show_market_correlation = st.checkbox("Show Market Correlation", value=False)
+    show_price_chart = st.checkbox("Show Price Chart", value=False)
+    show_order_book = st.checkbox("Show Order Book Heatmap", value=False)
+    show_portfolio = st.checkbox("Show Portfolio Risk", value=False)
 
 st.markdown("<div style='margin-top: 15px;'></div>", unsafe_allow_html=True)
 col_rr1, col_rr2, col_rr3 = st.columns([2, 2, 2])
@@ -1292,21 +1948,50 @@ if user_input:
     if DEMO_MODE and symbol not in ['BTC', 'ETH', 'SOL']:
         st.warning("⚠️ Demo mode only supports BTC, ETH, and SOL. Please select one of these.")
     else:
-        with st.spinner(f"Fetching live data for {symbol} from CoinGecko..."):
-            price, price_change = get_asset_price(symbol)
-            
-            if price is not None:
-                df = get_historical_data(symbol, days=30)
+        snapshot = get_analysis_snapshot(symbol)
+        if snapshot is not None:
+            display_snapshot(snapshot, vs_currency, RISK_MULTIPLE, REWARD_MULTIPLE, show_indicator_details,
+                             session_name, show_price_chart)
+        elif RENDER_BUDGET_S > 0:
+            display_analysis_progressive(
+                symbol, vs_currency, RISK_MULTIPLE, REWARD_MULTIPLE,
+                show_indicator_details, session_name, show_price_chart
+            )
+        else:
+            with st.spinner(f"Fetching live data for {symbol} from CoinGecko..."):
+                price, price_change = get_asset_price(symbol)
                 
-                if df is not None:
-                    indicator_data = calculate_all_indicators(symbol, df)
-                    bias = determine_overall_bias(indicator_data)
+                if price is not None:
+                    df = get_historical_data(symbol, days=30)
                     
-                    display_analysis(
-                        symbol, price, price_change, vs_currency,
-                        indicator_data, bias, RISK_MULTIPLE, REWARD_MULTIPLE, df, show_indicator_details
-                    )
+                    if df is not None:
+                        indicator_data = calculate_all_indicators(symbol, df)
+                        bias = determine_overall_bias(indicator_data)
+                        
+                        trade_params = display_analysis(
+                            symbol, price, price_change, vs_currency,
+                            indicator_data, bias, RISK_MULTIPLE, REWARD_MULTIPLE, df, show_indicator_details
+                        )
+                        record_signal(symbol, price, df, indicator_data, bias, trade_params)
+                        report_candle_error(symbol, have_data=True)
+                        display_session_activity(symbol, session_name)
+                        
+                        if show_price_chart:
+                            display_price_chart(symbol, indicator_data)
+                    else:
+                        report_candle_error(symbol)
                 else:
-                    st.error("❌ Unable to fetch historical data. Please try again.")
-            else:
-                st.error(f"❌ Unable to fetch price data for {symbol}. Please check the ticker symbol and try again.")
+                    st.error(f"❌ Unable to fetch price data for {symbol}. Please check the ticker symbol and try again.")
+        
+        if show_order_book:
+            st.divider()
+            display_order_book(symbol)
+
+if show_portfolio:
+    st.divider()
+    display_portfolio()
+
+if show_market_correlation:
+    st.divider()
+    with st.spinner("Updating market correlation..."):
+        display_market_correlation(CORRELATION_UNIVERSE)
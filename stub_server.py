@@ -0,0 +1,511 @@
+"""Local stand-in for the CoinGecko endpoints the dashboard uses.
+
+Serves `/api/v3/simple/price`, `/api/v3/coins/{id}/ohlc`,
+`/api/v3/coins/{id}/market_chart` and `/api/v3/coins/list` either from
+deterministic synthetic data (seeded per coin id) or from fixtures recorded
+with replay.py. Point the app
+at it with `CG_API_BASE = "http://127.0.0.1:<port>/api/v3"`.
+
+The exchange-style `/api/v3/klines` and `/api/v3/ticker/24hr` endpoints are
+served from the same synthetic series (`BTCUSDT` -> bitcoin), so the
+exchange data source can be pointed at the stub too
+(`EXCHANGE_API_BASE`). Its candles match the CoinGecko OHLC bar for bar.
+Volume is on each provider's own scale: `total_volumes` samples are rolling
+24h sums, as CoinGecko's are, and klines carry each bar's quote volume.
+
+`--drop-rate` and `--duplicate-rate` leave candles out of OHLC responses or
+send them twice, to exercise the integrity checks and backfill.
+`--slow ENDPOINT=MS` adds latency to one endpoint only (e.g.
+`--slow market_chart=3000` for a slow volume fetch).
+
+`/api/v3/depth` serves an order-book snapshot of a synthetic book that
+drifts with every update. With `--depth-rate N` the stub also runs an
+exchange-style websocket diff stream (`ws://.../ws/btcusdt@depth`). It
+sends N diffs per second, and their update ids continue from the
+snapshots, so `orderbook.DepthFeed` can be pointed at it.
+
+Every request is counted per endpoint so load tests can report how much
+upstream traffic the app's caching lets through.
+"""
+import argparse
+import gzip
+import json
+import math
+import queue
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import replay
+
+try:
+    from websockets.exceptions import ConnectionClosed
+    from websockets.sync.server import serve as serve_websocket
+except ImportError:
+    serve_websocket = None
+
+# Synthetic series end at a fixed instant so runs are reproducible
+STUB_END_MS = 1717200000000  # 2024-06-01 00:00 UTC
+STUB_BASE_PRICES = {'bitcoin': 65000.0, 'ethereum': 3500.0, 'solana': 160.0}
+MAX_STUB_DAYS = 365
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+FINE_STEP_MS = 5 * MINUTE_MS
+KLINE_INTERVALS = {"30m": 30 * MINUTE_MS, "1h": HOUR_MS, "4h": 4 * HOUR_MS, "1d": DAY_MS}
+DEPTH_TICKS = 2000  # synthetic book levels reach this many ticks either side of the mid
+DEPTH_SUBSCRIBER_QUEUE = 10000  # diffs buffered per stream client before it is dropped as too slow
+EXCHANGE_SYMBOLS = {'BTC': 'bitcoin', 'ETH': 'ethereum', 'SOL': 'solana'}
+# Real coins plus the kind of ticker collisions /coins/list is full of
+STUB_COINS = [
+    ("bitcoin", "btc", "Bitcoin"), ("ethereum", "eth", "Ethereum"), ("solana", "sol", "Solana"),
+    ("avalanche-2", "avax", "Avalanche"), ("cardano", "ada", "Cardano"), ("dogecoin", "doge", "Dogecoin"),
+    ("wrapped-bitcoin", "wbtc", "Wrapped Bitcoin"), ("ethereum-wormhole", "eth", "Ethereum (Wormhole)"),
+    ("bridged-ether-starkgate", "eth", "Bridged Ether (StarkGate)"), ("sol-wormhole", "sol", "Solana (Wormhole)"),
+    ("solana-old", "sol", "Solana [OLD]"), ("binance-peg-avalanche", "avax", "Binance-Peg Avalanche Token"),
+]
+
+
+def _chart_step_ms(days):
+    """market_chart granularity: 5-minute for 1 day, hourly up to 90 days, daily beyond"""
+    if days <= 1:
+        return 5 * MINUTE_MS
+    if days <= 90:
+        return HOUR_MS
+    return DAY_MS
+
+
+def _ohlc_step_ms(days):
+    """OHLC candle size: 30 minutes for 1-2 days, 4 hours up to 30 days, 4 days beyond"""
+    if days <= 2:
+        return 30 * MINUTE_MS
+    if days <= 30:
+        return 4 * HOUR_MS
+    return 4 * DAY_MS
+
+
+@lru_cache(maxsize=64)
+def _fine_series(coin_id):
+    """Deterministic 5-minute prices and volumes covering MAX_STUB_DAYS, ending at STUB_END_MS"""
+    n = MAX_STUB_DAYS * DAY_MS // FINE_STEP_MS + 1
+    rng = np.random.default_rng(zlib.crc32(coin_id.encode()))
+    base = STUB_BASE_PRICES.get(coin_id, 1.0 + zlib.crc32(coin_id.encode()) % 500)
+    log_path = np.cumsum(rng.normal(0.0, 0.002, n))
+    prices = base * np.exp(log_path - log_path[-1])
+    volumes = rng.lognormal(np.log(base * 1e3), 0.5, n)
+    timestamps = STUB_END_MS - FINE_STEP_MS * np.arange(n - 1, -1, -1, dtype=np.int64)
+    return timestamps, prices, np.cumsum(volumes)
+
+
+def _sample_points(days, step_ms):
+    """Indices into the fine series for bars ending every step_ms over the last `days`"""
+    n = MAX_STUB_DAYS * DAY_MS // FINE_STEP_MS + 1
+    stride = step_ms // FINE_STEP_MS
+    count = int(min(days, MAX_STUB_DAYS - 1) * DAY_MS // step_ms)
+    return (n - 1) - stride * np.arange(count, -1, -1), stride
+
+
+def synthetic_market_chart(coin_id, days):
+    timestamps, prices, cum_volume = _fine_series(coin_id)
+    idx, _ = _sample_points(days, _chart_step_ms(days))
+    volumes = cum_volume[idx] - cum_volume[idx - DAY_MS // FINE_STEP_MS]  # rolling 24h, like CoinGecko
+    ts = timestamps[idx].tolist()
+    return {
+        "prices": [[t, p] for t, p in zip(ts, prices[idx].tolist())],
+        "market_caps": [[t, p * 2e7] for t, p in zip(ts, prices[idx].tolist())],
+        "total_volumes": [[t, v] for t, v in zip(ts, volumes.tolist())],
+    }
+
+
+def synthetic_ohlc(coin_id, days):
+    timestamps, prices, _ = _fine_series(coin_id)
+    idx, stride = _sample_points(days, _ohlc_step_ms(days))
+    windows = prices[idx[:, None] - np.arange(stride, -1, -1)[None, :]]
+    return [
+        [t, o, h, l, c]
+        for t, o, h, l, c in zip(
+            timestamps[idx].tolist(), windows[:, 0].tolist(), windows.max(axis=1).tolist(),
+            windows.min(axis=1).tolist(), windows[:, -1].tolist(),
+        )
+    ]
+
+
+def synthetic_price(coin_ids):
+    data = {}
+    for coin_id in coin_ids:
+        _, prices, _ = _fine_series(coin_id)
+        last = prices[-1]
+        prev = prices[-1 - DAY_MS // FINE_STEP_MS]
+        data[coin_id] = {"usd": float(last), "usd_24h_change": float((last / prev - 1) * 100)}
+    return data
+
+
+@lru_cache(maxsize=4)
+def synthetic_coin_list(n_filler=3000, seed=0):
+    """STUB_COINS plus `n_filler` made-up coins, some sharing tickers, like the real list's long tail"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    coins = [{"id": coin_id, "symbol": symbol, "name": name} for coin_id, symbol, name in STUB_COINS]
+    for i in range(n_filler):
+        name = "".join(rng.choice(letters) for _ in range(rng.randint(4, 10))).capitalize()
+        symbol = name[:rng.randint(2, 5)].lower()
+        coins.append({"id": f"{name.lower()}-{i}", "symbol": symbol, "name": f"{name} {rng.choice(['Token', 'Coin', 'Protocol', 'Finance'])}"})
+    return coins
+
+
+def exchange_coin_id(pair):
+    """'BTCUSDT' -> 'bitcoin'; unknown bases map to their lower-case name"""
+    base = pair.upper()
+    for quote in ("USDT", "USD"):
+        if base.endswith(quote):
+            base = base[:-len(quote)]
+            break
+    return EXCHANGE_SYMBOLS.get(base, base.lower())
+
+
+def synthetic_klines(coin_id, interval_ms, limit, start_ms=None, end_ms=None):
+    """Exchange kline rows (strings for prices, like the real API): the last `limit` bars, or the first
+    `limit` opening at or after start_ms, optionally only those opening at or before end_ms"""
+    timestamps, prices, cum_volume = _fine_series(coin_id)
+    if start_ms is None and end_ms is None:
+        idx, stride = _sample_points(min(limit * interval_ms / DAY_MS, MAX_STUB_DAYS - 1), interval_ms)
+        idx = idx[-limit:]
+    else:
+        idx, stride = _sample_points(MAX_STUB_DAYS - 1, interval_ms)
+        opens = timestamps[idx] - interval_ms
+        idx = idx[(opens >= (start_ms if start_ms is not None else opens[0]))
+                  & (opens <= (end_ms if end_ms is not None else opens[-1]))]
+        idx = idx[:limit] if start_ms is not None else idx[-limit:]
+    windows = prices[idx[:, None] - np.arange(stride, -1, -1)[None, :]]
+    quote_volume = cum_volume[idx] - cum_volume[idx - stride]
+    close_times = timestamps[idx] - 1
+    return [
+        [int(t) - interval_ms + 1, f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v / c:.8f}", int(t), f"{v:.8f}", 1000]
+        for t, o, h, l, c, v in zip(
+            close_times.tolist(), windows[:, 0].tolist(), windows.max(axis=1).tolist(),
+            windows.min(axis=1).tolist(), windows[:, -1].tolist(), quote_volume.tolist(),
+        )
+    ]
+
+
+def synthetic_ticker(coin_id):
+    quote = synthetic_price([coin_id])[coin_id]
+    return {"lastPrice": f"{quote['usd']:.8f}", "priceChangePercent": f"{quote['usd_24h_change']:.3f}"}
+
+
+class SyntheticDepth:
+    """A drifting L2 book for one coin: snapshots and a diff per update, with update ids in step"""
+
+    def __init__(self, coin_id, seed=None):
+        self.rng = random.Random(f"{seed}:{coin_id}")
+        self.pair = next((base for base, known in EXCHANGE_SYMBOLS.items() if known == coin_id), coin_id.upper()) + "USDT"
+        price = synthetic_price([coin_id])[coin_id]["usd"]
+        self.tick = 10.0 ** (math.floor(math.log10(price)) - 4)
+        self.mid = round(price / self.tick)  # in ticks; bids sit below it, asks above
+        self.unit = 5e4 / price  # a typical level holds about $50k
+        self.bids, self.asks = {}, {}
+        for offset in range(1, DEPTH_TICKS + 1):
+            for side, level in ((self.bids, self.mid - offset), (self.asks, self.mid + offset)):
+                if self.rng.random() < 0.5:
+                    side[level] = self._size()
+        self.update_id = 1
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def _size(self):
+        wall = 20 if self.rng.random() < 0.02 else 1
+        return self.unit * wall * self.rng.lognormvariate(0, 0.8)
+
+    def _row(self, level, size):
+        return [f"{level * self.tick:.8f}", f"{size:.8f}"]
+
+    def snapshot(self, limit=1000):
+        with self._lock:
+            bids = sorted(self.bids.items(), reverse=True)[:limit]
+            asks = sorted(self.asks.items())[:limit]
+            return {"lastUpdateId": self.update_id,
+                    "bids": [self._row(*level) for level in bids], "asks": [self._row(*level) for level in asks]}
+
+    def step(self):
+        """Move the book by one update and queue the diff for every stream client"""
+        with self._lock:
+            changes = {}, {}
+            if self.rng.random() < 0.3:
+                self.mid += self.rng.choice((-1, 1))
+                # Levels the mid has moved through are taken out, and the far end refills
+                for side, changes_side, crossed in ((self.bids, changes[0], lambda level: level >= self.mid),
+                                                    (self.asks, changes[1], lambda level: level <= self.mid)):
+                    for level in [level for level in side if crossed(level) or abs(level - self.mid) > DEPTH_TICKS]:
+                        del side[level]
+                        changes_side[level] = 0.0
+            for _ in range(4):
+                is_bid = self.rng.random() < 0.5
+                side, changes_side = (self.bids, changes[0]) if is_bid else (self.asks, changes[1])
+                offset = min(DEPTH_TICKS, 1 + int(self.rng.expovariate(1 / 40)))
+                level = self.mid - offset if is_bid else self.mid + offset
+                size = 0.0 if level in side and self.rng.random() < 0.25 else self._size()
+                if size:
+                    side[level] = size
+                else:
+                    side.pop(level, None)
+                changes_side[level] = size
+            self.update_id += 1
+            if not self._subscribers:
+                return
+            message = json.dumps({
+                "e": "depthUpdate", "E": int(time.time() * 1000), "s": self.pair, "U": self.update_id, "u": self.update_id,
+                "b": [self._row(*level) for level in changes[0].items()],
+                "a": [self._row(*level) for level in changes[1].items()],
+            })
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self._subscribers.discard(subscriber)
+                    subscriber.put(None)  # the client cannot keep up; its stream is closed
+
+    def subscribe(self):
+        subscriber = queue.Queue(DEPTH_SUBSCRIBER_QUEUE + 1)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "CoinGeckoStub/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path.split("/api/v3/", 1)[-1].strip("/")
+        parts = path.split("/")
+        self.server.count(replay.endpoint_name(parsed.path))
+
+        delay_ms = self.server.request_latency_ms(replay.endpoint_name(parsed.path))
+        if delay_ms:
+            time.sleep(delay_ms / 1000.0)
+
+        if self.server.fixture_dir:
+            url = f"{replay.API_BASE}/{path}"
+            try:
+                with gzip.open(replay.fixture_path(url, params, self.server.fixture_dir), "rb") as f:
+                    return self._send_json(200, f.read())
+            except FileNotFoundError:
+                return self._send_json(404, {"error": "no fixture recorded"})
+
+        try:
+            days = float(params.get("days", 30))
+            if path == "coins/list":
+                return self._send_json(200, synthetic_coin_list())
+            if path == "simple/price":
+                return self._send_json(200, synthetic_price(params.get("ids", "").split(",")))
+            if len(parts) == 3 and parts[0] == "coins" and parts[2] == "ohlc":
+                return self._send_json(200, self.server.damage(synthetic_ohlc(parts[1], days), parts[1]))
+            if len(parts) == 3 and parts[0] == "coins" and parts[2] == "market_chart":
+                return self._send_json(200, synthetic_market_chart(parts[1], days))
+            if path == "klines":
+                interval_ms = KLINE_INTERVALS[params.get("interval", "1h")]
+                limit = min(int(params.get("limit", 500)), 1000)
+                start_ms, end_ms = (int(params[k]) if k in params else None for k in ("startTime", "endTime"))
+                return self._send_json(200, synthetic_klines(exchange_coin_id(params.get("symbol", "")), interval_ms, limit,
+                                                             start_ms, end_ms))
+            if path == "ticker/24hr":
+                return self._send_json(200, synthetic_ticker(exchange_coin_id(params.get("symbol", ""))))
+            if path == "depth":
+                book = self.server.depth_book(exchange_coin_id(params.get("symbol", "")))
+                return self._send_json(200, book.snapshot(min(int(params.get("limit", 100)), 5000)))
+        except KeyError:
+            return self._send_json(400, {"code": -1120, "msg": "Invalid interval."})
+        except ValueError:
+            return self._send_json(400, {"error": "invalid parameter"})
+        return self._send_json(404, {"error": "not found"})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, fixture_dir=None, latency_ms=0, tail_latency_ms=0, tail_rate=0.0,
+                 seed=None, drop_rate=0.0, duplicate_rate=0.0, endpoint_latency_ms=None, depth_rate=0):
+        super().__init__((host, port), StubHandler)
+        self.fixture_dir = fixture_dir
+        self.latency_ms = latency_ms
+        self.tail_latency_ms = tail_latency_ms
+        self.tail_rate = tail_rate
+        self.endpoint_latency_ms = dict(endpoint_latency_ms or {})
+        self.drop_rate = drop_rate
+        self.duplicate_rate = duplicate_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._counts = Counter()
+        self._counts_lock = threading.Lock()
+        self._thread = None
+        self.depth_rate = depth_rate
+        self._depth_books = {}
+        self._depth_stop = threading.Event()
+        self._depth_server = None
+
+    @property
+    def api_base(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v3"
+
+    @property
+    def stream_base(self):
+        """Base URL of the websocket depth stream (`depth_rate` > 0 only)"""
+        host, port = self._depth_server.socket.getsockname()[:2]
+        return f"ws://{host}:{port}/ws"
+
+    def depth_book(self, coin_id):
+        with self._counts_lock:
+            if coin_id not in self._depth_books:
+                self._depth_books[coin_id] = SyntheticDepth(coin_id, self.seed)
+            return self._depth_books[coin_id]
+
+    def _depth_loop(self):
+        """Step every book that has been requested, `depth_rate` updates per second each"""
+        started, done = time.perf_counter(), 0
+        while not self._depth_stop.wait(0.005):
+            due = int((time.perf_counter() - started) * self.depth_rate)
+            with self._counts_lock:
+                books = list(self._depth_books.values())
+            for _ in range(due - done):
+                for book in books:
+                    book.step()
+            done = due
+
+    def _stream_depth(self, ws):
+        """One websocket client of /ws/<pair>@depth: forward each diff of that book until either side closes"""
+        stream = ws.request.path.rsplit("/", 1)[-1].split("@", 1)[0]
+        self.count("ws/depth")
+        book = self.depth_book(exchange_coin_id(stream))
+        subscriber = book.subscribe()
+        try:
+            while not self._depth_stop.is_set():
+                try:
+                    message = subscriber.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if message is None:
+                    break
+                ws.send(message)
+        except ConnectionClosed:
+            pass
+        finally:
+            book.unsubscribe(subscriber)
+
+    def request_latency_ms(self, endpoint=None):
+        """Base latency plus any for `endpoint`, plus `tail_latency_ms` on a `tail_rate` fraction of requests"""
+        with self._counts_lock:
+            slow = self.tail_rate > 0 and self._rng.random() < self.tail_rate
+        extra = next((ms for name, ms in self.endpoint_latency_ms.items() if endpoint and endpoint.endswith(name)), 0)
+        return self.latency_ms + extra + (self.tail_latency_ms if slow else 0)
+
+    def damage(self, rows, key=""):
+        """OHLC rows with a `drop_rate` share of inner candles missing and a `duplicate_rate` share sent twice
+
+        The draw is seeded per candle, so the same candles are missing from
+        every response, like a provider's persistent holes.
+        """
+        if not (self.drop_rate or self.duplicate_rate) or len(rows) < 3:
+            return rows
+        draws = [random.Random(f"{self.seed}:{key}:{row[0]}").random() for row in rows]
+        damaged = [rows[0]]
+        for row, draw in zip(rows[1:-1], draws[1:-1]):
+            if draw < self.drop_rate:
+                continue
+            damaged.append(row)
+            if draw > 1 - self.duplicate_rate:
+                damaged.append(row)
+        damaged.append(rows[-1])
+        return damaged
+
+    def count(self, endpoint):
+        with self._counts_lock:
+            self._counts[endpoint] += 1
+
+    def request_counts(self):
+        with self._counts_lock:
+            return dict(self._counts)
+
+    def reset_request_counts(self):
+        with self._counts_lock:
+            self._counts.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="coingecko-stub", daemon=True)
+        self._thread.start()
+        if self.depth_rate:
+            self.start_depth_stream()
+        return self
+
+    def start_depth_stream(self):
+        """Serve the websocket diff stream next to the HTTP endpoints"""
+        if serve_websocket is None:
+            raise RuntimeError("the depth stream needs the 'websockets' package")
+        self._depth_server = serve_websocket(self._stream_depth, self.server_address[0], 0, compression=None)
+        threading.Thread(target=self._depth_server.serve_forever, name="depth-stream", daemon=True).start()
+        threading.Thread(target=self._depth_loop, name="depth-updates", daemon=True).start()
+
+    def stop(self):
+        self._depth_stop.set()
+        if self._depth_server is not None:
+            self._depth_server.shutdown()
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic or recorded CoinGecko responses locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixture-dir", default=None, help="serve replay fixtures instead of synthetic data")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--tail-latency-ms", type=float, default=0, help="extra latency on a --tail-rate share of requests")
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--slow", action="append", default=[], metavar="ENDPOINT=MS",
+                        help="extra latency for one endpoint, e.g. market_chart=3000 (repeatable)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of inner OHLC candles left out")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="share of OHLC candles sent twice")
+    parser.add_argument("--depth-rate", type=float, default=0, help="order-book diffs per second on the websocket stream")
+    args = parser.parse_args(argv)
+
+    server = StubServer(args.host, args.port, args.fixture_dir, args.latency_ms, args.tail_latency_ms, args.tail_rate,
+                        drop_rate=args.drop_rate, duplicate_rate=args.duplicate_rate,
+                        endpoint_latency_ms={name: float(ms) for name, ms in (item.split("=", 1) for item in args.slow)},
+                        depth_rate=args.depth_rate)
+    print(f"CoinGecko stub listening on {server.api_base}")
+    if args.depth_rate:
+        server.start_depth_stream()
+        print(f"Depth stream on {server.stream_base}/<pair>@depth")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
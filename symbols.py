@@ -0,0 +1,138 @@
+"""Ticker resolution and autocomplete over CoinGecko's full coin list.
+
+`/coins/list` returns every listed coin as {"id", "symbol", "name"}, well
+over ten thousand of them. Tickers are not unique: "ETH" also names
+bridged and wrapped copies of ether on other chains. `SymbolIndex` ranks
+the coins behind a ticker so the one most people mean comes first:
+
+    1. the coin the app pins for that ticker (`preferred`)
+    2. coins that are not wrapped / bridged / pegged / legacy copies
+    3. the shortest coin id (originals rarely need a disambiguating suffix)
+
+`resolve` is a dict lookup by ticker, then by coin id, then by name.
+`complete` answers prefix queries over tickers and names from a table of
+ranked matches for every prefix up to `PREFIX_DEPTH` characters. Longer
+prefixes bisect a sorted key list and rank only the keys in range, which
+is small by then. Both run in microseconds.
+
+The coin list barely changes, so the index is saved to disk as JSON
+(`save` / `load`). A restart then serves it without an upstream call.
+"""
+import bisect
+import heapq
+import os
+import time
+
+import orjson
+
+PREFIX_DEPTH = 3
+MAX_SUGGESTIONS = 20
+QUOTE_SUFFIXES = ("USDT", "USD")
+COPY_MARKERS = ("wrapped", "bridged", "-peg", "peg-", "wormhole", "staked", "-old", "[old]", "-iou")
+TICKER, NAME = 0, 1
+
+
+def is_copy(coin_id, name):
+    """Whether a coin looks like a wrapped, bridged, pegged or legacy copy of another"""
+    text = f"{coin_id} {name}".lower()
+    return any(marker in text for marker in COPY_MARKERS)
+
+
+class SymbolIndex:
+    """Ranked ticker lookup and prefix autocomplete over a coin list"""
+
+    def __init__(self, coins, preferred=None, fetched_at=None):
+        preferred = {ticker.upper(): coin_id for ticker, coin_id in (preferred or {}).items()}
+        rows = {(c["id"], c["symbol"].upper(), c["name"]) for c in coins if c.get("id") and c.get("symbol")}
+        # One global order serves both collision ranking and autocomplete ordering
+        self.coins = sorted(
+            rows,
+            key=lambda c: (preferred.get(c[1]) != c[0], is_copy(c[0], c[2]), len(c[1]), len(c[0]), c[0]),
+        )
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+        self.by_ticker, self.by_id, self.by_name = {}, {}, {}
+        for rank, (coin_id, ticker, name) in enumerate(self.coins):
+            self.by_ticker.setdefault(ticker, []).append(rank)
+            self.by_id.setdefault(coin_id, rank)
+            self.by_name.setdefault(name.lower(), rank)
+
+        entries = sorted(
+            [(ticker.lower(), TICKER, rank) for ticker, ranks in self.by_ticker.items() for rank in ranks]
+            + [(name, NAME, rank) for name, rank in self.by_name.items()]
+        )
+        self._keys = [key for key, _, _ in entries]
+        self._entries = entries
+        self._prefixes = {}
+        for key, _, rank in sorted(entries, key=lambda e: (e[1], e[2])):
+            for n in range(1, min(len(key), PREFIX_DEPTH) + 1):
+                matches = self._prefixes.setdefault(key[:n], [])
+                if len(matches) < MAX_SUGGESTIONS and rank not in matches:
+                    matches.append(rank)
+
+    def __len__(self):
+        return len(self.coins)
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def coin(self, rank):
+        coin_id, ticker, name = self.coins[rank]
+        return {"id": coin_id, "symbol": ticker, "name": name}
+
+    def candidates(self, ticker):
+        """Every coin behind a ticker, best first"""
+        return [self.coin(rank) for rank in self.by_ticker.get(ticker.strip().upper(), ())]
+
+    def resolve(self, query):
+        """CoinGecko id for a ticker (optionally with a USD/USDT quote), coin id or coin name; None if unknown"""
+        query = query.strip()
+        ticker = query.upper()
+        ranks = self.by_ticker.get(ticker)
+        if ranks is None:
+            for suffix in QUOTE_SUFFIXES:
+                if ticker.endswith(suffix) and ticker[:-len(suffix)] in self.by_ticker:
+                    ranks = self.by_ticker[ticker[:-len(suffix)]]
+                    break
+        rank = ranks[0] if ranks else self.by_id.get(query.lower(), self.by_name.get(query.lower()))
+        return None if rank is None else self.coins[rank][0]
+
+    def complete(self, prefix, limit=8):
+        """Up to `limit` coins whose ticker or name starts with `prefix`, exact tickers first"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        ranks = list(self.by_ticker.get(prefix.upper(), ()))
+        if len(prefix) <= PREFIX_DEPTH:
+            matches = self._prefixes.get(prefix, ())
+        else:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + "\uffff", lo)
+            # A coin can match by ticker and by name, so 2 * limit entries always yield `limit` coins
+            matches = [rank for _, _, rank in heapq.nsmallest(2 * limit, self._entries[lo:hi], key=lambda e: (e[1], e[2]))]
+        for rank in matches:
+            if len(ranks) >= limit:
+                break
+            if rank not in ranks:
+                ranks.append(rank)
+        return [self.coin(rank) for rank in ranks[:limit]]
+
+    def save(self, path):
+        """Write the coin list atomically so a crash never leaves a torn file"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps({"fetched_at": self.fetched_at, "coins": self.coins}))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, preferred=None):
+        """Index saved by `save`, or None when the file is missing or unreadable"""
+        try:
+            with open(path, "rb") as f:
+                data = orjson.loads(f.read())
+            coins = [{"id": c[0], "symbol": c[1], "name": c[2]} for c in data["coins"]]
+            return cls(coins, preferred, fetched_at=data["fetched_at"])
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            return None